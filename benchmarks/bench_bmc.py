@@ -0,0 +1,64 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Depth scaling of incremental BMC against the re-assuming loop
+
+    python3 -m benchmarks.bench_bmc
+"""
+
+import argparse
+import time
+
+import btoropt
+
+from btor2ex.btor2ex import BTOR2Ex
+from btor2ex.boolectorsolver import BoolectorSolver
+
+from .generators import constrained_counters
+
+class CountingSolver(BoolectorSolver):
+    """Boolector backend counting assumption/assertion/check calls"""
+
+    def __init__(self, id: str = "counting"):
+        super().__init__(id)
+        self.calls = 0
+
+    def mk_assume(self, expr):
+        self.calls += 1
+        super().mk_assume(expr)
+
+    def mk_assert(self, expr):
+        self.calls += 1
+        super().mk_assert(expr)
+
+    def check_sat(self):
+        self.calls += 1
+        return super().check_sat()
+
+def bench (prgm, depth: int, incremental: bool) -> tuple[float, int]:
+    slv = CountingSolver()
+    engine = BTOR2Ex(slv, prgm)
+    start = time.perf_counter()
+    assert engine.bmc(depth, incremental=incremental)
+    return time.perf_counter() - start, slv.calls
+
+def main ():
+    argparser = argparse.ArgumentParser(description="BMC depth scaling")
+    argparser.add_argument("-n", "--props", type=int, default=16, help="Number of bad properties")
+    argparser.add_argument("-d", "--depths", type=int, nargs="+",
+        default=[5, 10, 20, 40], help="BMC depths")
+    args = argparser.parse_args()
+
+    prgm = btoropt.parse(constrained_counters(args.props))
+    print(f"{'depth':>6} {'loop (s)':>10} {'calls':>8} {'incr (s)':>10} {'calls':>8}")
+    for d in args.depths:
+        tloop, cloop = bench(prgm, d, False)
+        tincr, cincr = bench(prgm, d, True)
+        print(f"{d:>6} {tloop:>10.3f} {cloop:>8} {tincr:>10.3f} {cincr:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Load time and peak memory of the streaming loader against btoropt
+
+    python3 -m benchmarks.bench_load
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import btoropt
+
+import btor2ex.utils as utils
+from btor2ex.compiler import compile_program
+from btor2ex.loader import load_file
+
+from .generators import register_chain
+
+def measure (fn) -> tuple[float, float]:
+    """Run fn twice, returning its time (s) and peak traced memory (MB)"""
+    # Tracing slows allocation-heavy code several times over, so the timed
+    # run is untraced and the peak comes from a run of its own
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+def main ():
+    argparser = argparse.ArgumentParser(description="Streaming load against btoropt")
+    argparser.add_argument("-n", "--sizes", type=int, nargs="+",
+        default=[500, 1000, 2000], help="Number of registers")
+    argparser.add_argument("--stream-only", action="store_true",
+        help="Skip btoropt, whose parse time is quadratic in the program size")
+    args = argparser.parse_args()
+
+    print(f"{'insts':>8} {'MB':>6} {'btoropt (s)':>12} {'peak MB':>8} {'stream (s)':>11} {'peak MB':>8} {'MB/s':>6}")
+    for n in args.sizes:
+        lines = register_chain(n)
+        with tempfile.NamedTemporaryFile("w", suffix=".btor", delete=False) as f:
+            # Yosys-style source locations
+            f.writelines(f"{line} ; design.v:{i}.1-{i}.20\n" for i, line in enumerate(lines))
+        try:
+            size = os.path.getsize(f.name) / 1e6
+            tparse, mparse = float("nan"), float("nan")
+            if not args.stream_only:
+                tparse, mparse = measure(lambda: compile_program(btoropt.parse(utils.parsewrapper(f.name))))
+            tload, mload = measure(lambda: load_file(f.name))
+        finally:
+            os.unlink(f.name)
+        print(f"{len(lines):>8} {size:>6.2f} {tparse:>12.3f} {mparse:>8.2f} {tload:>11.3f} {mload:>8.2f} {size/tload:>6.1f}")
+
+if __name__ == "__main__":
+    main()
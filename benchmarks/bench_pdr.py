@@ -0,0 +1,62 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    PDR proofs against bounded BMC on the examples and generated counters
+
+    python3 -m benchmarks.bench_pdr
+"""
+
+import argparse
+import time
+
+import btoropt
+
+import btor2ex.utils as utils
+from btor2ex.btor2ex import BTOR2Ex
+from btor2ex.boolectorsolver import BoolectorSolver
+from btor2ex.foldsolver import FoldingSolver
+from btor2ex.pdr import BOOLECTOR_OPTS, PDR
+
+from .generators import wrapping_counters
+
+EXAMPLES = ["reg_en.safe", "reg_en.bad", "loop.safe"]
+
+def bench_pdr (prgm, frames: int) -> tuple[str, int, float]:
+    start = time.perf_counter()
+    engine = PDR(FoldingSolver(BoolectorSolver("pdr", BOOLECTOR_OPTS)), prgm)
+    verdict = engine.run(frames)
+    return verdict.value, engine.k, time.perf_counter() - start
+
+def bench_bmc (prgm, depth: int) -> tuple[bool, float]:
+    start = time.perf_counter()
+    engine = BTOR2Ex(FoldingSolver(BoolectorSolver("bmc")), prgm)
+    result = engine.bmc(depth)
+    return result, time.perf_counter() - start
+
+def main ():
+    argparser = argparse.ArgumentParser(description="PDR against BMC")
+    argparser.add_argument("-d", "--depth", type=int, default=20, help="BMC depth")
+    argparser.add_argument("-f", "--frames", type=int, default=50, help="Largest number of PDR frames")
+    argparser.add_argument("-w", "--widths", type=int, nargs="+",
+        default=[4, 5, 6, 7, 8], help="Counter widths (one counter wrapping at a third of its range)")
+    argparser.add_argument("-n", "--counters", type=int, default=2,
+        help="Number of 5-bit counters for the multi-counter design")
+    args = argparser.parse_args()
+
+    designs = [(name, btoropt.parse(utils.parsewrapper(f"tests/btor/{name}.btor"))) for name in EXAMPLES]
+    for w in args.widths:
+        designs.append((f"counter{w}", btoropt.parse(wrapping_counters(1, w, (1 << w) // 3))))
+    designs.append((f"counters{args.counters}x5", btoropt.parse(wrapping_counters(args.counters, 5, 10))))
+
+    print(f"{'design':>14} {'pdr':>10} {'frames':>7} {'pdr (s)':>9} {'bmc':>7} {'bmc (s)':>9}")
+    for name, prgm in designs:
+        verdict, k, tpdr = bench_pdr(prgm, args.frames)
+        result, tbmc = bench_bmc(prgm, args.depth)
+        print(f"{name:>14} {verdict:>10} {k:>7} {tpdr:>9.3f} {'SAFE' if result else 'UNSAFE':>7} {tbmc:>9.3f}")
+
+if __name__ == "__main__":
+    main()
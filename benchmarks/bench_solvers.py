@@ -0,0 +1,62 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Boolector against Bitwuzla on BMC of the examples and generated designs
+
+    python3 -m benchmarks.bench_solvers
+"""
+
+import argparse
+import time
+
+import btoropt
+
+import btor2ex.utils as utils
+from btor2ex.bitwuzlasolver import BitwuzlaSolver
+from btor2ex.boolectorsolver import BoolectorSolver
+from btor2ex.btor2ex import BTOR2Ex
+from btor2ex.foldsolver import FoldingSolver
+
+from .generators import pipeline, prfsm_counters, register_chain, register_miter
+
+BACKENDS = {"boolector": BoolectorSolver, "bitwuzla": BitwuzlaSolver}
+
+def bench (backend, prgm, depth: int, fold: bool) -> tuple[bool, float]:
+    start = time.perf_counter()
+    slv = backend("bench")
+    engine = BTOR2Ex(FoldingSolver(slv) if fold else slv, prgm)
+    result = engine.bmc(depth)
+    return result, time.perf_counter() - start
+
+def main ():
+    argparser = argparse.ArgumentParser(description="Boolector against Bitwuzla")
+    argparser.add_argument("-d", "--depth", type=int, default=20, help="BMC depth")
+    argparser.add_argument("--no-fold", action="store_true", help="Disable hash-consing and constant folding")
+    args = argparser.parse_args()
+
+    designs = [(name, btoropt.parse(utils.parsewrapper(f"tests/btor/{name}.btor")))
+        for name in ["reg_en.safe", "reg_en.bad", "loop.safe"]]
+    designs += [
+        ("prfsm_counters_16x8", btoropt.parse(prfsm_counters(16, 8))),
+        ("register_miter_32", btoropt.parse(register_miter(32))),
+        ("pipeline_16", btoropt.parse(pipeline(16))),
+        ("register_chain_200", btoropt.parse(register_chain(200))),
+    ]
+
+    print(f"{'design':>20} " + " ".join(f"{name + ' (s)':>15}" for name in BACKENDS) + f" {'result':>7}")
+    for name, prgm in designs:
+        times, results = [], set()
+        for backend in BACKENDS.values():
+            result, elapsed = bench(backend, prgm, args.depth, not args.no_fold)
+            times.append(elapsed)
+            results.add(result)
+        assert len(results) == 1, f"backends disagree on {name}"
+        print(f"{name:>20} " + " ".join(f"{t:>15.3f}" for t in times) +
+            f" {'SAFE' if results.pop() else 'UNSAFE':>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Per-step unroll time against program size
+
+    python3 -m benchmarks.bench_unroll
+"""
+
+import argparse
+import time
+
+import btoropt
+
+from btor2ex.btor2ex import BTOR2Ex
+from btor2ex.boolectorsolver import BoolectorSolver
+from btor2ex.foldsolver import FoldingSolver
+
+from .generators import register_chain
+
+def bench (n: int, steps: int, fold: bool = False) -> tuple[int, float, float, float]:
+    prgm = btoropt.parse(register_chain(n))
+    slv = BoolectorSolver("bench")
+    engine = BTOR2Ex(FoldingSolver(slv) if fold else slv, prgm)
+
+    start = time.perf_counter()
+    engine.preprocess()
+    prep = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(steps):
+        engine.execute()
+    step = (time.perf_counter() - start) / steps
+    kept = sum(engine.frame_bytes(i) for i in range(steps)) / steps
+    return len(prgm), prep, step, kept
+
+def main ():
+    argparser = argparse.ArgumentParser(description="Per-step unroll time")
+    argparser.add_argument("-s", "--steps", type=int, default=10, help="Unroll steps")
+    argparser.add_argument("-n", "--sizes", type=int, nargs="+",
+        default=[50, 100, 200, 400, 800], help="Number of registers")
+    argparser.add_argument("--fold", action="store_true", help="Unroll through the folding term layer")
+    args = argparser.parse_args()
+
+    print(f"{'insts':>8} {'preprocess (ms)':>16} {'step (ms)':>10} {'us/inst':>8} {'KB/frame':>9}")
+    for n in args.sizes:
+        ninsts, prep, step, kept = bench(n, args.steps, args.fold)
+        print(f"{ninsts:>8} {prep*1e3:>16.2f} {step*1e3:>10.2f} {step*1e6/ninsts:>8.2f} {kept/1e3:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Generators for scalable BTOR2 designs
+"""
+
+import btor2ex.prfsm as prfsm
+
+def register_chain (n: int, width: int = 8) -> list[str]:
+    """Chain of `n` enabled registers, each folding its predecessor in
+    Args:
+        n (int): number of registers
+        width (int, optional): register width. Defaults to 8.
+    Returns:
+        list[str]: BTOR2 program (roughly 5n instructions)
+    """
+    lines = [
+        f"1 sort bitvec {width}",
+        "2 sort bitvec 1",
+        "3 input 1 d",
+        "4 input 2 en",
+        f"5 const 1 {'1' * width}",
+    ]
+    lid = 6
+    prev = 3
+    for i in range(n):
+        reg = lid
+        lines.append(f"{reg} state 1 r{i}")
+        lines.append(f"{reg+1} xor 1 {prev} {reg}")
+        lines.append(f"{reg+2} ite 1 4 {reg+1} {reg}")
+        lines.append(f"{reg+3} next 1 {reg} {reg+2}")
+        lines.append(f"{reg+4} output {reg} q{i}")
+        prev = reg
+        lid += 5
+    lines.append(f"{lid} eq 2 {prev} 5")
+    lines.append(f"{lid+1} bad {lid}")
+    return lines
+
+def constrained_counters (n: int, width: int = 8) -> list[str]:
+    """`n` independent counters, each with a constraint ruling out its bad
+    Args:
+        n (int): number of counters (and bad properties)
+        width (int, optional): counter width. Defaults to 8.
+    Returns:
+        list[str]: BTOR2 program, safe at every depth
+    """
+    lines = [
+        f"1 sort bitvec {width}",
+        "2 sort bitvec 1",
+        "3 input 2 en",
+        f"4 const 1 {'0' * (width-1)}1",
+    ]
+    lid = 5
+    for i in range(n):
+        reg = lid
+        lines.append(f"{reg} state 1 c{i}")
+        lines.append(f"{reg+1} add 1 {reg} 4")
+        lines.append(f"{reg+2} ite 1 3 {reg+1} {reg}")
+        lines.append(f"{reg+3} next 1 {reg} {reg+2}")
+        lines.append(f"{reg+4} const 1 {i % (1 << width):0{width}b}")
+        lines.append(f"{reg+5} neq 2 {reg} {reg+4}")
+        lines.append(f"{reg+6} constraint {reg+5}")
+        lines.append(f"{reg+7} eq 2 {reg} {reg+4}")
+        lines.append(f"{reg+8} bad {reg+7}")
+        lid += 9
+    return lines
+
+def wrapping_counters (n: int, width: int = 8, limit: int = 100) -> list[str]:
+    """`n` counters reset to zero and wrapping at `limit`, like the proof
+    schedule counter of PrFSM with a reset, each bad once it is all ones.
+    The unreachable values above `limit` count up into the bad.
+    Args:
+        n (int): number of counters
+        width (int, optional): counter width. Defaults to 8.
+        limit (int, optional): largest counter value. Defaults to 100.
+    Returns:
+        list[str]: BTOR2 program, safe at every depth but only
+            (2^width - limit)-inductive
+    """
+    lines = [
+        f"1 sort bitvec {width}",
+        "2 sort bitvec 1",
+        "3 zero 1",
+        "4 one 1",
+        f"5 constd 1 {limit}",
+        f"6 ones 1",
+    ]
+    lid = 7
+    for i in range(n):
+        reg = lid
+        lines.append(f"{reg} state 1 c{i}")
+        lines.append(f"{reg+1} init 1 {reg} 3")
+        lines.append(f"{reg+2} eq 2 {reg} 5")
+        lines.append(f"{reg+3} add 1 {reg} 4")
+        lines.append(f"{reg+4} ite 1 {reg+2} 3 {reg+3}")
+        lines.append(f"{reg+5} next 1 {reg} {reg+4}")
+        lines.append(f"{reg+6} eq 2 {reg} 6")
+        lines.append(f"{reg+7} bad {reg+6}")
+        lid += 8
+    return lines
+
+def prfsm_counters (n: int, width: int = 32) -> list[str]:
+    """`n` proof schedule counters built by the PrFSM pass, each bad once
+    it is all ones
+    Args:
+        n (int): number of counters
+        width (int, optional): counter width. Defaults to 32.
+    Returns:
+        list[str]: BTOR2 program, safe below depth 2^width - 1
+    """
+    lines = ["1 sort bitvec 1"]
+    lid = 2
+    for i in range(n):
+        fsm = prfsm.PrFSM(f"c{i}", 1 << width, reset=True)
+        insts = fsm.subprogram(lid)
+        # btoropt pads operands with spaces its own parser rejects
+        lines += [" ".join(inst.serialize().split()) for inst in insts]
+        sort, counter = insts[0].lid, insts[3].lid
+        lid = insts[-1].lid + 1
+        lines.append(f"{lid} ones {sort}")
+        lines.append(f"{lid+1} eq 1 {counter} {lid}")
+        lines.append(f"{lid+2} bad {lid+1}")
+        lid += 3
+    return lines
+
+def register_miter (n: int, width: int = 32) -> list[str]:
+    """`n` copies of the reg_en register (reset, enable) on shared inputs,
+    each checked against the first
+    Args:
+        n (int): number of registers
+        width (int, optional): register width. Defaults to 32.
+    Returns:
+        list[str]: BTOR2 program, safe at every depth
+    """
+    lines = [
+        f"1 sort bitvec {width}",
+        "2 sort bitvec 1",
+        "3 input 1 d",
+        "4 input 2 en",
+        "5 input 2 rst",
+        "6 zero 1",
+    ]
+    lid = 7
+    regs = []
+    for i in range(n):
+        reg = lid
+        lines.append(f"{reg} state 1 r{i}.q")
+        lines.append(f"{reg+1} init 1 {reg} 6")
+        lines.append(f"{reg+2} ite 1 4 3 {reg}")
+        lines.append(f"{reg+3} ite 1 5 6 {reg+2}")
+        lines.append(f"{reg+4} next 1 {reg} {reg+3}")
+        regs.append(reg)
+        lid += 5
+    for reg in regs[1:]:
+        lines.append(f"{lid} neq 2 {regs[0]} {reg}")
+        lines.append(f"{lid+1} bad {lid}")
+        lid += 2
+    return lines
+
+def pipeline (stages: int, width: int = 16) -> list[str]:
+    """Two `stages`-deep pipelines doubling and offsetting the data at every
+    stage, one by add and one by shift and subtract, checked for equivalence
+    Args:
+        stages (int): pipeline depth
+        width (int, optional): datapath width. Defaults to 16.
+    Returns:
+        list[str]: BTOR2 program, safe at every depth
+    """
+    lines = [
+        f"1 sort bitvec {width}",
+        "2 sort bitvec 1",
+        "3 input 1 x",
+        "4 zero 1",
+        "5 one 1",
+        "6 constd 1 3",
+        "7 constd 1 -3",
+    ]
+    lid = 8
+    a = b = 3
+    for i in range(stages):
+        ra, rb = lid, lid + 1
+        lines.append(f"{ra} state 1 a{i}")
+        lines.append(f"{rb} state 1 b{i}")
+        lines.append(f"{lid+2} init 1 {ra} 4")
+        lines.append(f"{lid+3} init 1 {rb} 4")
+        lines.append(f"{lid+4} add 1 {a} {a}")
+        lines.append(f"{lid+5} add 1 {lid+4} 6")
+        lines.append(f"{lid+6} sll 1 {b} 5")
+        lines.append(f"{lid+7} sub 1 {lid+6} 7")
+        lines.append(f"{lid+8} next 1 {ra} {lid+5}")
+        lines.append(f"{lid+9} next 1 {rb} {lid+7}")
+        a, b = ra, rb
+        lid += 10
+    lines.append(f"{lid} neq 2 {a} {b}")
+    lines.append(f"{lid+1} bad {lid}")
+    return lines
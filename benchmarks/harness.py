@@ -0,0 +1,136 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Benchmark suite over generated designs, compared against a stored baseline
+
+    python3 -m benchmarks.harness --save     # record the baseline
+    python3 -m benchmarks.harness            # compare against it
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import btoropt
+
+from btor2ex.btor2ex import BTOR2Ex
+from btor2ex.boolectorsolver import BoolectorSolver
+from btor2ex.foldsolver import FoldingSolver
+from btor2ex.profiling import Profiler
+
+from .generators import pipeline, prfsm_counters, register_chain, register_miter
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Generator, its arguments and the BMC depth of each case
+CASES = {
+    "prfsm_counters_64x32": (prfsm_counters, (64, 32), 20),
+    "register_miter_64x32": (register_miter, (64, 32), 20),
+    "pipeline_32x16": (pipeline, (32, 16), 40),
+    "register_chain_400": (register_chain, (400,), 20),
+}
+
+# Measured metrics, all lower is better
+METRICS = ["parse", "preprocess", "step", "check", "rss"]
+UNITS = {"parse": "ms", "preprocess": "ms", "step": "ms", "check": "ms", "rss": "MB"}
+
+def run_case (name: str, fold: bool) -> dict:
+    """Measure a case (in a fresh process, so that peak RSS is its own)"""
+    generator, params, depth = CASES[name]
+    lines = generator(*params)
+
+    start = time.perf_counter()
+    prgm = btoropt.parse(lines)
+    parse = time.perf_counter() - start
+
+    profiler = Profiler()
+    slv = BoolectorSolver("bench")
+    engine = BTOR2Ex(FoldingSolver(slv) if fold else slv, prgm, profiler=profiler)
+    start = time.perf_counter()
+    engine.preprocess()
+    preprocess = time.perf_counter() - start
+
+    engine.bmc(depth)
+    report = profiler.report()
+    return {
+        "parse": parse * 1e3,
+        "preprocess": preprocess * 1e3,
+        "step": sum(f["time"] for f in report["frames"]) / len(report["frames"]) * 1e3,
+        "check": sum(p["time"] for p in report["properties"].values()) * 1e3,
+        # ru_maxrss is in kilobytes on Linux
+        "rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3,
+    }
+
+def measure (name: str, fold: bool, repeat: int) -> dict:
+    """Best of `repeat` runs of a case, each in its own process"""
+    ctx = multiprocessing.get_context("spawn")
+    runs = []
+    for _ in range(repeat):
+        with ctx.Pool(1) as pool:
+            runs.append(pool.apply(run_case, (name, fold)))
+    return {metric: min(run[metric] for run in runs) for metric in METRICS}
+
+def compare (results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print results against the baseline
+    Returns:
+        list[str]: regressed case/metric pairs
+    """
+    regressions = []
+    print(f"{'case':<24} " + " ".join(f"{m + ' (' + UNITS[m] + ')':>16}" for m in METRICS))
+    for name, result in results.items():
+        base = baseline.get(name, {})
+        cells = []
+        for metric in METRICS:
+            cell = f"{result[metric]:.2f}"
+            if base.get(metric):
+                ratio = result[metric] / base[metric]
+                cell += f" {ratio:.2f}x"
+                if ratio > threshold:
+                    cell += "!"
+                    regressions.append(f"{name}/{metric}")
+            cells.append(f"{cell:>16}")
+        print(f"{name:<24} " + " ".join(cells))
+    return regressions
+
+def main ():
+    argparser = argparse.ArgumentParser(description="Benchmark suite against a stored baseline")
+    argparser.add_argument("cases", nargs="*", default=list(CASES), help=f"Cases to run (of {', '.join(CASES)})")
+    argparser.add_argument("--baseline", type=str, default=BASELINE, help="Baseline file")
+    argparser.add_argument("--save", action="store_true", help="Store the results as the baseline")
+    argparser.add_argument("-r", "--repeat", type=int, default=3, help="Runs per case (the best is kept)")
+    argparser.add_argument("-t", "--threshold", type=float, default=1.25,
+        help="Slowdown against the baseline reported as a regression")
+    argparser.add_argument("--no-fold", action="store_true", help="Disable hash-consing and constant folding")
+    args = argparser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    # Timings are machine specific, so no baseline is shipped: without one
+    # nothing could ever be reported as a regression
+    missing = [name for name in args.cases if name not in baseline]
+    if missing and not args.save:
+        print(f"No baseline for {', '.join(missing)} in {args.baseline}: record one with --save first")
+        sys.exit(1)
+
+    results = {name: measure(name, not args.no_fold, args.repeat) for name in args.cases}
+    regressions = compare(results, baseline, args.threshold)
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({**baseline, **results}, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    elif regressions:
+        print(f"Regressions (> {args.threshold}x): {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Batch checking of many designs on a shared process pool
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import time
+
+from .btor2ex import BTOR2Ex
+from .coi import COI
+from .foldsolver import FoldingSolver
+from .loader import load_file
+from .portfolio import mk_backend
+from .strash import Strash
+
+logger = logging.getLogger(__name__)
+
+def designs (path: str, bound: int) -> list[tuple[str, int]]:
+    """Designs of a batch: every .btor file under a directory, or the lines
+    "<design> [bound]" of a manifest (paths relative to the manifest, # comments)
+    Args:
+        path (str): directory or manifest
+        bound (int): bound of designs given without one
+    Returns:
+        list[tuple[str, int]]: design paths and bounds
+    """
+    if os.path.isdir(path):
+        return sorted((os.path.join(root, name), bound)
+            for root, _, names in os.walk(path) for name in names if name.endswith(".btor"))
+    batch = []
+    with open(path, "r") as f:
+        for line in f:
+            fields = line.split("#")[0].split()
+            if not fields:
+                continue
+            design = os.path.join(os.path.dirname(path), fields[0])
+            batch.append((design, int(fields[1]) if len(fields) > 1 else bound))
+    return batch
+
+def rss () -> float:
+    """Resident memory of this process in MB (its peak where /proc is missing)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+def check_design (design: str, bound: int, opts: dict) -> dict:
+    """Worker: BMC of one design on its own solver
+    Args:
+        design (str): BTOR2 file
+        bound (int): BMC bound
+        opts (dict): "backend", "init", "coi", "strash", "fold" and "pins"
+            settings (see parallel.check_group)
+    Returns:
+        dict: summary record of the design
+    """
+    start = time.perf_counter()
+    record = {"design": design, "bound": bound}
+    try:
+        prgm = load_file(design)
+        # Designs without a pinned input are reported as errors
+        pins = prgm.resolve_pins(opts.get("pins", {}))
+        if opts.get("coi", True):
+            prgm = COI().reduce(prgm)
+        init = opts.get("init", True)
+        if opts.get("strash", True):
+            prgm = Strash(init=init).reduce(prgm)
+        slv = mk_backend(os.path.basename(design), {"backend": opts.get("backend", "boolector")})
+        engine = BTOR2Ex(FoldingSolver(slv) if opts.get("fold", True) else slv, prgm, init=init, pins=pins)
+        safe = engine.bmc(bound)
+        record["result"] = "SAFE" if safe else "UNSAFE"
+        if not safe:
+            record["depth"] = len(engine.trace) - 1
+        # Measured while the unrolling is still alive, in a worker of its own (see run)
+        record["rss"] = rss()
+    # The loader exits on unsupported input
+    except (Exception, SystemExit) as e:
+        logger.warning("Checking %s failed: %r", design, e)
+        record.update(result="ERROR", error=repr(e))
+    record["time"] = time.perf_counter() - start
+    return record
+
+def check_job (job: tuple) -> dict:
+    return check_design(*job)
+
+def run (batch: list[tuple[str, int]], summary: str, jobs: int = None, opts: dict = None) -> list[dict]:
+    """Check designs on a process pool, largest first, streaming one JSON
+    record per design to the summary as it completes. Every design gets a
+    fresh worker process, so that its memory is its own, at the cost of
+    starting a process (and importing the solvers) per design
+    Args:
+        batch (list[tuple[str, int]]): design paths and bounds
+        summary (str): JSONL summary file
+        jobs (int, optional): number of worker processes. Defaults to the CPU count.
+        opts (dict, optional): settings passed to check_design. Defaults to None.
+    Returns:
+        list[dict]: records in completion order
+    """
+    # Large designs last would leave the pool waiting on a single straggler
+    batch = sorted(batch, key=lambda job: -os.path.getsize(job[0]) if os.path.isfile(job[0]) else 0)
+    jobs = min(jobs or multiprocessing.cpu_count(), max(len(batch), 1))
+    logger.info("Checking %d designs on %d workers", len(batch), jobs)
+
+    records = []
+    with open(summary, "w") as out, multiprocessing.Pool(jobs, maxtasksperchild=1) as pool:
+        for record in pool.imap_unordered(check_job, [(design, bound, opts or {}) for design, bound in batch]):
+            records.append(record)
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            logger.info("[%d/%d] %s: %s (%.3fs)", len(records), len(batch),
+                record["design"], record["result"], record["time"])
+    return records
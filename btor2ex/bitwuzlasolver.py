@@ -0,0 +1,235 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Bitwuzla backend solver
+"""
+
+import time
+
+from .btorsolver import BTORArraySort, BTORSolver, BTORSort
+
+import bitwuzla
+from bitwuzla import Kind
+
+class BitwuzlaSolver(BTORSolver):
+    """
+        Bitwuzla distinguishes Booleans from 1-bit vectors, which BTOR2 does
+        not: every term is kept a bit-vector, predicates are turned into
+        1-bit vectors and 1-bit vectors into Booleans where one is required.
+    """
+
+    def __init__(self, id: str = "bitwuzla", opts: dict = None):
+        """
+        Args:
+            id (str, optional): solver id. Defaults to "bitwuzla".
+            opts (dict, optional): extra Bitwuzla options by name,
+                e.g. {"REWRITE_LEVEL": 1}. Defaults to None.
+        """
+        super().__init__(id)
+
+        self.tm = bitwuzla.TermManager()
+        options = bitwuzla.Options()
+        options.set(bitwuzla.Option.PRODUCE_MODELS, True)
+        options.set(bitwuzla.Option.PRODUCE_UNSAT_ASSUMPTIONS, True)
+        for name, val in (opts or {}).items():
+            options.set(getattr(bitwuzla.Option, name), val)
+        self.bzla = bitwuzla.Bitwuzla(self.tm, options)
+
+        self.sort_cache = {}
+        self.mk_sort(1)
+        self.one = self.tm.mk_bv_one(self.sort_cache[1])
+        self.zero = self.tm.mk_bv_zero(self.sort_cache[1])
+        # Assumptions of the next check (Bitwuzla takes them with the check)
+        self.assumptions = []
+        # Bit-vector variables, for get_model
+        self.vars = []
+        # Deadline of the running limited check, shared with the termination
+        # callback (installed by the first limited check)
+        self.limit : dict = {"deadline": None}
+        self.term_set = False
+
+    def term (self, kind: Kind, *args, indices: list[int] = ()):
+        return self.tm.mk_term(kind, list(args), list(indices))
+
+    def to_bool (self, a):
+        """Boolean of a 1-bit vector"""
+        return self.term(Kind.EQUAL, a, self.one)
+
+    def to_bv (self, p):
+        """1-bit vector of a Boolean"""
+        return self.term(Kind.ITE, p, self.one, self.zero)
+
+    def mk_var(self, name: str, sort: BTORSort):
+        """Make var"""
+        if isinstance(sort, BTORArraySort):
+            return self.tm.mk_const(self.sort_cache[(sort.index, sort.width)], name)
+        var = self.tm.mk_const(self.sort_cache[sort.width], name)
+        self.vars.append((name, var))
+        return var
+
+    def mk_const(self, val: int, sort: BTORSort):
+        """Make bitvec constant"""
+        return self.tm.mk_bv_value(self.sort_cache[sort.width], val)
+
+    def mk_sort(self, width: int) -> BTORSort:
+        """Make bitvec sort"""
+        if width not in self.sort_cache:
+            self.sort_cache[width] = self.tm.mk_bv_sort(width)
+        return BTORSort(width)
+
+    def mk_array_sort(self, index: BTORSort, element: BTORSort) -> BTORArraySort:
+        """Make array sort"""
+        key = (index.width, element.width)
+        if key not in self.sort_cache:
+            self.sort_cache[key] = self.tm.mk_array_sort(self.sort_cache[index.width],
+                self.sort_cache[element.width])
+        return BTORArraySort(element.width, index.width)
+
+    def mk_const_array(self, sort: BTORArraySort, elem):
+        """Make constant array"""
+        return self.tm.mk_const_array(self.sort_cache[(sort.index, sort.width)], elem)
+
+    def mk_assume(self, expr):
+        """Make an assumption for the next check"""
+        self.assumptions.append(self.to_bool(expr))
+
+    def mk_assert(self, expr):
+        """Make an assertion"""
+        self.bzla.assert_formula(self.to_bool(expr))
+
+    def check_sat(self):
+        """Check satisfiability under the assumptions made since the last check"""
+        assumptions, self.assumptions = self.assumptions, []
+        return self.bzla.check_sat(*assumptions) == bitwuzla.Result.SAT
+
+    def check_sat_limited(self, deadline: float):
+        """Check satisfiability under the assumptions, giving up at a deadline"""
+        if not self.term_set:
+            limit = self.limit
+            self.bzla.configure_terminator(lambda: limit["deadline"] is not None and
+                time.perf_counter() > limit["deadline"])
+            self.term_set = True
+        assumptions, self.assumptions = self.assumptions, []
+        self.limit["deadline"] = deadline
+        try:
+            result = self.bzla.check_sat(*assumptions)
+        finally:
+            self.limit["deadline"] = None
+        if result == bitwuzla.Result.UNKNOWN:
+            return None
+        return result == bitwuzla.Result.SAT
+
+    def get_model(self):
+        """Get model as text, in Boolector's format"""
+        return "".join(f"{i} {self.bzla.get_value(var).value(2)} {name}\n"
+            for i, (name, var) in enumerate(self.vars))
+
+    def failed(self, expr) -> bool:
+        """Whether an assumption is in the core of the last unsatisfiable check"""
+        # Terms are hash-consed: this is the term that was assumed
+        return self.bzla.is_unsat_assumption(self.to_bool(expr))
+
+    def get_values(self, terms: dict) -> dict:
+        """Get model values"""
+        return {name: int(self.bzla.get_value(t).value(2), 2) for name, t in terms.items()}
+
+    def not_(self, a):
+        return self.term(Kind.BV_NOT, a)
+
+    def implies_(self, a, b):
+        return self.term(Kind.BV_OR, self.term(Kind.BV_NOT, a), b)
+
+    def iff_(self, a, b):
+        return self.term(Kind.BV_XNOR, a, b)
+
+    def add_(self, a, b):
+        return self.term(Kind.BV_ADD, a, b)
+
+    def sub_(self, a, b):
+        return self.term(Kind.BV_SUB, a, b)
+
+    def mul_(self, a, b):
+        return self.term(Kind.BV_MUL, a, b)
+
+    def sdiv_(self, a, b):
+        return self.term(Kind.BV_SDIV, a, b)
+
+    def udiv_(self, a, b):
+        return self.term(Kind.BV_UDIV, a, b)
+
+    def smod_(self, a, b):
+        return self.term(Kind.BV_SMOD, a, b)
+
+    def sll_(self, a, b):
+        return self.term(Kind.BV_SHL, a, b)
+
+    def srl_(self, a, b):
+        return self.term(Kind.BV_SHR, a, b)
+
+    def sra_(self, a, b):
+        return self.term(Kind.BV_ASHR, a, b)
+
+    def and_(self, a, b):
+        return self.term(Kind.BV_AND, a, b)
+
+    def or_(self, a, b):
+        return self.term(Kind.BV_OR, a, b)
+
+    def xor_(self, a, b):
+        return self.term(Kind.BV_XOR, a, b)
+
+    def concat_(self, a, b):
+        return self.term(Kind.BV_CONCAT, a, b)
+
+    def eq_(self, a, b):
+        if a.sort().is_array():
+            return self.to_bv(self.term(Kind.EQUAL, a, b))
+        return self.term(Kind.BV_COMP, a, b)
+
+    def neq_(self, a, b):
+        return self.term(Kind.BV_NOT, self.eq_(a, b))
+
+    def ugt_(self, a, b):
+        return self.to_bv(self.term(Kind.BV_UGT, a, b))
+
+    def sgt_(self, a, b):
+        return self.to_bv(self.term(Kind.BV_SGT, a, b))
+
+    def ugte_(self, a, b):
+        return self.to_bv(self.term(Kind.BV_UGE, a, b))
+
+    def sgte_(self, a, b):
+        return self.to_bv(self.term(Kind.BV_SGE, a, b))
+
+    def ult_(self, a, b):
+        return self.to_bv(self.term(Kind.BV_ULT, a, b))
+
+    def slt_(self, a, b):
+        return self.to_bv(self.term(Kind.BV_SLT, a, b))
+
+    def ulte_(self, a, b):
+        return self.to_bv(self.term(Kind.BV_ULE, a, b))
+
+    def slte_(self, a, b):
+        return self.to_bv(self.term(Kind.BV_SLE, a, b))
+
+    def uext_(self, a, b):
+        if b == 0:
+            return a
+        return self.term(Kind.BV_ZERO_EXTEND, a, indices=[b])
+
+    def ite_(self, a, b, c):
+        return self.term(Kind.ITE, self.to_bool(a), b, c)
+
+    def slice_(self, op, width, high, low):
+        return self.term(Kind.BV_EXTRACT, op, indices=[high, low])
+
+    def read_(self, a, i):
+        return self.term(Kind.ARRAY_SELECT, a, i)
+
+    def write_(self, a, i, v):
+        return self.term(Kind.ARRAY_STORE, a, i, v)
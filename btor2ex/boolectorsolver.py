@@ -8,23 +8,35 @@
     Boolector backend solver
 """
 
-import os
+import tempfile
+import time
 
-from .btorsolver import BTORSolver, BTORSort
+from .btorsolver import BTORArraySort, BTORSolver, BTORSort
 
 import pyboolector
 
 class BoolectorSolver(BTORSolver):
     
-    def __init__(self, id: str = "boolector"):
+    def __init__(self, id: str = "boolector", opts: dict[str, int] = None):
+        """
+        Args:
+            id (str, optional): solver id. Defaults to "boolector".
+            opts (dict[str, int], optional): extra Boolector options by name,
+                e.g. {"BTOR_OPT_REWRITE_LEVEL": 1}. Defaults to None.
+        """
         super().__init__(id)
         
         self.btor = pyboolector.Boolector()
         
         self.sort_cache = {}
+        # Clone the last limited check ran on, holding its model (None when
+        # the last check ran on btor itself)
+        self.clone : pyboolector.Boolector = None
         
         self.btor.Set_opt(pyboolector.BTOR_OPT_INCREMENTAL, 1)
         self.btor.Set_opt(pyboolector.BTOR_OPT_MODEL_GEN, 1)
+        for name, val in (opts or {}).items():
+            self.btor.Set_opt(getattr(pyboolector, name), val)
         # self.btor.Set_opt(pyboolector.BTOR_OPT_INCREMENTAL_RW, 1)
         # self.btor.Set_opt(pyboolector.BTOR_OPT_REWRITE_LEVEL, 0)
         # self.btor.Set_opt(pyboolector.BTOR_OPT_SORT_EXP, 0)
@@ -44,6 +56,8 @@ class BoolectorSolver(BTORSolver):
         
     def mk_var(self, name: str, sort: BTORSort):
         """Make var"""
+        if isinstance(sort, BTORArraySort):
+            return self.btor.Array(self.sort_cache[(sort.index, sort.width)], name)
         return self.btor.Var(self.sort_cache[sort.width], name)
     
     def mk_const(self, val: int, sort: BTORSort):
@@ -52,12 +66,22 @@ class BoolectorSolver(BTORSolver):
     
     def mk_sort(self, width: int) -> BTORSort:
         """Make bitvec sort"""
-        if width in self.sort_cache:
-            return self.sort_cache[width]
-        sort = self.btor.BitVecSort(width)
-        self.sort_cache[width] = sort
+        if width not in self.sort_cache:
+            self.sort_cache[width] = self.btor.BitVecSort(width)
         return BTORSort(width)
     
+    def mk_array_sort(self, index: BTORSort, element: BTORSort) -> BTORArraySort:
+        """Make array sort"""
+        key = (index.width, element.width)
+        if key not in self.sort_cache:
+            self.sort_cache[key] = self.btor.ArraySort(self.sort_cache[index.width],
+                self.sort_cache[element.width])
+        return BTORArraySort(element.width, index.width)
+    
+    def mk_const_array(self, sort: BTORArraySort, elem):
+        """Make constant array"""
+        return self.btor.ConstArray(self.sort_cache[(sort.index, sort.width)], elem)
+    
     def mk_assume(self, expr):
         """Make an assumption"""
         # NOTE: Assumptions are dropped after each check, 
@@ -70,15 +94,41 @@ class BoolectorSolver(BTORSolver):
         
     def check_sat(self):
         """Check satisfiability"""
+        self.clone = None
         return self.btor.Sat() == self.btor.SAT
     
+    def check_sat_limited(self, deadline: float):
+        """Check satisfiability, giving up at a deadline. A Boolector instance
+        that gave up gives up on every later check, so the check runs on a
+        clone (carrying the assumptions) and btor is left untouched."""
+        self.clone = self.btor.Clone()
+        self.btor.Reset_assumptions()
+        self.clone.Set_term(lambda deadline: time.perf_counter() > deadline, deadline)
+        result = self.clone.Sat()
+        if result == self.clone.UNKNOWN:
+            self.clone = None
+            return None
+        return result == self.clone.SAT
+    
     def get_model(self):
-        """Get model"""
-        self.btor.Print_model(outfile=".btormodel.tmp")
-        with open(".btormodel.tmp", "r") as f:
-            model = f.read()
-        os.remove('.btormodel.tmp')
-        return model
+        """Get model as text"""
+        # Private file so that concurrent engines do not clobber each other
+        with tempfile.NamedTemporaryFile("r", suffix=".btormodel") as f:
+            (self.clone or self.btor).Print_model(outfile=f.name)
+            return f.read()
+    
+    def model_node(self, expr):
+        """Node of the solver holding the last check's model"""
+        return expr if self.clone is None else self.clone.Match(expr)
+    
+    def failed(self, expr) -> bool:
+        """Whether an assumption is in the core of the last unsatisfiable check"""
+        return (self.clone or self.btor).Failed(self.model_node(expr))
+    
+    def get_values(self, terms: dict) -> dict:
+        """Get model values from the in-process assignment"""
+        # Don't-care bits are reported as 'x'
+        return {name: int(self.model_node(t).assignment.replace("x", "0"), 2) for name, t in terms.items()}
         
     def not_(self, a):
         return self.btor.Not(a)
@@ -99,13 +149,13 @@ class BoolectorSolver(BTORSolver):
         return self.btor.Mul(a, b)
     
     def sdiv_(self, a, b):
-        return self.btor.SDiv(a, b)
+        return self.btor.Sdiv(a, b)
     
     def udiv_(self, a, b):
-        return self.btor.UDiv(a, b)
+        return self.btor.Udiv(a, b)
     
     def smod_(self, a, b):
-        return self.btor.SMod(a, b)
+        return self.btor.Smod(a, b)
     
     def sll_(self, a, b):
         return self.btor.Sll(a, b)
@@ -167,6 +217,12 @@ class BoolectorSolver(BTORSolver):
     def slice_(self, op, width, high, low):
         return self.btor.Slice(op, high, low)
     
+    def read_(self, a, i):
+        return self.btor.Read(a, i)
+    
+    def write_(self, a, i, v):
+        return self.btor.Write(a, i, v)
+    
     def oplut(self):
         return {
             "and": self.and_,
@@ -195,6 +251,10 @@ class BoolectorSolver(BTORSolver):
             "uext" : self.uext_,
             "ite" : self.ite_,
             "slice" : self.slice_,
-            "not" : self.not_
+            "read" : self.read_,
+            "write" : self.write_,
+            "not" : self.not_,
+            "implies" : self.implies_,
+            "iff" : self.iff_
         }
         
\ No newline at end of file
@@ -9,39 +9,85 @@
 """
 
 import logging
-import sys
+import time
+from dataclasses import dataclass
+from typing import Iterator
 
 from btoropt import program as prg
 
+from . import bv
 from .btorsolver import BTORSolver
+from .compiler import CompiledProgram, Op, compile_program
+from .frames import Frame, mk_slots
+from .profiling import Profiler
+from .trace import Trace
 
 logger = logging.getLogger(__name__)
 
+@dataclass
+class CheckResult:
+    """Outcome of checking one bad at one depth"""
+    depth: int
+    lid: int
+    # Whether the bad is reachable, None if the check gave up
+    sat: bool | None
+    # Wall time of the check (s)
+    time: float
+
 class BTOR2Ex():
     """
         Symbolically execute a BTOR program: the barebones 
     """
-    def __init__(self, solver: BTORSolver, prog: list[prg.Instruction]):
+    def __init__(self, solver: BTORSolver, prog: list[prg.Instruction] | CompiledProgram,
+        init: bool = True, profiler: Profiler = None, pins: dict[int, list[int]] = None):
         """
         Args:
             solver (BTORSolver): backend solver
-            prog (list[prg.Instruction]): BTOR program
+            prog (list[prg.Instruction] | CompiledProgram): BTOR program
+            init (bool, optional): start from the initial values given by init
+                instructions, otherwise all states start free. Defaults to True.
+            profiler (Profiler, optional): records step and check times and
+                formula sizes. Defaults to None.
+            pins (dict[int, list[int]], optional): concrete values of inputs by
+                lid at each step, the last repeating, e.g. [1, 0] for a reset.
+                They only propagate as constants under a FoldingSolver. Defaults to None.
         """
         self.slv = solver
         self.prog = prog
+        self.init = init
+        self.profiler = profiler
+        # Inputs given concrete values, with the inputs the constraints tie
+        # to a constant (added by preprocess)
+        self.pins : dict[int, list[int]] = dict(pins or {})
+        # Non-constant initial values, asserted on the first frame
+        self.pending_inits : list[tuple] = []
+        # Compiled program and its bound handlers (built by preprocess)
+        self.cprog : CompiledProgram = None
+        self.code : list[tuple] = []
+        self.code_init : list[tuple] = []
         
         self.names = {}
         
-        # List of variable assignments
-        self.state : list[dict]  = []
+        # State and input terms of each frame (intermediates are released
+        # once a step is unrolled)
+        self.state : list[Frame]  = []
         # Bads 
-        self.bads : list[dict] = []
+        self.bads : list[Frame] = []
         # Constraints
-        self.assms : list[dict] = []
+        self.assms : list[Frame] = []
+        # Slot layouts shared by all frames
+        self.state_slots : dict[int, int] = {}
+        self.bad_slots : dict[int, int] = {}
+        self.assm_slots : dict[int, int] = {}
         # Next mappings
         self.nexts : dict = {}
         # Sorts
         self.sorts : dict = {}
+        # Number of frames whose constraints are asserted
+        self.nasserted : int = 0
+        # Counterexample of the last failing check, and per bad for bmc_props
+        self.trace : Trace = None
+        self.traces : dict[int, Trace] = {}
         
         
         self.oplut = self.slv.oplut()
@@ -51,49 +97,89 @@ class BTOR2Ex():
     
     def preprocess (self):
         """
-        Make a pass over the program without execution, gathers state and input information
+        Make a pass over the program without execution: compiles the program
+        to a flat instruction table and loads the first frame
         """
         assert len(self.state) == 0, "State must be empty for preprocessing"
         
         logger.debug("Preprocessing and loading first frame.")
         
-        new_state_f = {}
-        
-        for inst in self.prog:
-            # This is a sort instruction
-            if isinstance(inst, prg.Sort):
-                if inst.typ != "bitvec" and inst.typ != "bitvector":
-                    logger.error("Unsupported sort %s", inst)
-                    sys.exit(1)
-                # Create the sort
-                if inst.lid not in self.sorts:
-                    self.sorts[inst.lid] = self.slv.mk_sort(inst.width)
-            elif isinstance(inst, prg.Input):
-                # Create a new input
-                self.names[inst.name] = inst.lid
-            elif isinstance(inst, prg.State):
-                # Create a new state
-                new_state_f[inst.lid] = self.slv.mk_var(
-                    self.mk_name(inst.name, 1), self.sorts[inst.sid])
-                self.names[inst.name] = inst.lid
-            elif isinstance(inst, prg.Uext):
-                # Handle Uexts which are creating new name bindings
-                # TODO: might have to handle the recursive aliasing case/if there is more logic
-                if inst.renaming:
-                    self.names[inst.name] = inst.aliasid
-            elif isinstance(inst, prg.Next):
-                # Record mapping from state to next
-                self.nexts[inst.lid] = inst.stid
-            elif isinstance(inst, prg.Output):
-                # Outputs are ignored
-                pass
+        if isinstance(self.prog, CompiledProgram):
+            self.cprog = self.prog
+        else:
+            self.cprog = compile_program(self.prog)
+        
+        for sid, width in self.cprog.sorts.items():
+            self.sorts[sid] = self.slv.mk_sort(width)
+        for sid, (isid, esid) in self.cprog.arrays.items():
+            self.sorts[sid] = self.slv.mk_array_sort(self.sorts[isid], self.sorts[esid])
+        self.names = self.cprog.names
+        self.nexts = dict(self.cprog.nexts)
+        # Pins of inputs outside the program (e.g. removed by COI) are dropped
+        inputs = {lid for lid, _, _ in self.cprog.inputs}
+        self.pins = {lid: vals for lid, vals in self.pins.items() if lid in inputs}
+        for lid, val in self.cprog.pinned_inputs().items():
+            self.pins.setdefault(lid, [val])
+        if self.pins:
+            logger.info("Pinned %d of %d inputs", len(self.pins), len(self.cprog.inputs))
+        self.state_slots = mk_slots([lid for lid, _, _ in self.cprog.states + self.cprog.inputs])
+        self.bad_slots = mk_slots([lid for lid, _ in self.cprog.bads])
+        self.assm_slots = mk_slots([lid for lid, _ in self.cprog.constraints])
+        
+        inits = dict(self.cprog.inits) if self.init else {}
+        consts = self.cprog.const_values() if inits else {}
+        new_state_f = Frame(self.state_slots)
+        for lid, sid, name in self.cprog.states:
+            if inits.get(lid) in consts:
+                # Constant initial values are substituted into the first frame
+                new_state_f[lid] = self.mk_init(sid,
+                    self.slv.mk_const(consts[inits[lid]], self.slv.mk_sort(self.cprog.sort_width(sid))))
+            else:
+                new_state_f[lid] = self.slv.mk_var(self.mk_name(name, 1), self.sorts[sid])
+        self.pending_inits = [(lid, sid, inits[lid]) for lid, sid, _ in self.cprog.states
+            if lid in inits and inits[lid] not in consts]
+        
+        # Resolve each instruction to its handler once, keeping only the logic
+        # feeding the transition and properties (and the initial values for the first frame)
+        step_cone = self.cprog.cone([v for _, v in self.cprog.nexts + self.cprog.constraints + self.cprog.bads])
+        init_cone = self.cprog.cone([v for _, _, v in self.pending_inits])
+        self.code = [(self.bind(op), op.lid, op.args) for op in self.cprog.ops if op.lid in step_cone]
+        self.code_init = [(self.bind(op), op.lid, op.args) for op in self.cprog.ops
+            if op.lid in step_cone or op.lid in init_cone]
 
         self.state.append(new_state_f)
         logger.debug("Preprocessing complete")
         logger.debug("Sorts: %s", self.sorts)
         logger.debug("State: %s", self.state)
         logger.debug("Names: %s", self.names)
-        return        
+        return
+    
+    def mk_init (self, sid: int, val):
+        """Initial value of a state: arrays initialized with an element hold it at every index"""
+        if sid in self.cprog.arrays:
+            return self.slv.mk_const_array(self.sorts[sid], val)
+        return val
+    
+    def bind (self, op: Op):
+        """Resolve a compiled instruction to a solver handler over its operand terms"""
+        slv = self.slv
+        width = self.cprog.widths[op.lid]
+        match op.opcode:
+            case "const":
+                val, sort = op.params[0], slv.mk_sort(width)
+                return lambda: slv.mk_const(val, sort)
+            case "not":
+                return slv.not_
+            case "ite":
+                return slv.ite_
+            case "uext":
+                ext = op.params[0]
+                return lambda a: slv.uext_(a, ext)
+            case "slice":
+                high, low = op.params
+                return lambda a: slv.slice_(a, width, high, low)
+            case _:
+                return self.oplut[op.opcode]
         
     def execute (self):
         """Symbolically unroll the program by one step"""
@@ -101,129 +187,203 @@ class BTOR2Ex():
         if step == 0:
             self.preprocess()
             step += 1
+        start = time.perf_counter() if self.profiler is not None else 0.0
         
-        curr_f = {}
-        # curr_inputs_f = {}
-        curr_assms_f = {}
-        curr_bads_f = {}
-        next_state_f = {}
-
-        # Deepcopy the current state
-        for id, expr in self.state[-1].items():
-            curr_f[id] = expr
+        # Working copy of the current state, holding the step's intermediates
+        frame = self.state[-1]
+        curr_f = dict(frame.items())
         
-        for inst in self.prog:
-            
-            # This is a sort instruction
-            if isinstance(inst, prg.Sort):
-                # Already preprocessed
-                pass
-            elif isinstance(inst, prg.Input):
-                # Create a new input
-                new_inputs = self.slv.mk_var(
-                    self.mk_name(inst.name, step), self.sorts[inst.sid])
-                curr_f[inst.lid] = new_inputs
-                # curr_inputs_f[inst.lid] = new_inputs
-            elif isinstance(inst, prg.State):
-                # Already preprocssed
-                pass
-            elif isinstance(inst, prg.Output):
-                # Outputs are ignored
-                pass
-            elif isinstance(inst, prg.Init):
-                logger.error("Input instructions are not supported %s", inst)
-                sys.exit(1)
-            elif isinstance(inst, prg.Next):
-                next_state_f[self.nexts[inst.lid]] = curr_f[inst.operands[2].lid]
-            elif isinstance(inst, prg.Constraint):
-                curr_assms_f[inst.lid] = (curr_f[inst.operands[0].lid])
-            elif isinstance(inst, prg.Const):
-                curr_f[inst.lid] = self.slv.mk_const(inst.value, self.sorts[inst.sid])
-            elif isinstance(inst, prg.Zero):
-                curr_f[inst.lid] = self.slv.mk_const(0, self.sorts[inst.sid])
-            elif isinstance(inst, prg.One):
-                curr_f[inst.lid] = self.slv.mk_const(1, self.sorts[inst.sid])
-            elif isinstance(inst, prg.Ones):
-                logger.error("Ones instructions are not supported %s", inst)
-                sys.exit(1)
-            elif isinstance(inst, prg.Bad):
-                # Record bad
-                curr_bads_f[inst.lid] = curr_f[inst.operands[0].lid]
+        for lid, sid, name in self.cprog.inputs:
+            if lid in self.pins:
+                # Pinned inputs stay constants, folded away by a FoldingSolver
+                vals = self.pins[lid]
+                curr_f[lid] = frame[lid] = self.slv.mk_const(
+                    vals[min(step, len(vals)) - 1] & bv.mask(self.cprog.widths[lid]), self.sorts[sid])
             else:
-                match inst.__class__: 
-                    # Unary instructions
-                    case prg.Not:
-                        op1 = curr_f[inst.operands[1].lid]
-                        curr_f[inst.lid] = self.not_(op1)
-                    # Binary instructions
-                    case prg.Add | prg.Sub | prg.Mul | prg.Sdiv | prg.Udiv | prg.Smod | prg.Sll \
-                        | prg.Srl | prg.Sra | prg.And | prg.Or | prg.Xor | prg.Concat \
-                        | prg.Eq | prg.Neq | prg.Ugt | prg.Sgt | prg.Ugte | prg.Sgte \
-                        | prg.Ult | prg.Slt | prg.Ulte | prg.Slte:
-                        op1 = curr_f[inst.operands[1].lid]
-                        op2 = curr_f[inst.operands[2].lid]
-                        curr_f[inst.lid] = self.oplut[inst.inst](op1, op2)
-                    case prg.Ite:
-                        opc = curr_f[inst.operands[1].lid]
-                        opt = curr_f[inst.operands[2].lid]
-                        ope = curr_f[inst.operands[3].lid]
-                        curr_f[inst.lid] = self.slv.ite_(opc, opt, ope)
-                    case prg.Uext:
-                        op1 = curr_f[inst.operands[1].lid]
-                        width = inst.operands[2]
-                        curr_f[inst.lid] = self.slv.uext_(op1, width)
-                    case prg.Slice:
-                        sort = inst.operands[0]
-                        op1 = curr_f[inst.operands[1].lid]
-                        high = inst.lowbit+inst.width-1
-                        low = inst.lowbit
-                        curr_f[inst.lid] = self.slv.slice_(op1, sort.width, high, low)
-                    case _:
-                        logger.error("Unknown instruction %s", inst)
-                        sys.exit(1)
-        
-        # for ip, v in curr_inputs_f.items():
-        self.state[-1] = curr_f
-        # [ip] = v
-        # Push the next state onto the stack
+                curr_f[lid] = frame[lid] = self.slv.mk_var(self.mk_name(name, step), self.sorts[sid])
+        
+        for fn, lid, args in (self.code_init if step == 1 else self.code):
+            curr_f[lid] = fn(*[curr_f[a] for a in args])
+        if step == 1:
+            for stid, sid, vlid in self.pending_inits:
+                val = curr_f[vlid]
+                if vlid not in self.cprog.array_lids:
+                    val = self.mk_init(sid, val)
+                self.slv.mk_assert(self.slv.eq_(curr_f[stid], val))
+        
+        next_state_f = Frame(self.state_slots)
+        for stid, vlid in self.cprog.nexts:
+            next_state_f[stid] = curr_f[vlid]
+        # States without a next function are unconstrained at every step
+        for lid, sid, name in self.cprog.states:
+            if lid not in next_state_f:
+                next_state_f[lid] = self.slv.mk_var(self.mk_name(name, step+1), self.sorts[sid])
+        curr_assms_f = Frame(self.assm_slots, [curr_f[clid] for _, clid in self.cprog.constraints])
+        curr_bads_f = Frame(self.bad_slots, [curr_f[clid] for _, clid in self.cprog.bads])
+        
+        # Push the next state onto the stack; curr_f and the intermediates
+        # only it references are released on return
         self.state.append(next_state_f)
         self.bads.append(curr_bads_f)
         self.assms.append(curr_assms_f)
         
         
-        logger.debug("Unrolled step %d", step)
+        if self.profiler is not None:
+            self.profiler.frame(step, start, time.perf_counter() - start, terms=len(curr_f),
+                kept=len(frame) + len(curr_bads_f) + len(curr_assms_f), bytes=self.frame_bytes(step - 1))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Unrolled step %d: kept %d terms (%d bytes), released %d intermediates", step,
+                len(frame) + len(curr_bads_f) + len(curr_assms_f), self.frame_bytes(step - 1),
+                len(curr_f) - len(frame))
         logger.debug("State: %s", next_state_f)
         logger.debug("Bads: %s", curr_bads_f)
         logger.debug("Assms: %s", curr_assms_f)
         
-    def bmc (self, d=1) -> bool:
+    def frame_bytes (self, i: int) -> int:
+        """Python-side memory kept for an unrolled frame
+        Args:
+            i (int): frame index
+        Returns:
+            int: bytes of the frame's state, bad and constraint storage
+        """
+        return self.state[i].nbytes() + self.bads[i].nbytes() + self.assms[i].nbytes()
+        
+    def get_trace (self, bads: list[int] = ()) -> Trace:
+        """Read the states and inputs of all unrolled frames from the model
+        Args:
+            bads (list[int], optional): bads reached at the last frame
+        Returns:
+            Trace: counterexample trace
+        """
+        trace = Trace(self.cprog)
+        trace.bads = list(bads)
+        for frame in self.state[:len(self.bads)]:
+            # Array contents are not part of the trace
+            terms = {lid: frame[lid] for lid, sid, _ in self.cprog.states + self.cprog.inputs
+                if sid not in self.cprog.arrays}
+            trace.steps.append(self.slv.get_values(terms))
+        return trace
+        
+    def check (self, lid: int, depth: int, deadline: float = None) -> bool | None:
+        """Check satisfiability, recording the time against a bad when profiling
+        Args:
+            lid (int): bad being checked
+            depth (int): depth of the check
+            deadline (float, optional): time.perf_counter() value to give up at. Defaults to None.
+        Returns:
+            bool | None: is the query SAT, None if the check gave up
+        """
+        check_sat = self.slv.check_sat if deadline is None else lambda: self.slv.check_sat_limited(deadline)
+        if self.profiler is None:
+            return check_sat()
+        start = time.perf_counter()
+        result = check_sat()
+        self.profiler.check(lid, depth, start, time.perf_counter() - start, result)
+        return result
+        
+    def assert_constraints (self):
+        """Permanently assert the constraints of every frame not yet asserted"""
+        for assmdict in self.assms[self.nasserted:]:
+            for _, assm in assmdict.items():
+                self.slv.mk_assert(assm)
+        self.nasserted = len(self.assms)
+        
+    def bmc (self, d=1, incremental=True) -> bool:
         """Perform BMC on the program
         Args:
             d (int, optional): BMC depth. Defaults to 1.
+            incremental (bool, optional): assert each frame's constraints once
+                and check each bad under a single assumption. Otherwise all
+                constraints are re-assumed for every bad. Defaults to True.
         Returns:
             bool: is the program safe (UNSAT)
         """
         for i in range(d):
             # Unroll
             self.execute()
+            if incremental:
+                self.assert_constraints()
             # Check
             baddict = self.bads[-1]
-            for _, bad in baddict.items():
-                # Apply all assumptions
-                for assmdict in self.assms:
-                    for _, assm in assmdict.items():
-                        self.slv.mk_assume(assm)
-                self.slv.mk_assert(bad)
-                result = self.slv.check_sat()
+            for lid, bad in baddict.items():
+                if incremental:
+                    self.slv.mk_assume(bad)
+                else:
+                    # Apply all assumptions, the bad only for this check
+                    for assmdict in self.assms:
+                        for _, assm in assmdict.items():
+                            self.slv.mk_assume(assm)
+                    self.slv.mk_assume(bad)
+                result = self.check(lid, i)
                 logger.debug("At depth %d, result %s", i, "BUG" if result else "SAFE")
                 if result:
                     logger.debug("Found a bug")
-                    model = self.slv.get_model()
-                    logger.debug("Model:\n%s", model)
+                    self.trace = self.get_trace([lid])
+                    logger.debug("Trace:\n%s", self.trace)
                     return False
             
             logger.debug("No bug found at depth %d", i)
         
         # Safe
         return True
+    
+    def bmc_iter (self, d=1, props: list[int] = None, deadline: float = None,
+        timeout: float = None, when: dict[int, set[int]] = None) -> Iterator[CheckResult]:
+        """Perform incremental BMC, yielding each check as soon as it is decided.
+        Bads falsified or given up on are dropped from later depths, and no
+        further depth is unrolled once the deadline has passed or no bad
+        remains to be checked.
+        Args:
+            d (int, optional): BMC depth. Defaults to 1.
+            props (list[int], optional): bad lids to check. Defaults to all bads.
+            deadline (float, optional): time.perf_counter() value to stop at. Defaults to None.
+            timeout (float, optional): seconds allowed per check. Defaults to None.
+            when (dict[int, set[int]], optional): depths at which a bad is checked.
+                Defaults to every depth for every bad.
+        Yields:
+            CheckResult: outcome of checking one bad at one depth
+        """
+        if len(self.state) == 0:
+            self.preprocess()
+        live = [lid for lid, _ in self.cprog.bads] if props is None else list(props)
+        when = when or {}
+        for _ in range(d):
+            depth = len(self.bads)
+            # Bads with no check left at this depth or deeper
+            live = [lid for lid in live if lid not in when or any(i >= depth for i in when[lid])]
+            if not live or (deadline is not None and time.perf_counter() >= deadline):
+                return
+            self.execute()
+            self.assert_constraints()
+            for lid in [lid for lid in live if lid not in when or depth in when[lid]]:
+                start = time.perf_counter()
+                limit = deadline
+                if timeout is not None:
+                    limit = min(start + timeout, deadline or float("inf"))
+                self.slv.mk_assume(self.bads[-1][lid])
+                sat = self.check(lid, depth, limit)
+                if sat:
+                    logger.debug("Bad %d falsified at depth %d", lid, depth)
+                    self.traces[lid] = self.get_trace([lid])
+                if sat is not False:
+                    live.remove(lid)
+                yield CheckResult(depth, lid, sat, time.perf_counter() - start)
+            logger.debug("Depth %d: %d bads remaining", depth, len(live))
 
+    def bmc_props (self, d=1, props: list[int] = None) -> dict[int, int]:
+        """Perform incremental BMC tracking every bad separately
+        Args:
+            d (int, optional): BMC depth. Defaults to 1.
+            props (list[int], optional): bad lids to check. Defaults to all bads.
+        Returns:
+            dict[int, int]: depth at which each bad is falsified (None if safe up to d)
+        """
+        if len(self.state) == 0:
+            self.preprocess()
+        if props is None:
+            props = [lid for lid, _ in self.cprog.bads]
+        verdicts = {lid: None for lid in props}
+        for result in self.bmc_iter(d, props):
+            if result.sat:
+                verdicts[result.lid] = result.depth
+        return verdicts
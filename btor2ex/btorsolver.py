@@ -14,6 +14,11 @@ from dataclasses import dataclass
 class BTORSort:
     width: int
 
+@dataclass
+class BTORArraySort(BTORSort):
+    """Array sort: `width` is the element width"""
+    index: int
+
 class BTORSolver:
     
     def __init__(self, id: str):
@@ -28,6 +33,13 @@ class BTORSolver:
     def mk_sort(self, width: int) -> BTORSort:
         pass
     
+    def mk_array_sort(self, index: BTORSort, element: BTORSort) -> BTORArraySort:
+        pass
+    
+    def mk_const_array(self, sort: BTORArraySort, elem):
+        """Make an array holding elem at every index"""
+        pass
+    
     def mk_assume(self, expr):
         pass
     
@@ -37,8 +49,31 @@ class BTORSolver:
     def check_sat(self) -> bool:
         pass
     
+    def check_sat_limited(self, deadline: float) -> bool | None:
+        """Check satisfiability, giving up at a deadline
+        Args:
+            deadline (float): time.perf_counter() value
+        Returns:
+            bool | None: is the query SAT, None if the check gave up.
+                Backends that cannot be interrupted run to completion.
+        """
+        return self.check_sat()
+    
     def get_model(self):
         pass
+    
+    def failed(self, expr) -> bool:
+        """Whether an assumption is in the core of the last unsatisfiable check"""
+        pass
+    
+    def get_values(self, terms: dict) -> dict:
+        """Get the model values of terms after a satisfiable check
+        Args:
+            terms (dict): terms by name
+        Returns:
+            dict: values (as unsigned ints) by name
+        """
+        pass
         
     def not_(self, a):
         pass
@@ -127,6 +162,12 @@ class BTORSolver:
     def slice_(self, op, width, high, low):
         pass
     
+    def read_(self, a, i):
+        pass
+    
+    def write_(self, a, i, v):
+        pass
+    
     def oplut(self):
         return {
             "and": self.and_,
@@ -155,5 +196,9 @@ class BTORSolver:
             "uext" : self.uext_,
             "ite" : self.ite_,
             "slice" : self.slice_,
-            "not" : self.not_
+            "read" : self.read_,
+            "write" : self.write_,
+            "not" : self.not_,
+            "implies" : self.implies_,
+            "iff" : self.iff_
         }
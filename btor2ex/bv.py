@@ -0,0 +1,89 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Concrete bit-vector semantics over Python integers
+"""
+
+def mask (width: int) -> int:
+    return (1 << width) - 1
+
+def signed (val: int, width: int) -> int:
+    """Two's complement interpretation of an unsigned value"""
+    return val - (1 << width) if val >> (width - 1) else val
+
+def sdiv (a: int, b: int, w: int) -> int:
+    sa, sb = signed(a, w), signed(b, w)
+    if sb == 0:
+        # Division by zero yields all ones for positive dividends, 1 otherwise
+        return mask(w) if sa >= 0 else 1
+    q = abs(sa) // abs(sb)
+    return (-q if (sa < 0) != (sb < 0) else q) & mask(w)
+
+def smod (a: int, b: int, w: int) -> int:
+    sa, sb = signed(a, w), signed(b, w)
+    if sb == 0:
+        return a
+    # Sign follows the divisor
+    return (sa % sb) & mask(w)
+
+def sra (a: int, b: int, w: int) -> int:
+    return (signed(a, w) >> min(b, w)) & mask(w)
+
+# Binary operators as (a, b, operand width) -> result
+BINOPS = {
+    "and": lambda a, b, w: a & b,
+    "or": lambda a, b, w: a | b,
+    "xor": lambda a, b, w: a ^ b,
+    "add": lambda a, b, w: (a + b) & mask(w),
+    "sub": lambda a, b, w: (a - b) & mask(w),
+    "mul": lambda a, b, w: (a * b) & mask(w),
+    "udiv": lambda a, b, w: a // b if b else mask(w),
+    "sdiv": sdiv,
+    "smod": smod,
+    "sll": lambda a, b, w: (a << b) & mask(w) if b < w else 0,
+    "srl": lambda a, b, w: a >> b if b < w else 0,
+    "sra": sra,
+    "eq": lambda a, b, w: int(a == b),
+    "neq": lambda a, b, w: int(a != b),
+    "ugt": lambda a, b, w: int(a > b),
+    "sgt": lambda a, b, w: int(signed(a, w) > signed(b, w)),
+    "ugte": lambda a, b, w: int(a >= b),
+    "sgte": lambda a, b, w: int(signed(a, w) >= signed(b, w)),
+    "ult": lambda a, b, w: int(a < b),
+    "slt": lambda a, b, w: int(signed(a, w) < signed(b, w)),
+    "ulte": lambda a, b, w: int(a <= b),
+    "slte": lambda a, b, w: int(signed(a, w) <= signed(b, w)),
+    "implies": lambda a, b, w: int(not a or bool(b)),
+    "iff": lambda a, b, w: int(a == b),
+}
+
+def apply (opcode: str, params: tuple, vals: list[int], widths: list[int]) -> int:
+    """Evaluate a compiled instruction on concrete operands
+    Args:
+        opcode (str): instruction opcode
+        params (tuple): instruction immediates
+        vals (list[int]): operand values
+        widths (list[int]): operand widths
+    Returns:
+        int: result value
+    """
+    match opcode:
+        case "const":
+            return params[0]
+        case "not":
+            return ~vals[0] & mask(widths[0])
+        case "ite":
+            return vals[1] if vals[0] else vals[2]
+        case "uext":
+            return vals[0]
+        case "slice":
+            high, low = params
+            return (vals[0] >> low) & mask(high - low + 1)
+        case "concat":
+            return (vals[0] << widths[1]) | vals[1]
+        case _:
+            return BINOPS[opcode](vals[0], vals[1], widths[0])
@@ -0,0 +1,116 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    On-disk cache of compiled programs keyed by the input's content hash
+"""
+
+import contextlib
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "btor2ex", "programs")
+# Entries are invalidated whenever the stored form changes
+FORMAT = 1
+SUFFIX = ".btorc"
+
+def digest (input: str, **options) -> str:
+    """Content hash of a BTOR2 file compiled with the given options"""
+    h = hashlib.sha256()
+    # In chunks rather than with hashlib.file_digest, which needs Python 3.11
+    with open(input, "rb") as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    h.update(repr((FORMAT, sorted(options.items()))).encode())
+    return h.hexdigest()
+
+class ProgramCache():
+    """
+        Compiled programs stored as compressed pickles, one file per entry.
+        Hits refresh the entry's modification time, so eviction drops the
+        least recently used entries first.
+    """
+    def __init__(self, path: str = CACHE_DIR, max_bytes: int = 1 << 30,
+        max_age: float = 30 * 24 * 3600):
+        """
+        Args:
+            path (str, optional): cache directory. Defaults to CACHE_DIR.
+            max_bytes (int, optional): total size kept after eviction. Defaults to 1 GiB.
+            max_age (float, optional): seconds an unused entry is kept. Defaults to 30 days.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(path, exist_ok=True)
+
+    def key (self, input: str, **options) -> str:
+        """Key of a BTOR2 file compiled with the given options"""
+        return digest(input, **options)
+
+    def entry (self, key: str) -> str:
+        return os.path.join(self.path, key + SUFFIX)
+
+    def get (self, key: str):
+        """Cached value, None on a miss"""
+        entry = self.entry(key)
+        try:
+            with open(entry, "rb") as f:
+                value = pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            return None
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError) as e:
+            logger.warning("Dropping unreadable cache entry %s: %s", entry, e)
+            self.drop(entry)
+            return None
+        os.utime(entry)
+        logger.info("Cache hit %s", key[:12])
+        return value
+
+    def put (self, key: str, value):
+        """Store a value and evict old entries"""
+        data = zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        # Written aside and renamed, so that concurrent runs never read partial entries
+        fd, tmp = tempfile.mkstemp(dir=self.path)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.entry(key))
+        logger.info("Cached %s (%d bytes)", key[:12], len(data))
+        self.evict()
+
+    def drop (self, entry: str):
+        # Concurrent runs may evict the same entry
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(entry)
+
+    def evict (self):
+        """Drop entries older than max_age, then the least recently used beyond max_bytes"""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith(SUFFIX):
+                continue
+            path = os.path.join(self.path, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if now - st.st_mtime > self.max_age:
+                self.drop(path)
+            else:
+                entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.drop(path)
+            total -= size
@@ -0,0 +1,104 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Cone of influence reduction
+"""
+
+import logging
+
+from btoropt import Pass
+from btoropt import program as prg
+
+from .compiler import CompiledProgram
+
+logger = logging.getLogger(__name__)
+
+class COI(Pass):
+    """Cone of influence of the bads and constraints"""
+
+    def __init__(self, props: list[int] = None) -> None:
+        """
+        Args:
+            props (list[int], optional): bad lids to keep. Defaults to all bads.
+        """
+        super().__init__("coi")
+        self.props = props
+
+    def cone (self, p: list[prg.Instruction]) -> set[int]:
+        """Compute the transitive fan-in of the properties through next edges
+        Args:
+            p (list[prg.Instruction]): BTOR program
+        Returns:
+            set[int]: lids of the relevant instructions
+        """
+        # Transitions attached to each state
+        trans: dict[int, list[prg.Instruction]] = {}
+        for inst in p:
+            if isinstance(inst, (prg.Next, prg.Init)):
+                trans.setdefault(inst.operands[1].lid, []).append(inst)
+
+        worklist = [inst for inst in p if isinstance(inst, prg.Constraint) or
+            (isinstance(inst, prg.Bad) and (self.props is None or inst.lid in self.props))]
+        visited = set()
+        while worklist:
+            inst = worklist.pop()
+            if inst.lid in visited:
+                continue
+            visited.add(inst.lid)
+            worklist.extend(op for op in inst.operands if isinstance(op, prg.Instruction))
+            if isinstance(inst, prg.State):
+                worklist.extend(trans.get(inst.lid, []))
+        return visited
+
+    def run (self, p: list[prg.Instruction]) -> list[prg.Instruction]:
+        """Run pass"""
+        visited = self.cone(p)
+        reduced = [inst for inst in p if inst.lid in visited]
+        logger.info("COI: kept %d of %d instructions (reduction %.2fx)",
+            len(reduced), len(p), len(p) / max(len(reduced), 1))
+        return reduced
+
+    def reduce (self, cprog: CompiledProgram) -> CompiledProgram:
+        """Run on a compiled program
+        Args:
+            cprog (CompiledProgram): compiled program
+        Returns:
+            CompiledProgram: program restricted to the cone of influence
+        """
+        trans: dict[int, list[int]] = {}
+        for stid, vlid in cprog.nexts + cprog.inits:
+            trans.setdefault(stid, []).append(vlid)
+        byid = {op.lid: op for op in cprog.ops}
+        worklist = [clid for _, clid in cprog.constraints]
+        worklist += [clid for lid, clid in cprog.bads if self.props is None or lid in self.props]
+        visited = set()
+        while worklist:
+            lid = worklist.pop()
+            if lid in visited:
+                continue
+            visited.add(lid)
+            if lid in byid:
+                worklist.extend(byid[lid].args)
+            worklist.extend(trans.get(lid, []))
+
+        reduced = CompiledProgram()
+        reduced.sorts, reduced.arrays, reduced.alias = cprog.sorts, cprog.arrays, cprog.alias
+        reduced.states = [st for st in cprog.states if st[0] in visited]
+        reduced.inputs = [inp for inp in cprog.inputs if inp[0] in visited]
+        reduced.ops = [op for op in cprog.ops if op.lid in visited]
+        reduced.nexts = [nx for nx in cprog.nexts if nx[0] in visited]
+        reduced.inits = [init for init in cprog.inits if init[0] in visited]
+        reduced.constraints = list(cprog.constraints)
+        reduced.bads = [bad for bad in cprog.bads if self.props is None or bad[0] in self.props]
+        reduced.names = {name: lid for name, lid in cprog.names.items() if lid in visited}
+        reduced.widths = {lid: w for lid, w in cprog.widths.items() if lid in visited}
+        reduced.array_lids = cprog.array_lids & visited
+        total = len(cprog.states) + len(cprog.inputs) + len(cprog.ops)
+        kept = len(reduced.states) + len(reduced.inputs) + len(reduced.ops)
+        logger.info("COI: kept %d of %d instructions (reduction %.2fx)",
+            kept, total, total / max(kept, 1))
+        return reduced
@@ -0,0 +1,293 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Lower a BTOR program to a flat instruction table
+"""
+
+import logging
+import sys
+from typing import NamedTuple
+
+from btoropt import program as prg
+
+from . import bv
+
+logger = logging.getLogger(__name__)
+
+# Operators taking two operands (see BTORSolver.oplut)
+BINOPS = {
+    "and", "or", "xor", "add", "sub", "mul", "udiv", "sdiv", "smod",
+    "sll", "srl", "sra", "concat", "eq", "neq", "ugt", "sgt", "ugte",
+    "sgte", "ult", "slt", "ulte", "slte", "implies", "iff"
+}
+# Operators producing a single bit
+PREDICATES = {
+    "eq", "neq", "ugt", "sgt", "ugte", "sgte", "ult", "slt", "ulte", "slte",
+    "implies", "iff"
+}
+
+class Op(NamedTuple):
+    """Compiled instruction: opcode, result lid, operand lids and immediates"""
+    opcode: str
+    lid: int
+    args: tuple
+    params: tuple = ()
+
+class CompiledProgram():
+    """
+        Solver independent, topologically ordered form of a BTOR program.
+        Combinational logic lives in `ops`, everything else (declarations,
+        transitions and properties) is kept in flat side tables.
+    """
+    def __init__(self):
+        # Sort widths
+        self.sorts : dict[int, int] = {}
+        # Array sorts as (index sid, element sid)
+        self.arrays : dict[int, tuple] = {}
+        # State and input declarations as (lid, sid, name)
+        self.states : list[tuple] = []
+        self.inputs : list[tuple] = []
+        # Combinational instructions
+        self.ops : list[Op] = []
+        # Next mappings and initial values as (state lid, value lid)
+        self.nexts : list[tuple] = []
+        self.inits : list[tuple] = []
+        # Constraints and bads as (lid, condition lid)
+        self.constraints : list[tuple] = []
+        self.bads : list[tuple] = []
+        # Signal names
+        self.names : dict[str, int] = {}
+        # Result width of every value-producing lid (element width for arrays)
+        self.widths : dict[int, int] = {}
+        # Array-valued lids
+        self.array_lids : set[int] = set()
+        # Zero-width uexts resolve to the lid they rename
+        self.alias : dict[int, int] = {}
+
+    def resolve (self, lid: int) -> int:
+        """Follow uext renamings down to the defining lid"""
+        while lid in self.alias:
+            lid = self.alias[lid]
+        return lid
+
+    def add_sort (self, lid: int, width: int):
+        self.sorts[lid] = width
+
+    def add_array_sort (self, lid: int, isid: int, esid: int):
+        self.arrays[lid] = (isid, esid)
+
+    def sort_width (self, sid: int) -> int:
+        """Width of a sort, the element width for arrays"""
+        if sid in self.arrays:
+            return self.sorts[self.arrays[sid][1]]
+        return self.sorts[sid]
+
+    def add_state (self, lid: int, sid: int, name: str):
+        self.states.append((lid, sid, name))
+        self.widths[lid] = self.sort_width(sid)
+        self.names[name] = lid
+        if sid in self.arrays:
+            self.array_lids.add(lid)
+
+    def add_input (self, lid: int, sid: int, name: str):
+        self.inputs.append((lid, sid, name))
+        self.widths[lid] = self.sort_width(sid)
+        self.names[name] = lid
+        if sid in self.arrays:
+            self.array_lids.add(lid)
+
+    def add_rename (self, lid: int, name: str, target: int):
+        self.alias[lid] = target
+        self.names[name] = self.resolve(target)
+
+    def add_next (self, stid: int, vlid: int):
+        self.nexts.append((stid, self.resolve(vlid)))
+
+    def add_init (self, stid: int, vlid: int):
+        self.inits.append((stid, self.resolve(vlid)))
+
+    def add_constraint (self, lid: int, clid: int):
+        self.constraints.append((lid, self.resolve(clid)))
+
+    def add_bad (self, lid: int, clid: int):
+        self.bads.append((lid, self.resolve(clid)))
+
+    def add_op (self, opcode: str, lid: int, args: tuple, params: tuple = ()):
+        args = tuple(self.resolve(a) for a in args)
+        self.ops.append(Op(opcode, lid, args, params))
+        self.widths[lid] = self.op_width(opcode, args, params)
+        if opcode == "write" or (opcode == "ite" and args[1] in self.array_lids):
+            self.array_lids.add(lid)
+
+    def op_width (self, opcode: str, args: tuple, params: tuple) -> int:
+        """Width of the value produced by an instruction"""
+        match opcode:
+            case "const":
+                return params[1]
+            case "concat":
+                return self.widths[args[0]] + self.widths[args[1]]
+            case "uext":
+                return self.widths[args[0]] + params[0]
+            case "slice":
+                return params[0] - params[1] + 1
+            case "ite":
+                return self.widths[args[1]]
+            case _ if opcode in PREDICATES:
+                return 1
+            case _:
+                return self.widths[args[0]]
+
+    def cone (self, roots: list[int]) -> set[int]:
+        """Lids of the instructions the given lids depend on within a step"""
+        byid = {op.lid: op for op in self.ops}
+        visited, worklist = set(), list(roots)
+        while worklist:
+            lid = worklist.pop()
+            if lid in visited or lid not in byid:
+                continue
+            visited.add(lid)
+            worklist.extend(byid[lid].args)
+        return visited
+
+    def const_values (self) -> dict[int, int]:
+        """Values of all instructions that depend on constants only"""
+        values = {}
+        for op in self.ops:
+            if all(a in values for a in op.args):
+                values[op.lid] = bv.apply(op.opcode, op.params,
+                    [values[a] for a in op.args], [self.widths[a] for a in op.args])
+        return values
+
+    def pinned_inputs (self) -> dict[int, int]:
+        """Inputs the constraints tie to a constant: conjuncts of the form
+        input == constant, a 1-bit input or its negation"""
+        byid = {op.lid: op for op in self.ops}
+        consts = self.const_values()
+        inputs = {lid for lid, _, _ in self.inputs} - self.array_lids
+        pins = {}
+        worklist = [clid for _, clid in self.constraints]
+        while worklist:
+            lid = worklist.pop()
+            op = byid.get(lid)
+            if lid in inputs:
+                pins[lid] = 1
+            elif op is None:
+                continue
+            elif op.opcode == "and" and self.widths[lid] == 1:
+                worklist.extend(op.args)
+            elif op.opcode == "not" and op.args[0] in inputs:
+                pins[op.args[0]] = 0
+            elif op.opcode == "eq":
+                a, b = op.args
+                if a in consts:
+                    a, b = b, a
+                if a in inputs and b in consts:
+                    pins[a] = consts[b]
+        return pins
+
+    def resolve_pins (self, pins: dict[str, list[int]]) -> dict[int, list[int]]:
+        """Lids of inputs pinned by name (see BTOR2Ex), exiting on unknown names"""
+        inputs = {lid for lid, _, _ in self.inputs}
+        resolved = {}
+        for name, vals in pins.items():
+            lid = self.names.get(name)
+            if lid not in inputs:
+                logger.error("No input named %s", name)
+                sys.exit(1)
+            resolved[lid] = vals
+        return resolved
+
+    def toposort (self):
+        """Order `ops` so that every operand is defined before its use"""
+        defined = {lid for lid, _, _ in self.states}
+        defined.update(lid for lid, _, _ in self.inputs)
+        for op in self.ops:
+            if any(a not in defined for a in op.args):
+                break
+            defined.add(op.lid)
+        else:
+            # Already in program order
+            return
+        byid = {op.lid: op for op in self.ops}
+        ordered, done = [], set()
+        for root in self.ops:
+            stack = [(root, False)]
+            while stack:
+                op, expanded = stack.pop()
+                if op.lid in done:
+                    continue
+                if expanded:
+                    done.add(op.lid)
+                    ordered.append(op)
+                    continue
+                stack.append((op, True))
+                stack.extend((byid[a], False) for a in op.args if a in byid and a not in done)
+        self.ops = ordered
+
+def compile_program (prog: list[prg.Instruction]) -> CompiledProgram:
+    """Lower a parsed BTOR program to its compiled form
+    Args:
+        prog (list[prg.Instruction]): BTOR program
+    Returns:
+        CompiledProgram: flat instruction table
+    """
+    cprog = CompiledProgram()
+    for inst in prog:
+        match inst.__class__:
+            case prg.Sort:
+                if inst.typ != "bitvec" and inst.typ != "bitvector":
+                    # btoropt does not represent arrays, see loader.load_program
+                    logger.error("Unsupported sort %s (arrays are only read by the loader)", inst)
+                    sys.exit(1)
+                cprog.add_sort(inst.lid, inst.width)
+            # btoropt keeps the line ending in a symbol that ends its line
+            case prg.Input:
+                cprog.add_input(inst.lid, inst.sid, inst.name.strip())
+            case prg.State:
+                cprog.add_state(inst.lid, inst.sid, inst.name.strip())
+            case prg.Output:
+                # Outputs are ignored
+                pass
+            case prg.Init:
+                cprog.add_init(inst.operands[1].lid, inst.operands[2].lid)
+            case prg.Next:
+                cprog.add_next(inst.stid, inst.operands[2].lid)
+            case prg.Constraint:
+                cprog.add_constraint(inst.lid, inst.operands[0].lid)
+            case prg.Bad:
+                cprog.add_bad(inst.lid, inst.operands[0].lid)
+            case prg.Const | prg.Constd | prg.Consth:
+                width = cprog.sorts[inst.operands[0].lid]
+                cprog.add_op("const", inst.lid, (), (inst.value, width))
+            case prg.Zero:
+                width = cprog.sorts[inst.operands[0].lid]
+                cprog.add_op("const", inst.lid, (), (0, width))
+            case prg.One:
+                width = cprog.sorts[inst.operands[0].lid]
+                cprog.add_op("const", inst.lid, (), (1, width))
+            case prg.Ones:
+                width = cprog.sorts[inst.operands[0].lid]
+                cprog.add_op("const", inst.lid, (), ((1 << width) - 1, width))
+            case prg.Not:
+                cprog.add_op("not", inst.lid, (inst.operands[1].lid,))
+            case prg.Ite:
+                cprog.add_op("ite", inst.lid, tuple(op.lid for op in inst.operands[1:4]))
+            case prg.Uext:
+                if inst.renaming:
+                    cprog.add_rename(inst.lid, inst.name.strip(), inst.aliasid)
+                else:
+                    cprog.add_op("uext", inst.lid, (inst.operands[1].lid,), (inst.width,))
+            case prg.Slice:
+                # btoropt stores the upper bit of the slice in `width`
+                cprog.add_op("slice", inst.lid, (inst.operands[1].lid,), (inst.width, inst.lowbit))
+            case _ if inst.inst in BINOPS:
+                cprog.add_op(inst.inst, inst.lid, (inst.operands[1].lid, inst.operands[2].lid))
+            case _:
+                logger.error("Unknown instruction %s", inst)
+                sys.exit(1)
+    cprog.toposort()
+    return cprog
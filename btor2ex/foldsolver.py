@@ -0,0 +1,430 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Hash-consing and constant folding term layer over any backend solver
+"""
+
+import weakref
+
+from . import bv
+from .btorsolver import BTORArraySort, BTORSolver, BTORSort
+from .compiler import PREDICATES
+
+# Operators whose operands may be swapped
+COMMUTATIVE = {"and", "or", "xor", "add", "mul", "eq", "neq", "iff"}
+
+class Term():
+    """Term of the folding layer: a constant value or a backend node"""
+    __slots__ = ("node", "width", "value", "__weakref__")
+
+    def __init__(self, node, width: int, value: int = None):
+        self.node = node
+        self.width = width
+        self.value = value
+
+    def __repr__(self) -> str:
+        if self.value is not None:
+            return f"Term({self.value}:{self.width})"
+        return f"Term({self.node}:{self.width})"
+
+class ArrayTerm(Term):
+    """
+        Array term of the folding layer: a backend array, a constant array
+        (`default` at every index) or a write to `base` that is only handed to
+        the backend when it cannot be read through
+    """
+    __slots__ = ("sort", "base", "index", "elem", "default")
+
+    def __init__(self, node, sort: BTORArraySort, base: "ArrayTerm" = None,
+        index: Term = None, elem: Term = None, default: Term = None):
+        super().__init__(node, sort.width)
+        self.sort = sort
+        self.base = base
+        self.index = index
+        self.elem = elem
+        self.default = default
+
+    def __repr__(self) -> str:
+        if self.base is not None:
+            return f"ArrayTerm(write {self.base} {self.index} {self.elem})"
+        return f"ArrayTerm({self.node}:{self.sort})"
+
+class FoldingSolver(BTORSolver):
+    """
+        Wraps a backend solver: structurally identical terms are built once,
+        operations on constants are evaluated in Python and constants are only
+        handed to the backend when they meet a symbolic term.
+    """
+
+    def __init__(self, solver: BTORSolver, id: str = "fold"):
+        """
+        Args:
+            solver (BTORSolver): backend solver
+            id (str, optional): solver id. Defaults to "fold".
+        """
+        super().__init__(id)
+        self.slv = solver
+        self.inner = solver.oplut()
+        # Constants by (value, width), kept across frames
+        self.consts : dict[tuple, Term] = {}
+        # Structural hash table of operator terms
+        self.table = weakref.WeakValueDictionary()
+        # Operand of each negation, dropped with the negation
+        self.negated = weakref.WeakKeyDictionary()
+        self.stats = {"folded": 0, "hashed": 0, "native": 0}
+
+    def const (self, val: int, width: int) -> Term:
+        """Get the (cached) constant term"""
+        key = (val, width)
+        t = self.consts.get(key)
+        if t is None:
+            t = Term(None, width, val)
+            self.consts[key] = t
+        return t
+
+    def native (self, t: Term):
+        """Get the backend node of a term, materializing constants and writes lazily"""
+        if t.node is not None:
+            return t.node
+        if not isinstance(t, ArrayTerm):
+            t.node = self.slv.mk_const(t.value, self.slv.mk_sort(t.width))
+            return t.node
+        # Walk down to the materialized part of the write chain
+        chain = []
+        while t.node is None and t.base is not None:
+            chain.append(t)
+            t = t.base
+        if t.node is None:
+            t.node = self.slv.mk_const_array(t.sort, self.native(t.default))
+        for w in reversed(chain):
+            w.node = self.inner["write"](w.base.node, self.native(w.index), self.native(w.elem))
+        return (chain[0] if chain else t).node
+
+    def same (self, a: Term, b: Term) -> bool:
+        """Whether two index terms are known to be equal, None if unknown"""
+        if a is b:
+            return True
+        if a.value is not None and b.value is not None:
+            return a.value == b.value
+        return None
+
+    def mk_node (self, key: tuple, fn, args: list[Term], width: int) -> Term:
+        self.stats["native"] += 1
+        t = Term(fn(*[self.native(a) for a in args]), width)
+        self.table[key] = t
+        return t
+
+    def is_ones (self, t: Term) -> bool:
+        return t.value == bv.mask(t.width)
+
+    def mk_var(self, name: str, sort: BTORSort):
+        """Make var"""
+        if isinstance(sort, BTORArraySort):
+            return ArrayTerm(self.slv.mk_var(name, sort), sort)
+        return Term(self.slv.mk_var(name, sort), sort.width)
+
+    def mk_const(self, val: int, sort: BTORSort):
+        """Make bitvec constant"""
+        return self.const(val, sort.width)
+
+    def mk_sort(self, width: int) -> BTORSort:
+        """Make bitvec sort"""
+        return self.slv.mk_sort(width)
+
+    def mk_array_sort(self, index: BTORSort, element: BTORSort) -> BTORArraySort:
+        """Make array sort"""
+        return self.slv.mk_array_sort(index, element)
+
+    def mk_const_array(self, sort: BTORArraySort, elem):
+        """Make constant array, reads from it fold to elem"""
+        return ArrayTerm(None, sort, default=elem)
+
+    def mk_assume(self, expr):
+        """Make an assumption"""
+        self.slv.mk_assume(self.native(expr))
+
+    def mk_assert(self, expr):
+        """Make an assertion"""
+        if expr.value == 1:
+            return
+        self.slv.mk_assert(self.native(expr))
+
+    def check_sat(self):
+        """Check satisfiability"""
+        return self.slv.check_sat()
+
+    def check_sat_limited(self, deadline: float):
+        """Check satisfiability, giving up at a deadline"""
+        return self.slv.check_sat_limited(deadline)
+
+    def get_model(self):
+        """Get model"""
+        return self.slv.get_model()
+
+    def failed(self, expr) -> bool:
+        """Whether an assumption is in the core of the last unsatisfiable check"""
+        return self.slv.failed(self.native(expr))
+
+    def get_values(self, terms: dict) -> dict:
+        """Get model values, constants are answered directly"""
+        values = {name: t.value for name, t in terms.items() if t.value is not None}
+        values.update(self.slv.get_values(
+            {name: t.node for name, t in terms.items() if t.value is None}))
+        return values
+
+    def binop (self, opcode: str, a: Term, b: Term) -> Term:
+        """Build a binary operator term"""
+        if opcode in COMMUTATIVE and id(a) > id(b):
+            a, b = b, a
+        key = (opcode, a, b)
+        t = self.table.get(key)
+        if t is not None:
+            self.stats["hashed"] += 1
+            return t
+        if opcode in PREDICATES:
+            width = 1
+        elif opcode == "concat":
+            width = a.width + b.width
+        else:
+            width = a.width
+        if a.value is not None and b.value is not None:
+            self.stats["folded"] += 1
+            return self.const(bv.BINOPS[opcode](a.value, b.value, a.width)
+                if opcode != "concat" else (a.value << b.width) | b.value, width)
+        if a.value is not None or b.value is not None or a is b:
+            t = self.simplify(opcode, a, b)
+            if t is not None:
+                self.stats["folded"] += 1
+                return t
+        return self.mk_node(key, self.inner[opcode], [a, b], width)
+
+    def simplify (self, opcode: str, a: Term, b: Term) -> Term:
+        """Algebraic identities with at most one constant operand"""
+        # Commutative operators have their constant in either position
+        c, x = (a, b) if a.value is not None else (b, a)
+        match opcode:
+            case "and":
+                if a is b or self.is_ones(c):
+                    return x
+                if c.value == 0:
+                    return c
+            case "or":
+                if a is b or c.value == 0:
+                    return x
+                if self.is_ones(c):
+                    return c
+            case "xor":
+                if a is b:
+                    return self.const(0, a.width)
+                if c.value == 0:
+                    return x
+            case "add":
+                if c.value == 0:
+                    return x
+            case "mul":
+                if c.value == 0:
+                    return c
+                if c.value == 1:
+                    return x
+            case "sub":
+                if a is b:
+                    return self.const(0, a.width)
+                if b.value == 0:
+                    return a
+            case "sll" | "srl" | "sra":
+                if b.value == 0:
+                    return a
+            case "eq" | "iff" | "ulte" | "ugte" | "slte" | "sgte":
+                if a is b:
+                    return self.const(1, 1)
+            case "neq" | "ult" | "ugt" | "slt" | "sgt":
+                if a is b:
+                    return self.const(0, 1)
+            case "implies":
+                if a.value == 0 or b.value == 1 or a is b:
+                    return self.const(1, 1)
+                if a.value == 1:
+                    return b
+        return None
+
+    def not_(self, a):
+        if a.value is not None:
+            self.stats["folded"] += 1
+            return self.const(~a.value & bv.mask(a.width), a.width)
+        # Double negation cancels
+        t = self.negated.get(a)
+        if t is not None:
+            self.stats["folded"] += 1
+            return t
+        key = ("not", a)
+        t = self.table.get(key)
+        if t is not None:
+            self.stats["hashed"] += 1
+            return t
+        t = self.mk_node(key, self.inner["not"], [a], a.width)
+        self.negated[t] = a
+        return t
+
+    def implies_(self, a, b):
+        return self.binop("implies", a, b)
+
+    def iff_(self, a, b):
+        return self.binop("iff", a, b)
+
+    def add_(self, a, b):
+        return self.binop("add", a, b)
+
+    def sub_(self, a, b):
+        return self.binop("sub", a, b)
+
+    def mul_(self, a, b):
+        return self.binop("mul", a, b)
+
+    def sdiv_(self, a, b):
+        return self.binop("sdiv", a, b)
+
+    def udiv_(self, a, b):
+        return self.binop("udiv", a, b)
+
+    def smod_(self, a, b):
+        return self.binop("smod", a, b)
+
+    def sll_(self, a, b):
+        return self.binop("sll", a, b)
+
+    def srl_(self, a, b):
+        return self.binop("srl", a, b)
+
+    def sra_(self, a, b):
+        return self.binop("sra", a, b)
+
+    def and_(self, a, b):
+        return self.binop("and", a, b)
+
+    def or_(self, a, b):
+        return self.binop("or", a, b)
+
+    def xor_(self, a, b):
+        return self.binop("xor", a, b)
+
+    def concat_(self, a, b):
+        return self.binop("concat", a, b)
+
+    def eq_(self, a, b):
+        return self.binop("eq", a, b)
+
+    def neq_(self, a, b):
+        return self.binop("neq", a, b)
+
+    def ugt_(self, a, b):
+        return self.binop("ugt", a, b)
+
+    def sgt_(self, a, b):
+        return self.binop("sgt", a, b)
+
+    def ugte_(self, a, b):
+        return self.binop("ugte", a, b)
+
+    def sgte_(self, a, b):
+        return self.binop("sgte", a, b)
+
+    def ult_(self, a, b):
+        return self.binop("ult", a, b)
+
+    def slt_(self, a, b):
+        return self.binop("slt", a, b)
+
+    def ulte_(self, a, b):
+        return self.binop("ulte", a, b)
+
+    def slte_(self, a, b):
+        return self.binop("slte", a, b)
+
+    def uext_(self, a, b):
+        if b == 0:
+            return a
+        if a.value is not None:
+            self.stats["folded"] += 1
+            return self.const(a.value, a.width + b)
+        key = ("uext", a, b)
+        t = self.table.get(key)
+        if t is not None:
+            self.stats["hashed"] += 1
+            return t
+        return self.mk_node(key, lambda n: self.inner["uext"](n, b), [a], a.width + b)
+
+    def ite_(self, a, b, c):
+        if a.value is not None:
+            self.stats["folded"] += 1
+            return b if a.value else c
+        if b is c:
+            self.stats["folded"] += 1
+            return b
+        if b.width == 1 and b.value == 1 and c.value == 0:
+            self.stats["folded"] += 1
+            return a
+        key = ("ite", a, b, c)
+        t = self.table.get(key)
+        if t is not None:
+            self.stats["hashed"] += 1
+            return t
+        if isinstance(b, ArrayTerm):
+            self.stats["native"] += 1
+            t = ArrayTerm(self.inner["ite"](*[self.native(x) for x in (a, b, c)]), b.sort)
+            self.table[key] = t
+            return t
+        return self.mk_node(key, self.inner["ite"], [a, b, c], b.width)
+
+    def slice_(self, op, width, high, low):
+        if low == 0 and high == op.width - 1:
+            return op
+        if op.value is not None:
+            self.stats["folded"] += 1
+            return self.const((op.value >> low) & bv.mask(high - low + 1), high - low + 1)
+        key = ("slice", op, high, low)
+        t = self.table.get(key)
+        if t is not None:
+            self.stats["hashed"] += 1
+            return t
+        return self.mk_node(key, lambda n: self.inner["slice"](n, width, high, low),
+            [op], high - low + 1)
+
+    def read_(self, a, i):
+        # Read over writes to provably different indices
+        while True:
+            if a.default is not None:
+                self.stats["folded"] += 1
+                return a.default
+            if a.base is None:
+                break
+            same = self.same(a.index, i)
+            if same is None:
+                break
+            self.stats["folded"] += 1
+            if same:
+                return a.elem
+            a = a.base
+        key = ("read", a, i)
+        t = self.table.get(key)
+        if t is not None:
+            self.stats["hashed"] += 1
+            return t
+        return self.mk_node(key, self.inner["read"], [a, i], a.width)
+
+    def write_(self, a, i, v):
+        # A write hides an earlier write to the same index
+        if a.base is not None and self.same(a.index, i):
+            self.stats["folded"] += 1
+            a = a.base
+        key = ("write", a, i, v)
+        t = self.table.get(key)
+        if t is not None:
+            self.stats["hashed"] += 1
+            return t
+        t = ArrayTerm(None, a.sort, base=a, index=i, elem=v)
+        self.table[key] = t
+        return t
@@ -0,0 +1,67 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Compact per-frame storage of the terms kept across unrolled steps
+"""
+
+import sys
+
+class Frame():
+    """
+        Terms of one frame in a flat list, with the slot of each lid shared
+        by all frames of the same kind. Reads like a read-only dict keyed by lid.
+    """
+    __slots__ = ("slots", "terms")
+
+    def __init__(self, slots: dict[int, int], terms: list = None):
+        """
+        Args:
+            slots (dict[int, int]): slot of each lid
+            terms (list, optional): term of each slot. Defaults to all unset.
+        """
+        self.slots = slots
+        self.terms = terms if terms is not None else [None] * len(slots)
+
+    def __getitem__ (self, lid: int):
+        term = self.terms[self.slots[lid]]
+        if term is None:
+            raise KeyError(lid)
+        return term
+
+    def __setitem__ (self, lid: int, term):
+        self.terms[self.slots[lid]] = term
+
+    def __contains__ (self, lid: int) -> bool:
+        return lid in self.slots and self.terms[self.slots[lid]] is not None
+
+    def __iter__ (self):
+        return (lid for lid, i in self.slots.items() if self.terms[i] is not None)
+
+    def __len__ (self) -> int:
+        return sum(term is not None for term in self.terms)
+
+    def keys (self):
+        return iter(self)
+
+    def values (self):
+        return (term for term in self.terms if term is not None)
+
+    def items (self):
+        return ((lid, self.terms[i]) for lid, i in self.slots.items() if self.terms[i] is not None)
+
+    def nbytes (self) -> int:
+        """Python-side size of the frame and its term wrappers (the solver's
+        native nodes are not counted)"""
+        return sys.getsizeof(self) + sys.getsizeof(self.terms) + \
+            sum(sys.getsizeof(term) for term in self.terms if term is not None)
+
+    def __repr__ (self) -> str:
+        return repr(dict(self.items()))
+
+def mk_slots (lids: list[int]) -> dict[int, int]:
+    """Slot layout of the given lids"""
+    return {lid: i for i, lid in enumerate(lids)}
@@ -0,0 +1,130 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    k-induction on top of the BMC unroller
+"""
+
+import logging
+from enum import Enum
+
+from btoropt import program as prg
+
+from .btor2ex import BTOR2Ex
+from .btorsolver import BTORSolver
+from .compiler import CompiledProgram, compile_program
+from .trace import Trace
+
+logger = logging.getLogger(__name__)
+
+class Verdict(Enum):
+    PROVEN = "PROVEN"
+    FALSIFIED = "FALSIFIED"
+    UNKNOWN = "UNKNOWN"
+
+def constant_pins (pins: dict[int, list[int]]) -> dict[int, list[int]]:
+    """Pins holding the same value at every step"""
+    return {lid: vals[:1] for lid, vals in pins.items() if len(set(vals)) == 1}
+
+class KInduction():
+    """
+        Prove the bads unreachable by k-induction: the base case is BMC from
+        the initial states, the step case unrolls from a free state, assumes
+        the bads are false for k steps and checks they stay false at the next.
+    """
+    def __init__(self, base: BTORSolver, step: BTORSolver,
+        prog: list[prg.Instruction] | CompiledProgram, simple_path: bool = True, init: bool = True,
+        pins: dict[int, list[int]] = None):
+        """
+        Args:
+            base (BTORSolver): solver for the base case
+            step (BTORSolver): solver for the step case
+            prog (list[prg.Instruction] | CompiledProgram): BTOR program
+            simple_path (bool, optional): require the states of the step case
+                to be pairwise distinct. Defaults to True.
+            init (bool, optional): the base case starts from the initial values,
+                otherwise from any state. Defaults to True.
+            pins (dict[int, list[int]], optional): input values at each step (see
+                BTOR2Ex). The step case, whose frames are at no fixed time, only
+                keeps the pins constant over all steps. Defaults to None.
+        """
+        self.cprog = prog if isinstance(prog, CompiledProgram) else compile_program(prog)
+        pins = pins or {}
+        self.base = BTOR2Ex(base, self.cprog, init=init, pins=pins)
+        self.step = BTOR2Ex(step, self.cprog, init=False, pins=constant_pins(pins))
+        self.simple_path = simple_path
+        # Counterexample of a falsified bad
+        self.trace : Trace = None
+        # Depth of the last check
+        self.k : int = -1
+
+    def any_bad (self, engine: BTOR2Ex):
+        """Disjunction of the bads of the last unrolled frame"""
+        bads = list(engine.bads[-1].values())
+        term = bads[0]
+        for bad in bads[1:]:
+            term = engine.slv.or_(term, bad)
+        return term
+
+    def distinct (self, engine: BTOR2Ex, i: int, j: int):
+        """Two frames differ in at least one state"""
+        slv = engine.slv
+        term = None
+        for lid, sid, _ in engine.cprog.states:
+            # Array disequality is left out, which only weakens the constraint
+            if sid in engine.cprog.arrays:
+                continue
+            neq = slv.neq_(engine.state[i][lid], engine.state[j][lid])
+            term = neq if term is None else slv.or_(term, neq)
+        return term if term is not None else slv.mk_const(0, slv.mk_sort(1))
+
+    def check_base (self) -> bool:
+        """Extend the base case by a frame, True if no bad is reachable there"""
+        self.base.execute()
+        self.base.assert_constraints()
+        self.base.slv.mk_assume(self.any_bad(self.base))
+        if self.base.slv.check_sat():
+            bads = [lid for lid, bad in self.base.bads[-1].items()
+                if self.base.slv.get_values({lid: bad})[lid]]
+            self.trace = self.base.get_trace(bads)
+            return False
+        return True
+
+    def check_step (self) -> bool:
+        """Extend the step case by a frame, True if it is inductive"""
+        step = self.step
+        if step.bads:
+            # Bads are false in all frames before the last
+            step.slv.mk_assert(step.slv.not_(self.any_bad(step)))
+        step.execute()
+        step.assert_constraints()
+        k = len(step.bads) - 1
+        if self.simple_path:
+            for j in range(k):
+                step.slv.mk_assert(self.distinct(step, j, k))
+        step.slv.mk_assume(self.any_bad(step))
+        return not step.slv.check_sat()
+
+    def run (self, kmax: int) -> Verdict:
+        """Run k-induction
+        Args:
+            kmax (int): largest induction depth
+        Returns:
+            Verdict: PROVEN if no bad is reachable, FALSIFIED with `trace` set
+                if one is, UNKNOWN if neither is established up to kmax
+        """
+        if not self.cprog.bads:
+            return Verdict.PROVEN
+        for k in range(kmax + 1):
+            self.k = k
+            if not self.check_base():
+                logger.debug("Base case falsified at depth %d", k)
+                return Verdict.FALSIFIED
+            if self.check_step():
+                logger.debug("Step case inductive at depth %d", k)
+                return Verdict.PROVEN
+            logger.debug("Not %d-inductive", k)
+        return Verdict.UNKNOWN
@@ -0,0 +1,120 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Load BTOR2 text directly into the compiled instruction table
+"""
+
+import logging
+import mmap
+import sys
+import time
+from typing import Iterable
+
+from .compiler import BINOPS, CompiledProgram
+
+logger = logging.getLogger(__name__)
+
+# Constant instructions by the base of their literal
+CONSTS = {"const": 2, "constd": 10, "consth": 16}
+# Token positions of the operand lids of instructions other than binary operators
+OPERANDS = {"init": slice(3, 5), "next": slice(3, 5), "constraint": slice(2, 3), "bad": slice(2, 3),
+    "output": slice(2, 3), "not": slice(3, 4), "uext": slice(3, 4), "slice": slice(3, 4),
+    "ite": slice(3, 6), "write": slice(3, 6), "read": slice(3, 5)}
+
+def load_file (path: str) -> CompiledProgram:
+    """Compile a BTOR2 file line by line from a memory map, so that neither
+    the text nor a parsed object graph of the whole file is kept in memory
+    Args:
+        path (str): BTOR2 file
+    Returns:
+        CompiledProgram: flat instruction table
+    """
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return load_program([])
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = mm.size()
+            # Comments and source locations are dropped before decoding
+            cprog = load_program(line.split(b";", 1)[0].decode()
+                for line in iter(mm.readline, b""))
+    elapsed = time.perf_counter() - start
+    logger.info("Loaded %.1f MB in %.2f s (%.1f MB/s)",
+        size / 1e6, elapsed, size / 1e6 / max(elapsed, 1e-9))
+    return cprog
+
+def load_program (lines: Iterable[str]) -> CompiledProgram:
+    """Compile BTOR2 text, including the array sorts and read/write
+    instructions the btoropt parser does not represent
+    Args:
+        lines (Iterable[str]): BTOR2 lines, consumed one at a time
+    Returns:
+        CompiledProgram: flat instruction table
+    """
+    cprog = CompiledProgram()
+    for line in lines:
+        # Drop comments and source locations
+        text = line.split(";", 1)[0]
+        tok = text.split()
+        if not tok:
+            continue
+        lid, tag = int(tok[0]), tok[1]
+        operands = tok[OPERANDS.get(tag, slice(3, 5) if tag in BINOPS else slice(0))]
+        if any(op.startswith("-") for op in operands):
+            logger.error("Negated operands are not supported: %s", line.strip())
+            sys.exit(1)
+        match tag:
+            case "sort":
+                if tok[2] == "array":
+                    cprog.add_array_sort(lid, int(tok[3]), int(tok[4]))
+                else:
+                    cprog.add_sort(lid, int(tok[3]))
+            case "input":
+                cprog.add_input(lid, int(tok[2]), tok[3] if len(tok) > 3 else f"input{lid}")
+            case "state":
+                cprog.add_state(lid, int(tok[2]), tok[3] if len(tok) > 3 else f"state{lid}")
+            case "output":
+                # Outputs are ignored
+                pass
+            case "init":
+                cprog.add_init(int(tok[3]), int(tok[4]))
+            case "next":
+                cprog.add_next(int(tok[3]), int(tok[4]))
+            case "constraint":
+                cprog.add_constraint(lid, int(tok[2]))
+            case "bad":
+                cprog.add_bad(lid, int(tok[2]))
+            case "const" | "constd" | "consth":
+                width = cprog.sorts[int(tok[2])]
+                val = int(tok[3], CONSTS[tag]) & ((1 << width) - 1)
+                cprog.add_op("const", lid, (), (val, width))
+            case "zero" | "one" | "ones":
+                width = cprog.sorts[int(tok[2])]
+                val = {"zero": 0, "one": 1, "ones": (1 << width) - 1}[tag]
+                cprog.add_op("const", lid, (), (val, width))
+            case "not":
+                cprog.add_op("not", lid, (int(tok[3]),))
+            case "ite" | "write":
+                cprog.add_op(tag, lid, (int(tok[3]), int(tok[4]), int(tok[5])))
+            case "read":
+                cprog.add_op("read", lid, (int(tok[3]), int(tok[4])))
+            case "uext":
+                if int(tok[4]) != 0:
+                    cprog.add_op("uext", lid, (int(tok[3]),), (int(tok[4]),))
+                elif len(tok) > 5:
+                    cprog.add_rename(lid, tok[5], int(tok[3]))
+                else:
+                    cprog.alias[lid] = int(tok[3])
+            case "slice":
+                cprog.add_op("slice", lid, (int(tok[3]),), (int(tok[4]), int(tok[5])))
+            case _ if tag in BINOPS:
+                cprog.add_op(tag, lid, (int(tok[3]), int(tok[4])))
+            case _:
+                logger.error("Unknown instruction %s", line.strip())
+                sys.exit(1)
+    cprog.toposort()
+    return cprog
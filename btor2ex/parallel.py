@@ -0,0 +1,76 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Multi-property checking across a process pool
+"""
+
+import logging
+import multiprocessing
+
+from .btor2ex import BTOR2Ex
+from .coi import COI
+from .foldsolver import FoldingSolver
+from .loader import load_program
+from .portfolio import mk_backend
+from .strash import Strash
+
+logger = logging.getLogger(__name__)
+
+def check_group (btor2str: list[str], props: list[int], bound: int, opts: dict = None) -> dict[int, int]:
+    """Worker: check a group of bads on its own solver and unrolling
+    Args:
+        btor2str (list[str]): BTOR program text
+        props (list[int]): bad lids assigned to this worker
+        bound (int): BMC bound
+        opts (dict, optional): "backend", "init", "coi", "strash" and "fold"
+            settings, and "pins" input values by input name. Defaults to None.
+    Returns:
+        dict[int, int]: depth at which each bad is falsified (None if safe)
+    """
+    opts = opts or {}
+    prgm = load_program(btor2str)
+    pins = prgm.resolve_pins(opts.get("pins", {}))
+    if opts.get("coi", True):
+        prgm = COI(props).reduce(prgm)
+    init = opts.get("init", True)
+    if opts.get("strash", True):
+        prgm = Strash(init=init).reduce(prgm)
+    slv = mk_backend(f"worker{props[0]}", {"backend": opts.get("backend", "boolector")})
+    engine = BTOR2Ex(FoldingSolver(slv) if opts.get("fold", True) else slv, prgm, init=init, pins=pins)
+    return engine.bmc_props(bound, props)
+
+def check_properties (btor2str: list[str], bound: int, jobs: int = None, opts: dict = None) -> dict[int, int]:
+    """Check all bad properties of a program concurrently
+    Args:
+        btor2str (list[str]): BTOR program text
+        bound (int): BMC bound
+        jobs (int, optional): number of worker processes. Defaults to the CPU count.
+        opts (dict, optional): engine settings of the workers (see check_group). Defaults to None.
+    Returns:
+        dict[int, int]: depth at which each bad is falsified (None if safe up to bound)
+    """
+    bads = [lid for lid, _ in load_program(btor2str).bads]
+    jobs = min(jobs or multiprocessing.cpu_count(), len(bads))
+    if jobs == 0:
+        return {}
+    # Round-robin so that every worker gets a similar mix of properties
+    groups = [bads[i::jobs] for i in range(jobs)]
+    logger.info("Checking %d properties on %d workers", len(bads), jobs)
+
+    verdicts = {}
+    with multiprocessing.Pool(jobs) as pool:
+        for result in pool.starmap(check_group, [(btor2str, g, bound, opts) for g in groups]):
+            verdicts.update(result)
+    return dict(sorted(verdicts.items()))
+
+def format_verdicts (verdicts: dict[int, int], bound: int) -> str:
+    """Render the per-property verdict table"""
+    lines = [f"{'bad':>8}  verdict"]
+    for lid, depth in verdicts.items():
+        verdict = f"UNSAFE at depth {depth}" if depth is not None else f"SAFE up to bound {bound}"
+        lines.append(f"{lid:>8}  {verdict}")
+    return "\n".join(lines)
@@ -0,0 +1,290 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    IC3/PDR over a single-step unrolling of the program
+"""
+
+import heapq
+import logging
+import sys
+from itertools import count
+
+from btoropt import program as prg
+
+from .btor2ex import BTOR2Ex
+from .btorsolver import BTORSolver
+from .compiler import CompiledProgram, compile_program
+from .kind import Verdict, constant_pins
+from .trace import Trace
+
+logger = logging.getLogger(__name__)
+
+# Boolector options for the many small incremental checks of PDR, where
+# skeleton preprocessing of the whole formula otherwise dominates
+BOOLECTOR_OPTS = {"BTOR_OPT_SKELETON_PREPROC": 0}
+
+class Obligation():
+    """State to block at a frame, with the step leading to its successor"""
+    __slots__ = ("level", "cube", "values", "succ", "bads")
+
+    def __init__(self, level: int, cube: tuple, values: dict, succ: "Obligation" = None):
+        self.level = level
+        # Bit literals (state lid, bit, value)
+        self.cube = cube
+        # State and input values of the model the cube was taken from
+        self.values = values
+        self.succ = succ
+        # Bads reached, for the obligation of the top frame
+        self.bads : list[int] = []
+
+class PDR():
+    """
+        Property directed reachability: frames are conjunctions of clauses
+        over state bits, each guarded by the activation literal of the frame
+        it was blocked at, so that one incremental solver serves every frame.
+    """
+    def __init__(self, solver: BTORSolver, prog: list[prg.Instruction] | CompiledProgram,
+        init: bool = True, pins: dict[int, list[int]] = None):
+        """
+        Args:
+            solver (BTORSolver): backend solver, must support unsat cores (`failed`)
+            prog (list[prg.Instruction] | CompiledProgram): BTOR program
+            init (bool, optional): states start from their initial values,
+                otherwise every state is initial. Defaults to True.
+            pins (dict[int, list[int]], optional): input values (see BTOR2Ex), which
+                must be the same at every step since frames are at no fixed time.
+                Defaults to None.
+        """
+        self.cprog = prog if isinstance(prog, CompiledProgram) else compile_program(prog)
+        if self.cprog.arrays:
+            logger.error("PDR does not support arrays")
+            sys.exit(1)
+        self.pins = constant_pins(pins or {})
+        if len(self.pins) != len(pins or {}):
+            logger.error("PDR only supports inputs pinned to a single value")
+            sys.exit(1)
+        self.slv = solver
+        self.init = init
+        # Blocked cubes by the frame they were blocked at (frames[0] is init)
+        self.frames : list[list[tuple]] = []
+        self.acts : list = []
+        # Counterexample of a falsified bad
+        self.trace : Trace = None
+        # Depth of the last frame
+        self.k : int = 0
+        self.stats = {"queries": 0, "obligations": 0, "clauses": 0}
+        self.lits : dict[tuple, tuple] = {}
+        self.build()
+
+    def build (self):
+        """Build the transition relation from one frame of the unroller"""
+        self.engine = BTOR2Ex(self.slv, self.cprog, init=False, pins=self.pins)
+        self.engine.execute()
+        self.engine.assert_constraints()
+        self.curr = self.engine.state[0]
+        self.next = self.engine.state[1]
+        self.widths = {lid: self.cprog.widths[lid] for lid, _, _ in self.cprog.states}
+        bads = list(self.engine.bads[0].values())
+        self.bad = bads[0] if bads else self.slv.mk_const(0, self.slv.mk_sort(1))
+        for bad in bads[1:]:
+            self.bad = self.slv.or_(self.bad, bad)
+        # Initial values go through the same instruction handlers as a step
+        inits = self.cprog.inits if self.init else []
+        init_cone = self.cprog.cone([v for _, v in inits])
+        env = dict(self.curr)
+        for op in self.cprog.ops:
+            if op.lid in init_cone:
+                env[op.lid] = self.engine.bind(op)(*[env[a] for a in op.args])
+        self.new_frame()
+        for stid, vlid in inits:
+            self.guard(0, self.slv.eq_(self.curr[stid], env[vlid]))
+        # Constant initial values are checked against cubes without the solver
+        consts = self.cprog.const_values()
+        self.init_values = None
+        if all(vlid in consts for _, vlid in inits):
+            self.init_values = {stid: consts[vlid] for stid, vlid in inits}
+
+    def new_frame (self):
+        self.acts.append(self.slv.mk_var(f"pdr_act{len(self.acts)}", self.slv.mk_sort(1)))
+        self.frames.append([])
+
+    def guard (self, level: int, term):
+        self.slv.mk_assert(self.slv.implies_(self.acts[level], term))
+
+    def literal (self, lit: tuple, primed: bool = False):
+        """Term of a bit literal over the current or next state"""
+        key = (lit, primed)
+        if key not in self.lits:
+            lid, bit, val = lit
+            state = (self.next if primed else self.curr)[lid]
+            term = self.slv.slice_(state, self.widths[lid], bit, bit)
+            self.lits[key] = term if val else self.slv.not_(term)
+        return self.lits[key]
+
+    def clause (self, cube: tuple):
+        """Negation of a cube over the current state"""
+        term = None
+        for lit in cube:
+            neg = self.slv.not_(self.literal(lit))
+            term = neg if term is None else self.slv.or_(term, neg)
+        return term
+
+    def query (self, level: int, assumptions: list) -> bool:
+        """Check the frame at a level under assumptions"""
+        self.stats["queries"] += 1
+        acts = [self.acts[0]] if level == 0 else self.acts[level:]
+        for term in acts + assumptions:
+            self.slv.mk_assume(term)
+        return self.slv.check_sat()
+
+    def model (self) -> tuple[tuple, dict]:
+        """Cube of the current state and the state and input values of the model"""
+        values = self.slv.get_values({lid: self.curr[lid]
+            for lid, _, _ in self.cprog.states + self.cprog.inputs})
+        cube = tuple((lid, bit, (values[lid] >> bit) & 1)
+            for lid, w in self.widths.items() for bit in range(w))
+        return cube, values
+
+    def intersects_init (self, cube: tuple) -> bool:
+        if self.init_values is not None:
+            return all(lid not in self.init_values or (self.init_values[lid] >> bit) & 1 == val
+                for lid, bit, val in cube)
+        return self.query(0, [self.literal(lit) for lit in cube])
+
+    def inductive (self, cube: tuple, level: int) -> bool:
+        """Whether a cube is unreachable in one step from the frame below level"""
+        primed = [self.literal(lit, True) for lit in cube]
+        return not self.query(level - 1, [self.clause(cube)] + primed)
+
+    def generalize (self, cube: tuple, level: int) -> tuple:
+        """Shrink a blocked cube, first to the unsat core then literal by literal"""
+        # The last query was the successful inductive check of the cube
+        core = tuple(lit for lit in cube if self.slv.failed(self.literal(lit, True)))
+        if core != cube and core and not self.intersects_init(core) and self.inductive(core, level):
+            cube = core
+        for lit in cube:
+            if len(cube) == 1:
+                break
+            cand = tuple(l for l in cube if l != lit)
+            if not self.intersects_init(cand) and self.inductive(cand, level):
+                cube = cand
+        return cube
+
+    def subsumed (self, cube: tuple, level: int) -> bool:
+        """Whether a clause at the level or above already blocks the cube"""
+        lits = set(cube)
+        return any(lits.issuperset(c) for frame in self.frames[level:] for c in frame)
+
+    def block_cube (self, cube: tuple, level: int):
+        """Add the clause blocking a cube at a level and below"""
+        self.stats["clauses"] += 1
+        # Drop the clauses below that the new one subsumes
+        lits = set(cube)
+        for frame in self.frames[1:level+1]:
+            frame[:] = [c for c in frame if not lits.issubset(c)]
+        self.frames[level].append(cube)
+        self.guard(level, self.clause(cube))
+
+    def block (self, ob: Obligation) -> bool:
+        """Recursively block an obligation
+        Returns:
+            bool: False if it reaches the initial states (counterexample in `trace`)
+        """
+        ids = count()
+        queue = [(ob.level, next(ids), ob)]
+        while queue:
+            level, _, ob = heapq.heappop(queue)
+            self.stats["obligations"] += 1
+            # Cubes taken from models are complete states
+            if level == 0 or self.intersects_init(ob.cube):
+                self.mk_trace(ob)
+                return False
+            if not self.query(level, [self.literal(lit) for lit in ob.cube]):
+                # Already blocked by an earlier clause
+                if level < self.k:
+                    ob.level = level + 1
+                    heapq.heappush(queue, (ob.level, next(ids), ob))
+                continue
+            if self.inductive(ob.cube, level):
+                cube = self.generalize(ob.cube, level)
+                # Push the clause as far as it stays inductive
+                while level < self.k and self.inductive(cube, level + 1):
+                    level += 1
+                self.block_cube(cube, level)
+                if level < self.k:
+                    ob.level = level + 1
+                    heapq.heappush(queue, (ob.level, next(ids), ob))
+            else:
+                cube, values = self.model()
+                heapq.heappush(queue, (level - 1, next(ids), Obligation(level - 1, cube, values, ob)))
+                heapq.heappush(queue, (level, next(ids), ob))
+        return True
+
+    def propagate (self) -> bool:
+        """Push clauses to the next frame
+        Returns:
+            bool: True if two consecutive frames are equal (inductive invariant)
+        """
+        for level in range(1, self.k):
+            for cube in list(self.frames[level]):
+                if self.subsumed(cube, level + 1):
+                    self.frames[level].remove(cube)
+                elif self.inductive(cube, level + 1):
+                    self.frames[level].remove(cube)
+                    self.frames[level + 1].append(cube)
+                    self.guard(level + 1, self.clause(cube))
+            if not self.frames[level]:
+                logger.debug("Frame %d is inductive", level)
+                return True
+        return False
+
+    def mk_trace (self, ob: Obligation):
+        """Counterexample from an initial obligation to the bad"""
+        trace = Trace(self.cprog)
+        while ob is not None:
+            trace.steps.append(ob.values)
+            last, ob = ob, ob.succ
+        # The last step carries the inputs of the model reaching the bads
+        trace.bads = last.bads
+        self.trace = trace
+
+    def get_bad (self) -> Obligation:
+        """State of the top frame reaching a bad, None if there is none"""
+        if not self.query(self.k, [self.bad]):
+            return None
+        cube, values = self.model()
+        ob = Obligation(self.k, cube, values)
+        ob.bads = [lid for lid, bad in self.engine.bads[0].items()
+            if self.slv.get_values({lid: bad})[lid]]
+        return ob
+
+    def run (self, kmax: int) -> Verdict:
+        """Run PDR
+        Args:
+            kmax (int): largest number of frames
+        Returns:
+            Verdict: PROVEN if no bad is reachable, FALSIFIED with `trace` set
+                if one is, UNKNOWN if neither is established within kmax frames
+        """
+        if not self.cprog.bads:
+            return Verdict.PROVEN
+        # Bads of the initial states
+        ob = self.get_bad()
+        if ob is not None:
+            self.mk_trace(ob)
+            return Verdict.FALSIFIED
+        while self.k < kmax:
+            self.new_frame()
+            self.k += 1
+            while (ob := self.get_bad()) is not None:
+                if not self.block(ob):
+                    logger.debug("Counterexample of length %d", len(self.trace))
+                    return Verdict.FALSIFIED
+            if self.propagate():
+                return Verdict.PROVEN
+            logger.debug("Frame %d: %s", self.k, [len(f) for f in self.frames])
+        return Verdict.UNKNOWN
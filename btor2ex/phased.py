@@ -0,0 +1,81 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Phased checking driven by a proof schedule counter (see prfsm.py): the
+    bads of each phase are only checked in the frames where the counter is
+    at their stage, all phases sharing one unrolling
+"""
+
+import logging
+import sys
+
+from . import bv
+from .btor2ex import BTOR2Ex
+from .compiler import CompiledProgram
+
+logger = logging.getLogger(__name__)
+
+def schedule (cprog: CompiledProgram, counter: str, d: int) -> list[int]:
+    """Values of the proof schedule counter in the first frames. The counter
+    must have a constant initial value and a next depending on itself only.
+    Args:
+        cprog (CompiledProgram): program declaring the counter
+        counter (str): counter name
+        d (int): number of frames
+    Returns:
+        list[int]: counter value in each frame
+    """
+    lid = cprog.names.get(counter)
+    consts = cprog.const_values()
+    inits, nexts = dict(cprog.inits), dict(cprog.nexts)
+    if lid is None or inits.get(lid) not in consts or lid not in nexts:
+        logger.error("Counter %s needs a constant initial value and a next (PrFSM(reset=True))", counter)
+        sys.exit(1)
+    cone = cprog.cone([nexts[lid]])
+    code = [op for op in cprog.ops if op.lid in cone and op.lid not in consts]
+    if any(a != lid and a not in cone for op in code for a in op.args):
+        logger.error("Counter %s does not run on its own", counter)
+        sys.exit(1)
+
+    values = dict(consts)
+    values[lid] = consts[inits[lid]]
+    stages = []
+    for _ in range(d):
+        stages.append(values[lid])
+        for op in code:
+            values[op.lid] = bv.apply(op.opcode, op.params,
+                [values[a] for a in op.args], [cprog.widths[a] for a in op.args])
+        values[lid] = values[nexts[lid]]
+    return stages
+
+def check_phases (engine: BTOR2Ex, stages: list[int], phases: dict[int, list[int]]) -> dict[int, int]:
+    """BMC with each phase's bads checked only in the frames of its stage
+    (every frame if the engine starts from free states)
+    Args:
+        engine (BTOR2Ex): engine to unroll, shared by all phases
+        stages (list[int]): counter value in each frame, one per depth (see schedule)
+        phases (dict[int, list[int]]): bad lids checked at each stage, other
+            bads are checked at every depth
+    Returns:
+        dict[int, int]: depth at which each bad is falsified (None if safe)
+    """
+    when = {lid: {depth for depth, val in enumerate(stages) if val == stage}
+        for stage, lids in phases.items() for lid in lids}
+    if not engine.init:
+        # A free counter can start at any stage
+        logger.warning("Free initial states: checking every phase at every depth")
+        when = {}
+    if engine.cprog is None:
+        engine.preprocess()
+    verdicts = {lid: None for lid, _ in engine.cprog.bads}
+    checks = 0
+    for result in engine.bmc_iter(len(stages), when=when):
+        checks += 1
+        if result.sat:
+            verdicts[result.lid] = result.depth
+    logger.info("Phased: %d checks over %d frames", checks, len(engine.bads))
+    return verdicts
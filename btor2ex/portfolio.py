@@ -0,0 +1,162 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Portfolio solving: race differently configured solvers on one BMC query
+"""
+
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import queue as queues
+import time
+
+from .boolectorsolver import BoolectorSolver
+from .btor2ex import BTOR2Ex
+from .coi import COI
+from .foldsolver import FoldingSolver
+from .loader import load_program
+from .strash import Strash
+
+logger = logging.getLogger(__name__)
+
+# Solver configurations raced by default (Boolector option name -> value,
+# or Bitwuzla option name -> value for backend "bitwuzla")
+CONFIGS = {
+    "default": {},
+    "bitwuzla": {"backend": "bitwuzla"},
+    "rw0": {"BTOR_OPT_REWRITE_LEVEL": 0},
+    "rw1": {"BTOR_OPT_REWRITE_LEVEL": 1},
+    "rw2": {"BTOR_OPT_REWRITE_LEVEL": 2},
+    "noskel": {"BTOR_OPT_SKELETON_PREPROC": 0, "BTOR_OPT_VAR_SUBST": 0},
+    "noslices": {"BTOR_OPT_ELIMINATE_SLICES": 0, "BTOR_OPT_NORMALIZE": 0},
+    "ackermann": {"BTOR_OPT_ACKERMANN": 1, "BTOR_OPT_BETA_REDUCE": 0},
+    "just": {"BTOR_OPT_FUN_JUST": 1},
+    "dualprop": {"BTOR_OPT_FUN_DUAL_PROP": 1},
+    "bitwuzla-preprop": {"backend": "bitwuzla", "BV_SOLVER": "preprop"},
+    "bitwuzla-abstraction": {"backend": "bitwuzla", "ABSTRACTION": True},
+}
+# Bitwuzla is optional
+if importlib.util.find_spec("bitwuzla") is None:
+    CONFIGS = {name: opts for name, opts in CONFIGS.items() if opts.get("backend") != "bitwuzla"}
+
+# Seconds between checks for workers that died without answering
+POLL = 0.5
+
+# Win counts of earlier races
+STATS_PATH = os.path.join(os.path.expanduser("~"), ".cache", "btor2ex", "portfolio.json")
+
+def mk_backend (name: str, opts: dict):
+    """Solver of a configuration: Boolector unless its options name another backend"""
+    opts = dict(opts)
+    if opts.pop("backend", "boolector") == "bitwuzla":
+        from .bitwuzlasolver import BitwuzlaSolver
+        return BitwuzlaSolver(name, opts)
+    return BoolectorSolver(name, opts)
+
+def run_config (name: str, opts: dict, btor2str: list[str], bound: int, queue, settings: dict = None):
+    """Worker: run BMC with one solver configuration and report on the queue"""
+    start = time.perf_counter()
+    settings = settings or {}
+    try:
+        prgm = load_program(btor2str)
+        pins = prgm.resolve_pins(settings.get("pins", {}))
+        if settings.get("coi", True):
+            prgm = COI().reduce(prgm)
+        init = settings.get("init", True)
+        if settings.get("strash", True):
+            prgm = Strash(init=init).reduce(prgm)
+        slv = mk_backend(name, opts)
+        engine = BTOR2Ex(FoldingSolver(slv) if settings.get("fold", True) else slv, prgm, init=init, pins=pins)
+        queue.put((name, engine.bmc(bound), time.perf_counter() - start))
+    except Exception as e:
+        logger.warning("Configuration %s failed: %s", name, e)
+        queue.put((name, None, time.perf_counter() - start))
+
+def load_stats (path: str) -> dict[str, int]:
+    if path is None or not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+def record_win (path: str, name: str):
+    """Count a win for a configuration"""
+    if path is None:
+        return
+    stats = load_stats(path)
+    stats[name] = stats.get(name, 0) + 1
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(stats, f, indent=2)
+
+def race (btor2str: list[str], bound: int, configs: dict[str, dict] = None,
+    jobs: int = None, stats: str = STATS_PATH, settings: dict = None) -> tuple[bool, str]:
+    """Race solver configurations on a BMC query and take the first answer
+    Args:
+        btor2str (list[str]): BTOR program text
+        bound (int): BMC bound
+        configs (dict[str, dict], optional): configurations by name. Defaults to CONFIGS.
+        jobs (int, optional): configurations launched. Defaults to the CPU count.
+        stats (str, optional): win count file, None to disable. Defaults to STATS_PATH.
+        settings (dict, optional): "init", "coi", "strash", "fold" and "pins"
+            settings shared by all configurations (see parallel.check_group). Defaults to None.
+    Returns:
+        tuple[bool, str]: is the program safe, winning configuration (None, None
+            if no configuration answered)
+    """
+    configs = configs or CONFIGS
+    wins = load_stats(stats)
+    # Favour configurations that won before
+    names = sorted(configs, key=lambda n: -wins.get(n, 0))
+    names = names[:jobs or multiprocessing.cpu_count()]
+    logger.info("Racing configurations %s", names)
+
+    queue = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=run_config, name=name,
+        args=(name, configs[name], btor2str, bound, queue, settings), daemon=True) for name in names]
+    for proc in procs:
+        proc.start()
+
+    result, winner = None, None
+    pending = set(names)
+    try:
+        while pending and winner is None:
+            try:
+                answers = [queue.get(timeout=POLL)]
+            except queues.Empty:
+                # A worker killed in the native solver (crash, OOM) never answers
+                dead = [proc for proc in procs if proc.name in pending and not proc.is_alive()]
+                # but one may have answered just before exiting, after the wait timed out
+                answers = []
+                while dead:
+                    try:
+                        answers.append(queue.get_nowait())
+                    except queues.Empty:
+                        break
+                answered = {name for name, _, _ in answers}
+                for proc in dead:
+                    if proc.name not in answered:
+                        logger.warning("Configuration %s died (exit code %s)", proc.name, proc.exitcode)
+                        pending.discard(proc.name)
+            for name, res, elapsed in answers:
+                pending.discard(name)
+                if res is not None and winner is None:
+                    result, winner = res, name
+                    logger.info("Configuration %s answered first after %.3fs", name, elapsed)
+    finally:
+        for proc in procs:
+            if proc.is_alive():
+                proc.terminate()
+        for proc in procs:
+            proc.join()
+
+    if winner is None:
+        logger.warning("No portfolio configuration produced an answer")
+        return None, None
+    record_win(stats, winner)
+    return result, winner
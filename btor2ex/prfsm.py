@@ -14,13 +14,16 @@ from btoropt import program as prg
 class PrFSM(Pass):
     """Proof FSM"""
 
-    def __init__(self, cname: str = "fv__counter", numsteps: int = 2) -> None:
+    def __init__(self, cname: str = "fv__counter", numsteps: int = 2, reset: bool = False) -> None:
         """
         Args:
             cname (str, optional): Proof FSM counter name. Defaults to "fv__counter".
             numsteps (int, optional): counter steps. Defaults to 2.
+            reset (bool, optional): start the counter at zero, which fixes the
+                stage of every frame (see phased.py). Defaults to False.
         """
         self.numsteps = numsteps
+        self.reset = reset
         # log of the number of stages
         self.counterwidth = (numsteps-1).bit_length()
         # name
@@ -51,8 +54,13 @@ class PrFSM(Pass):
         lid += 1
         # next transition function
         next = prg.Next(lid, sort, counter, addone)
+        lid += 1
+        if not self.reset:
+            return [sort, zero, one, counter, addone, next]
+        # Initial stage
+        init = prg.Init(lid, sort, counter, zero)
 
-        return [sort, zero, one, counter, addone, next]
+        return [sort, zero, one, counter, addone, next, init]
 
 
     def run (self, p: list[prg.Instruction]) -> list[prg.Instruction]:
@@ -0,0 +1,143 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Timing of solver calls, unrolled steps and property checks
+"""
+
+import json
+import logging
+import os
+import time
+
+from .btorsolver import BTORSolver
+
+logger = logging.getLogger(__name__)
+
+# Solver methods timed by ProfilingSolver
+PROFILED = [
+    "mk_var", "mk_const", "mk_sort", "mk_array_sort", "mk_const_array",
+    "mk_assume", "mk_assert", "check_sat", "check_sat_limited", "get_model", "failed", "get_values",
+    "not_", "implies_", "iff_", "add_", "sub_", "mul_", "sdiv_", "udiv_", "smod_",
+    "sll_", "srl_", "sra_", "and_", "or_", "xor_", "concat_", "eq_", "neq_",
+    "ugt_", "sgt_", "ugte_", "sgte_", "ult_", "slt_", "ulte_", "slte_",
+    "uext_", "ite_", "slice_", "read_", "write_",
+]
+
+class Profiler():
+    """
+        Collects call counts and times by name, per-step unroll statistics
+        and per-property check times. Steps and checks are also kept as
+        events for a Chrome trace (chrome://tracing, Perfetto).
+    """
+    def __init__(self):
+        self.origin = time.perf_counter()
+        # (count, seconds) by call name
+        self.calls : dict[str, list] = {}
+        self.frames : list[dict] = []
+        # (checks, seconds, depth of the first satisfiable check) by bad lid
+        self.props : dict[int, list] = {}
+        self.events : list[dict] = []
+
+    def call (self, name: str, elapsed: float):
+        stat = self.calls.get(name)
+        if stat is None:
+            stat = self.calls[name] = [0, 0.0]
+        stat[0] += 1
+        stat[1] += elapsed
+
+    def event (self, name: str, start: float, elapsed: float, **args):
+        """Record a Chrome trace complete event"""
+        self.events.append({"name": name, "ph": "X", "pid": os.getpid(), "tid": 0,
+            "ts": (start - self.origin) * 1e6, "dur": elapsed * 1e6, "args": args})
+
+    def frame (self, step: int, start: float, elapsed: float, **sizes):
+        """Record an unrolled step and the size of its formula"""
+        self.call("execute", elapsed)
+        self.frames.append({"step": step, "time": elapsed, **sizes})
+        self.event("execute", start, elapsed, step=step)
+        self.events.append({"name": "formula", "ph": "C", "pid": os.getpid(), "tid": 0,
+            "ts": (start + elapsed - self.origin) * 1e6, "args": sizes})
+
+    def check (self, lid: int, depth: int, start: float, elapsed: float, result: bool):
+        """Record a check of a bad at a depth"""
+        stat = self.props.get(lid)
+        if stat is None:
+            stat = self.props[lid] = [0, 0.0, None]
+        stat[0] += 1
+        stat[1] += elapsed
+        if result and stat[2] is None:
+            stat[2] = depth
+        self.event(f"check bad {lid}", start, elapsed, depth=depth, sat=result)
+
+    def report (self) -> dict:
+        """Collected statistics, call times are inclusive of nested calls"""
+        return {
+            "total": time.perf_counter() - self.origin,
+            "calls": {name: {"count": n, "time": t} for name, (n, t) in
+                sorted(self.calls.items(), key=lambda kv: -kv[1][1])},
+            "frames": self.frames,
+            "properties": {lid: {"checks": n, "time": t, "falsified": depth}
+                for lid, (n, t, depth) in self.props.items()},
+        }
+
+    def write_json (self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        logger.info("Wrote profile to %s", path)
+
+    def write_chrome (self, path: str):
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+        logger.info("Wrote Chrome trace to %s", path)
+
+    def summary (self, top: int = 10) -> str:
+        lines = [f"{'call':<16} {'count':>10} {'time (s)':>10}"]
+        for name, stat in list(self.report()["calls"].items())[:top]:
+            lines.append(f"{name:<16} {stat['count']:>10} {stat['time']:>10.4f}")
+        return "\n".join(lines)
+
+def timed (name: str):
+    """Solver method forwarding to the wrapped solver and timing the call"""
+    def method (self, *args):
+        start = time.perf_counter()
+        try:
+            return self.methods[name](*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.profiler.call(self.prefix + name, elapsed)
+            if name.startswith("check_sat"):
+                self.profiler.event(self.prefix + name, start, elapsed)
+    method.__name__ = name
+    return method
+
+class ProfilingSolver(BTORSolver):
+    """
+        Wraps a solver, counting and timing each of its methods. Only used
+        when profiling is requested, so that unprofiled runs pay nothing.
+    """
+    def __init__(self, solver: BTORSolver, profiler: Profiler, prefix: str = ""):
+        """
+        Args:
+            solver (BTORSolver): wrapped solver
+            profiler (Profiler): collected statistics
+            prefix (str, optional): prefix of the call names, to tell stacked
+                solvers apart. Defaults to "".
+        """
+        super().__init__(solver.id)
+        self.slv = solver
+        self.profiler = profiler
+        self.prefix = prefix
+        self.methods = {name: getattr(solver, name) for name in PROFILED}
+
+    def __getattr__ (self, name: str):
+        # Solver-specific attributes (stats, native handles)
+        if name == "slv":
+            raise AttributeError(name)
+        return getattr(self.slv, name)
+
+for _name in PROFILED:
+    setattr(ProfilingSolver, _name, timed(_name))
@@ -0,0 +1,92 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Concrete re-simulation of traces on Python integers
+"""
+
+import logging
+
+from . import bv
+from .compiler import CompiledProgram, Op
+from .trace import Trace
+
+logger = logging.getLogger(__name__)
+
+class Replayer():
+    """
+        Concretely execute a compiled program, without a solver
+    """
+    def __init__(self, cprog: CompiledProgram, init: bool = True):
+        """
+        Args:
+            cprog (CompiledProgram): program to execute
+            init (bool, optional): require traces to start in an initial state. Defaults to True.
+        """
+        self.cprog = cprog
+        self.init = init
+        self.code = [(self.bind(op), op.lid, op.args) for op in cprog.ops]
+
+    def bind (self, op: Op):
+        """Resolve a compiled instruction to a function over operand values"""
+        widths = [self.cprog.widths[a] for a in op.args]
+        match op.opcode:
+            case "const":
+                val = op.params[0]
+                return lambda: val
+            case "ite":
+                return lambda c, t, e: t if c else e
+            case _ if op.opcode in bv.BINOPS:
+                fn, w = bv.BINOPS[op.opcode], widths[0]
+                return lambda a, b: fn(a, b, w)
+            case _:
+                opcode, params = op.opcode, op.params
+                return lambda *vals: bv.apply(opcode, params, list(vals), widths)
+
+    def step (self, env: dict[int, int]) -> dict[int, int]:
+        """Evaluate one step in place
+        Args:
+            env (dict[int, int]): state and input values by lid
+        Returns:
+            dict[int, int]: next state values by lid
+        """
+        for fn, lid, args in self.code:
+            env[lid] = fn(*[env[a] for a in args])
+        return {stid: env[vlid] for stid, vlid in self.cprog.nexts}
+
+    def replay (self, trace: Trace) -> list[int]:
+        """Re-simulate a trace
+        Args:
+            trace (Trace): trace to replay, with the initial state at step 0
+        Returns:
+            list[int]: bads holding at the last step, empty if the trace is
+                not a valid counterexample
+        """
+        state = {lid: trace.steps[0][lid] for lid, _, _ in self.cprog.states}
+        for k, values in enumerate(trace.steps):
+            env = dict(values)
+            # Simulated state takes precedence over the recorded one
+            env.update(state)
+            state = self.step(env)
+            if k == 0 and self.init and not all(env[stid] == env[vlid] for stid, vlid in self.cprog.inits):
+                logger.debug("Trace does not start in an initial state")
+                return []
+            if not all(env[clid] for _, clid in self.cprog.constraints):
+                logger.debug("Constraint violated at step %d", k)
+                return []
+            # States without next functions are taken from the trace
+            if k + 1 < len(trace.steps):
+                for lid, _, _ in self.cprog.states:
+                    if lid not in state:
+                        state[lid] = trace.steps[k+1][lid]
+        return [lid for lid, clid in self.cprog.bads if env[clid]]
+
+    def validate (self, trace: Trace) -> bool:
+        """Check that a trace reaches its bads"""
+        hits = self.replay(trace)
+        if trace.bads:
+            return all(lid in hits for lid in trace.bads)
+        return len(hits) > 0
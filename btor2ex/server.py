@@ -0,0 +1,201 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Long-lived BMC service over a Unix socket, keeping compiled programs and
+    unrolled engines warm across queries
+
+    python3 -m btor2ex.server /tmp/btor2ex.sock
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import time
+from collections import OrderedDict
+
+from .boolectorsolver import BoolectorSolver
+from .btor2ex import BTOR2Ex
+from .cache import digest
+from .coi import COI
+from .compiler import CompiledProgram
+from .foldsolver import FoldingSolver
+from .loader import load_file
+
+logger = logging.getLogger(__name__)
+
+class LRU(OrderedDict):
+    """Mapping keeping at most `size` entries, evicting the least recently used"""
+
+    def __init__(self, size: int):
+        super().__init__()
+        self.size = size
+
+    def lookup (self, key):
+        """Value of a key, refreshed as the most recently used, None if absent"""
+        if key not in self:
+            return None
+        self.move_to_end(key)
+        return self[key]
+
+    def insert (self, key, value):
+        self[key] = value
+        self.move_to_end(key)
+        while len(self) > self.size:
+            evicted, _ = self.popitem(last=False)
+            logger.info("Evicted %s", evicted)
+
+class Session():
+    """
+        Warm engine of one design: every bad is checked at every unrolled
+        depth, so later queries for any bad up to that depth are answered
+        from the recorded verdicts and deeper ones extend the unrolling.
+    """
+    def __init__(self, full: CompiledProgram, cprog: CompiledProgram, init: bool = True):
+        """
+        Args:
+            full (CompiledProgram): program as loaded, for witnesses
+            cprog (CompiledProgram): program to check
+            init (bool, optional): start from the initial values. Defaults to True.
+        """
+        self.full = full
+        self.engine = BTOR2Ex(FoldingSolver(BoolectorSolver("server")), cprog, init=init)
+        # Depth each bad was falsified at (None while safe)
+        self.verdicts : dict[int, int] = {lid: None for lid, _ in cprog.bads}
+        # Number of depths checked
+        self.depth : int = 0
+
+    def check (self, bound: int, props: list[int] = None) -> dict[int, int]:
+        """BMC of the bads up to a bound, unrolling only past the depths checked before
+        Args:
+            bound (int): BMC bound (number of steps)
+            props (list[int], optional): bad lids. Defaults to all bads.
+        Returns:
+            dict[int, int]: depth at which each bad is falsified (None if safe up to bound)
+        """
+        live = [lid for lid, depth in self.verdicts.items() if depth is None]
+        if bound > self.depth and live:
+            found = self.engine.bmc_props(bound - self.depth, live)
+            self.verdicts.update({lid: depth for lid, depth in found.items() if depth is not None})
+            self.depth = bound
+        props = list(self.verdicts) if props is None else props
+        return {lid: depth if depth is not None and depth < bound else None
+            for lid, depth in ((lid, self.verdicts[lid]) for lid in props)}
+
+class Service():
+    """Compiled programs and sessions by design content, with LRU eviction"""
+
+    def __init__(self, programs: int = 32, sessions: int = 8):
+        """
+        Args:
+            programs (int, optional): compiled programs kept. Defaults to 32.
+            sessions (int, optional): warm engines kept. Defaults to 8.
+        """
+        self.programs = LRU(programs)
+        self.sessions = LRU(sessions)
+
+    def program (self, path: str) -> tuple[str, CompiledProgram, CompiledProgram]:
+        """Content hash, full and COI-reduced program of a design"""
+        key = digest(path)
+        progs = self.programs.lookup(key)
+        if progs is None:
+            full = load_file(path)
+            progs = (full, COI().reduce(full))
+            self.programs.insert(key, progs)
+        return (key,) + progs
+
+    def handle (self, request: dict) -> dict:
+        """Answer a query {"design", "bound", "props", "init", "witness"}"""
+        start = time.perf_counter()
+        key, full, cprog = self.program(request["design"])
+        init = request.get("init", True)
+        session = self.sessions.lookup((key, init))
+        reused = 0
+        if session is None:
+            session = Session(full, cprog, init)
+            self.sessions.insert((key, init), session)
+        else:
+            reused = session.depth
+        verdicts = session.check(request["bound"], request.get("props"))
+        response = {
+            "ok": True,
+            "safe": all(depth is None for depth in verdicts.values()),
+            "verdicts": verdicts,
+            "traces": {lid: str(session.engine.traces[lid])
+                for lid, depth in verdicts.items() if depth is not None},
+            "reused": reused,
+        }
+        if request.get("witness"):
+            response["witnesses"] = {lid: session.engine.traces[lid].to_witness(full)
+                for lid, depth in verdicts.items() if depth is not None}
+        response["time"] = time.perf_counter() - start
+        return response
+
+class Handler(socketserver.StreamRequestHandler):
+    """One JSON request per line, answered by one JSON response per line"""
+
+    def handle (self):
+        for line in self.rfile:
+            try:
+                response = self.server.service.handle(json.loads(line))
+            # The loader exits on unsupported input
+            except (Exception, SystemExit) as e:
+                logger.warning("Request failed: %r", e)
+                response = {"ok": False, "error": repr(e)}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+class Server(socketserver.UnixStreamServer):
+    """Serves requests one at a time: sessions share no solver state across threads"""
+
+    def __init__(self, path: str, service: Service):
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, Handler)
+        self.service = service
+
+def query (path: str, request: dict) -> dict:
+    """Send a request to a running server
+    Args:
+        path (str): server socket
+        request (dict): query {"design", "bound", "props", "init", "witness"}
+    Returns:
+        dict: response, with verdicts keyed by bad lid
+    """
+    request = dict(request, design=os.path.abspath(request["design"]))
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        with sock.makefile("rwb") as f:
+            f.write(json.dumps(request).encode() + b"\n")
+            f.flush()
+            response = json.loads(f.readline())
+    # JSON object keys are strings
+    for field in ["verdicts", "traces", "witnesses"]:
+        if field in response:
+            response[field] = {int(lid): val for lid, val in response[field].items()}
+    return response
+
+def main ():
+    argparser = argparse.ArgumentParser(description="BTOR2EX BMC server")
+    argparser.add_argument("socket", type=str, help="Unix socket to listen on")
+    argparser.add_argument("--programs", type=int, default=32, help="Compiled programs kept")
+    argparser.add_argument("--sessions", type=int, default=8, help="Warm engines kept")
+    args = argparser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with Server(args.socket, Service(args.programs, args.sessions)) as server:
+        logger.info("Listening on %s", args.socket)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(args.socket)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Vectorized random simulation using NumPy: one lane per stimulus
+"""
+
+import logging
+import time
+
+import numpy as np
+
+from . import bv
+from .compiler import CompiledProgram, Op
+from .replay import Replayer
+from .trace import Trace
+
+logger = logging.getLogger(__name__)
+
+U64 = np.uint64
+
+def signed (a, w: int):
+    """Sign-extend lanes of width w to int64"""
+    return (a << U64(64 - w)).view(np.int64) >> (64 - w)
+
+def unsigned (s, w: int):
+    return s.astype(U64) & U64(bv.mask(w))
+
+def neg (a, w: int):
+    return (~a + U64(1)) & U64(bv.mask(w))
+
+def sdiv (a, b, w: int):
+    na, nb = signed(a, w) < 0, signed(b, w) < 0
+    # Divide magnitudes, which do not overflow unlike int64
+    ua, ub = np.where(na, neg(a, w), a), np.where(nb, neg(b, w), b)
+    q = ua // np.where(ub == 0, U64(1), ub)
+    q = np.where(na != nb, neg(q, w), q)
+    # Division by zero yields all ones for positive dividends, 1 otherwise
+    return np.where(b == 0, np.where(na, U64(1), U64(bv.mask(w))), q)
+
+def smod (a, b, w: int):
+    sa, sb = signed(a, w), signed(b, w)
+    # Sign follows the divisor
+    r = np.mod(sa, np.where(sb == 0, 1, sb))
+    return np.where(sb == 0, a, unsigned(r, w))
+
+def shift (b, w: int):
+    """Clamp shift amounts to a valid NumPy shift"""
+    return np.minimum(b, U64(w - 1))
+
+# Binary operators as (a, b, operand width) -> lanes
+VECOPS = {
+    "and": lambda a, b, w: a & b,
+    "or": lambda a, b, w: a | b,
+    "xor": lambda a, b, w: a ^ b,
+    "add": lambda a, b, w: (a + b) & U64(bv.mask(w)),
+    "sub": lambda a, b, w: (a - b) & U64(bv.mask(w)),
+    "mul": lambda a, b, w: (a * b) & U64(bv.mask(w)),
+    "udiv": lambda a, b, w: np.where(b == 0, U64(bv.mask(w)), a // np.where(b == 0, U64(1), b)),
+    "sdiv": sdiv,
+    "smod": smod,
+    "sll": lambda a, b, w: np.where(b >= w, U64(0), (a << shift(b, w)) & U64(bv.mask(w))),
+    "srl": lambda a, b, w: np.where(b >= w, U64(0), a >> shift(b, w)),
+    "sra": lambda a, b, w: unsigned(signed(a, w) >> shift(b, w).astype(np.int64), w),
+    "eq": lambda a, b, w: (a == b).astype(U64),
+    "neq": lambda a, b, w: (a != b).astype(U64),
+    "ugt": lambda a, b, w: (a > b).astype(U64),
+    "sgt": lambda a, b, w: (signed(a, w) > signed(b, w)).astype(U64),
+    "ugte": lambda a, b, w: (a >= b).astype(U64),
+    "sgte": lambda a, b, w: (signed(a, w) >= signed(b, w)).astype(U64),
+    "ult": lambda a, b, w: (a < b).astype(U64),
+    "slt": lambda a, b, w: (signed(a, w) < signed(b, w)).astype(U64),
+    "ulte": lambda a, b, w: (a <= b).astype(U64),
+    "slte": lambda a, b, w: (signed(a, w) <= signed(b, w)).astype(U64),
+    "implies": lambda a, b, w: ((a == 0) | (b != 0)).astype(U64),
+    "iff": lambda a, b, w: (a == b).astype(U64),
+}
+
+class Simulator():
+    """
+        Simulate a compiled program on many random stimuli in parallel.
+        Values are NumPy uint64 lanes, so every signal must fit in 64 bits.
+    """
+    def __init__(self, cprog: CompiledProgram, lanes: int = 1024, seed: int = 0, init: bool = True,
+        pins: dict[int, list[int]] = None):
+        """
+        Args:
+            cprog (CompiledProgram): program to simulate
+            lanes (int, optional): number of parallel stimuli. Defaults to 1024.
+            seed (int, optional): random seed. Defaults to 0.
+            init (bool, optional): start from the initial values. Defaults to True.
+            pins (dict[int, list[int]], optional): input values at each step, the
+                last repeating, instead of random ones (see BTOR2Ex). Defaults to None.
+        """
+        assert Simulator.supported(cprog), "Simulation requires bit-vectors of at most 64 bits"
+        self.cprog = cprog
+        self.lanes = lanes
+        self.seed = seed
+        self.init = init
+        self.pins = pins or {}
+        self.code = [(self.bind(op), op.lid, op.args) for op in cprog.ops]
+        init_cone = cprog.cone([v for _, v in cprog.inits])
+        self.init_code = [c for c in self.code if c[1] in init_cone]
+        self.free = [st for st in cprog.states if st[0] not in dict(cprog.nexts)]
+
+    @staticmethod
+    def supported (cprog: CompiledProgram) -> bool:
+        return not cprog.arrays and all(w <= 64 for w in cprog.widths.values())
+
+    def bind (self, op: Op):
+        """Resolve a compiled instruction to a function over operand lanes"""
+        widths = [self.cprog.widths[a] for a in op.args]
+        match op.opcode:
+            case "const":
+                val = np.full(self.lanes, op.params[0], dtype=U64)
+                return lambda: val
+            case "not":
+                m = U64(bv.mask(widths[0]))
+                return lambda a: ~a & m
+            case "ite":
+                return lambda c, t, e: np.where(c != 0, t, e)
+            case "uext":
+                return lambda a: a
+            case "slice":
+                high, low = op.params
+                m, low = U64(bv.mask(high - low + 1)), U64(low)
+                return lambda a: (a >> low) & m
+            case "concat":
+                wb = U64(widths[1])
+                return lambda a, b: (a << wb) | b
+            case _:
+                fn, w = VECOPS[op.opcode], widths[0]
+                return lambda a, b: fn(a, b, w)
+
+    def stimulus (self, step: int, decls: list[tuple]) -> dict:
+        """Random lanes for the given declarations, reproducible per step"""
+        rng = np.random.default_rng((self.seed, step))
+        return {lid: rng.integers(0, 2**64 - 1, self.lanes, dtype=U64, endpoint=True)
+            & U64(bv.mask(self.cprog.sorts[sid])) for lid, sid, _ in decls}
+
+    def initial (self) -> dict:
+        """Initial state lanes: initial values where given, random otherwise"""
+        state = self.stimulus(0, self.cprog.states)
+        if not self.init:
+            return state
+        # Initial values may refer to the initial values of other states and
+        # to the inputs of the first step
+        inputs = self.inputs(0)
+        for _ in self.cprog.inits:
+            env = {**inputs, **state}
+            for fn, lid, args in self.init_code:
+                env[lid] = fn(*[env[a] for a in args])
+            changed = False
+            for stid, vlid in self.cprog.inits:
+                changed |= not np.array_equal(state[stid], env[vlid])
+                state[stid] = env[vlid]
+            if not changed:
+                break
+        return state
+
+    def inputs (self, step: int) -> dict:
+        """Inputs of a step, plus fresh values for states without next"""
+        env = self.stimulus(step + 1, self.cprog.inputs + (self.free if step else []))
+        for lid, vals in self.pins.items():
+            if lid in env:
+                val = vals[min(step, len(vals) - 1)] & bv.mask(self.cprog.widths[lid])
+                env[lid] = np.full(self.lanes, val, dtype=U64)
+        return env
+
+    def run (self, steps: int) -> Trace:
+        """Simulate all lanes
+        Args:
+            steps (int): number of steps
+        Returns:
+            Trace: first counterexample found, None if no lane reaches a bad
+        """
+        start = time.perf_counter()
+        state = self.initial()
+        live = np.ones(self.lanes, dtype=bool)
+        hit = None
+        k = -1
+        for k in range(steps):
+            env = self.inputs(k)
+            env.update(state)
+            for fn, lid, args in self.code:
+                env[lid] = fn(*[env[a] for a in args])
+            # Lanes leaving the constraints are dead
+            for _, clid in self.cprog.constraints:
+                live &= env[clid] != 0
+            bad = np.zeros(self.lanes, dtype=bool)
+            for _, clid in self.cprog.bads:
+                bad |= env[clid] != 0
+            hits = np.flatnonzero(live & bad)
+            if len(hits):
+                hit = int(hits[0])
+                break
+            state = {stid: env[vlid] for stid, vlid in self.cprog.nexts}
+        elapsed = time.perf_counter() - start
+        logger.info("Simulated %d lanes for %d steps: %.0f lane-cycles/s",
+            self.lanes, k + 1, self.lanes * (k + 1) / max(elapsed, 1e-9))
+        return self.trace(hit, k) if hit is not None else None
+
+    def trace (self, lane: int, depth: int) -> Trace:
+        """Rebuild the trace of a lane from its reproducible stimulus"""
+        trace = Trace(self.cprog)
+        replayer = Replayer(self.cprog)
+        state = {lid: int(v[lane]) for lid, v in self.initial().items()}
+        for k in range(depth + 1):
+            env = {lid: int(v[lane]) for lid, v in self.inputs(k).items()}
+            env.update(state)
+            trace.steps.append({lid: env[lid] for lid, _, _ in self.cprog.states + self.cprog.inputs})
+            state = replayer.step(env)
+        trace.bads = [lid for lid, clid in self.cprog.bads if env[clid]]
+        return trace
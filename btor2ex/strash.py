@@ -0,0 +1,214 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Word-level structural hashing and rewriting of a compiled program
+"""
+
+import logging
+from itertools import count
+
+from . import bv
+from .compiler import CompiledProgram, Op
+from .foldsolver import COMMUTATIVE
+
+logger = logging.getLogger(__name__)
+
+# Predicates of two equal operands
+REFLEXIVE = {"eq": 1, "iff": 1, "implies": 1, "ulte": 1, "ugte": 1, "slte": 1, "sgte": 1,
+    "neq": 0, "ult": 0, "ugt": 0, "slt": 0, "sgt": 0}
+
+class Strash():
+    """
+        Structural hashing with constant propagation and simple rewrites, then
+        registers that provably keep their initial value are replaced by it and
+        registers that provably always agree (e.g. the two copies of a register
+        in a miter) by one representative, by refining candidate classes to a
+        fixed point. Replaced registers keep their declaration, their next
+        pointing to the shared logic, so traces and witnesses still show them.
+    """
+    def __init__(self, init: bool = True):
+        """
+        Args:
+            init (bool, optional): states start from their initial values, required
+                for the sequential reductions. Defaults to True.
+        """
+        self.init = init
+
+    def hash (self, cprog: CompiledProgram, subst: dict[int, tuple]) -> tuple:
+        """Hash the combinational logic with registers substituted
+        Args:
+            cprog (CompiledProgram): compiled program
+            subst (dict[int, tuple]): state lid -> ("state", lid) or ("const", value)
+        Returns:
+            tuple: ops, canonical lid of every lid, value of every constant lid
+        """
+        ops : list[Op] = []
+        rep : dict[int, int] = {}
+        table : dict[tuple, int] = {}
+        values : dict[int, int] = {}
+        defs : dict[int, Op] = {}
+
+        def const (val: int, width: int, lid: int = None) -> int:
+            val &= bv.mask(width)
+            key = ("const", (), (val, width))
+            if key not in table:
+                # Keep the lid a constant got in earlier rounds
+                if (val, width) not in self.consts:
+                    self.consts[(val, width)] = next(self.fresh) if lid is None else lid
+                lid = self.consts[(val, width)]
+                self.widths[lid] = width
+                table[key] = lid
+                values[lid] = val
+                defs[lid] = Op("const", lid, (), (val, width))
+                ops.append(defs[lid])
+            return table[key]
+
+        for lid, (kind, val) in subst.items():
+            rep[lid] = const(val, self.widths[lid]) if kind == "const" else val
+
+        def simplify (op: Op, args: tuple) -> int:
+            """Canonical lid of an instruction that reduces to an existing one, or None"""
+            w = self.widths[op.lid]
+            vals = [values.get(a) for a in args]
+            if op.opcode == "const":
+                return const(op.params[0], op.params[1], op.lid)
+            if args and None not in vals and op.opcode not in ("read", "write"):
+                return const(bv.apply(op.opcode, op.params, vals,
+                    [self.widths[a] for a in args]), w)
+            match op.opcode:
+                case "ite":
+                    if vals[0] is not None:
+                        return args[1] if vals[0] else args[2]
+                    if args[1] == args[2]:
+                        return args[1]
+                case "not":
+                    inner = defs.get(args[0])
+                    if inner is not None and inner.opcode == "not":
+                        return inner.args[0]
+            if len(args) != 2 or op.opcode not in bv.BINOPS:
+                return None
+            a, b = args
+            va, vb = vals
+            ones = bv.mask(w)
+            if a == b:
+                if op.opcode in ("and", "or"):
+                    return a
+                if op.opcode in ("xor", "sub"):
+                    return const(0, w)
+                if op.opcode in REFLEXIVE:
+                    return const(REFLEXIVE[op.opcode], 1)
+            if op.opcode in COMMUTATIVE and va is not None:
+                a, b, va, vb = b, a, vb, va
+            match (op.opcode, vb):
+                case ("and", 0) | ("mul", 0):
+                    return const(0, w)
+                case ("or", v) if v == ones:
+                    return const(ones, w)
+                case ("and", v) if v == ones:
+                    return a
+                case ("or" | "xor" | "add" | "sub" | "sll" | "srl" | "sra", 0) | ("mul" | "udiv", 1):
+                    return a
+            return None
+
+        for op in cprog.ops:
+            args = tuple(rep.get(a, a) for a in op.args)
+            lid = simplify(op, args)
+            if lid is not None:
+                rep[op.lid] = lid
+                continue
+            if op.opcode in COMMUTATIVE:
+                args = tuple(sorted(args))
+            key = (op.opcode, args, op.params)
+            if key in table:
+                rep[op.lid] = table[key]
+                continue
+            table[key] = op.lid
+            defs[op.lid] = Op(op.opcode, op.lid, args, op.params)
+            ops.append(defs[op.lid])
+        return ops, rep, values
+
+    def classes (self, cprog: CompiledProgram) -> list[list]:
+        """Candidate register classes: same sort and constant initial value,
+        marked as constant until shown otherwise"""
+        if not self.init:
+            return []
+        init_vals = cprog.const_values()
+        nexts = dict(cprog.nexts)
+        inits = {stid: init_vals[vlid] for stid, vlid in cprog.inits if vlid in init_vals}
+        groups : dict[tuple, list[int]] = {}
+        for lid, sid, _ in cprog.states:
+            if lid in inits and lid in nexts and lid not in cprog.array_lids:
+                val = inits[lid] & bv.mask(self.widths[lid])
+                groups.setdefault((sid, val), []).append(lid)
+        return [[members, val, True] for (_, val), members in groups.items()]
+
+    def reduce (self, cprog: CompiledProgram) -> CompiledProgram:
+        """Run on a compiled program
+        Args:
+            cprog (CompiledProgram): compiled program
+        Returns:
+            CompiledProgram: reduced program
+        """
+        self.widths = dict(cprog.widths)
+        self.fresh = count(max(self.widths, default=0) + 1)
+        self.consts : dict[tuple, int] = {}
+        nexts = dict(cprog.nexts)
+
+        # Refine the classes until every class is inductive: constant classes
+        # whose nexts all hash to their value, other classes whose members'
+        # nexts all hash to the same lid once members are merged
+        classes = self.classes(cprog)
+        while True:
+            subst = {}
+            for members, val, constant in classes:
+                for lid in members if constant else members[1:]:
+                    subst[lid] = ("const", val) if constant else ("state", members[0])
+            ops, rep, values = self.hash(cprog, subst)
+            canon = lambda lid: rep.get(lid, lid)
+            refined, changed = [], False
+            for members, val, constant in classes:
+                if constant:
+                    # Members whose next is not the value may still agree with each other
+                    kept = [lid for lid in members if values.get(canon(nexts[lid])) == val]
+                    dropped = [lid for lid in members if lid not in kept]
+                    refined += [[group, val, flag] for group, flag in ((kept, True), (dropped, False)) if group]
+                    changed |= bool(dropped)
+                    continue
+                split : dict[int, list[int]] = {}
+                for lid in members:
+                    split.setdefault(canon(nexts[lid]), []).append(lid)
+                changed |= len(split) > 1
+                refined.extend([group, val, False] for group in split.values())
+            # Singletons cannot be merged any further
+            classes = [cls for cls in refined if cls[2] or len(cls[0]) > 1]
+            if not changed:
+                break
+
+        reduced = CompiledProgram()
+        reduced.sorts, reduced.arrays, reduced.alias = cprog.sorts, cprog.arrays, cprog.alias
+        reduced.states, reduced.inputs = list(cprog.states), list(cprog.inputs)
+        reduced.nexts = [(stid, canon(vlid)) for stid, vlid in cprog.nexts]
+        reduced.inits = [(stid, canon(vlid)) for stid, vlid in cprog.inits]
+        reduced.constraints = [(lid, canon(clid)) for lid, clid in cprog.constraints]
+        reduced.bads = [(lid, canon(clid)) for lid, clid in cprog.bads]
+        # Drop the logic no longer used
+        roots = [vlid for _, vlid in reduced.nexts + reduced.inits +
+            reduced.constraints + reduced.bads]
+        reduced.ops = ops
+        live = reduced.cone(roots)
+        reduced.ops = [op for op in ops if op.lid in live]
+        declared = {lid for lid, _, _ in reduced.states + reduced.inputs}
+        names = {name: lid if lid in declared else canon(lid) for name, lid in cprog.names.items()}
+        reduced.names = {name: lid for name, lid in names.items() if lid in declared or lid in live}
+        reduced.widths = {lid: w for lid, w in self.widths.items() if lid in declared or lid in live}
+        reduced.array_lids = {lid for lid in cprog.array_lids if lid in reduced.widths}
+
+        merged = sum(len(members) - 1 for members, _, constant in classes if not constant)
+        constant = sum(len(members) for members, _, constant in classes if constant)
+        logger.info("Strash: %d to %d instructions, %d constant and %d merged registers",
+            len(cprog.ops), len(reduced.ops), constant, merged)
+        return reduced
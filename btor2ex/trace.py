@@ -0,0 +1,74 @@
+# =============================================================================
+#   BTOR Symbolic Execution Engine and Backends
+#
+#   BSD 3-Clause License. Copyright (c) 2024, Adwait Godbole
+# =============================================================================
+
+"""
+    Counterexample traces
+"""
+
+from .compiler import CompiledProgram
+
+class Trace():
+    """
+        Values of every state and input of a program at each step,
+        indexed as trace[step, signal] with signal a name or a lid
+    """
+    def __init__(self, cprog: CompiledProgram):
+        """
+        Args:
+            cprog (CompiledProgram): program the trace runs on
+        """
+        self.cprog = cprog
+        # Values by lid at each step
+        self.steps : list[dict[int, int]] = []
+        # Bads reached at the last step
+        self.bads : list[int] = []
+
+    def __len__ (self) -> int:
+        return len(self.steps)
+
+    def __getitem__ (self, key: tuple) -> int:
+        step, signal = key
+        if isinstance(signal, str):
+            signal = self.cprog.names[signal]
+        return self.steps[step][signal]
+
+    def __str__ (self) -> str:
+        lines = []
+        for step, values in enumerate(self.steps):
+            lines.append(f"step {step}")
+            for lid, _, name in self.cprog.states + self.cprog.inputs:
+                if lid in values:
+                    lines.append(f"  {name} = {values[lid]:#x}")
+        return "\n".join(lines)
+
+    def to_witness (self, cprog: CompiledProgram = None) -> str:
+        """Serialize to the BTOR2 witness format
+        Args:
+            cprog (CompiledProgram, optional): program whose declaration order
+                numbers states, inputs and bads, e.g. the program before a
+                cone of influence reduction. Defaults to the trace's program.
+        Returns:
+            str: witness text, signals absent from the trace are reported as 0
+                and array states are omitted
+        """
+        cprog = cprog or self.cprog
+        badidx = [i for i, (lid, _) in enumerate(cprog.bads) if lid in self.bads]
+        lines = ["sat", " ".join(f"b{i}" for i in badidx)]
+        for step, values in enumerate(self.steps):
+            if step == 0:
+                lines.append("#0")
+                for i, (lid, sid, name) in enumerate(cprog.states):
+                    if sid in cprog.arrays:
+                        # Array contents are not recorded
+                        continue
+                    lines.append(f"{i} {values.get(lid, 0):0{cprog.sorts[sid]}b} {name}#0")
+            lines.append(f"@{step}")
+            for i, (lid, sid, name) in enumerate(cprog.inputs):
+                if sid in cprog.arrays:
+                    continue
+                lines.append(f"{i} {values.get(lid, 0):0{cprog.sorts[sid]}b} {name}@{step}")
+        lines.append(".")
+        return "\n".join(lines) + "\n"
@@ -12,5 +12,6 @@
 def parsewrapper(filepath):
     btor2str: list[str] = []
     with open(filepath, "r") as f:
-        btor2str = f.readlines()
+        # Without line endings, which btoropt would keep in symbol names
+        btor2str = f.read().splitlines()
     return btor2str
\ No newline at end of file
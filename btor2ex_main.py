@@ -4,36 +4,340 @@
 import argparse
 import sys
 import logging
+import time
 
 import btoropt
 
 import btor2ex.btor2ex as btor2ex
 import btor2ex.utils as utils
 import btor2ex.boolectorsolver as boolectorsolver
+from btor2ex.coi import COI
+from btor2ex.foldsolver import FoldingSolver
+from btor2ex.kind import KInduction, Verdict
+import btor2ex.pdr as pdr
+from btor2ex.pdr import PDR
+import btor2ex.parallel as parallel
+import btor2ex.batch as batch
+from btor2ex.phased import check_phases, schedule
+import btor2ex.portfolio as portfolio
+from btor2ex.replay import Replayer
+from btor2ex.compiler import CompiledProgram, compile_program
+from btor2ex.loader import load_file
+from btor2ex.cache import CACHE_DIR, ProgramCache
+from btor2ex.profiling import Profiler, ProfilingSolver
+from btor2ex.strash import Strash
+import btor2ex.server as server
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def compiled(prgm):
+    return prgm if isinstance(prgm, CompiledProgram) else compile_program(prgm)
+
+def load(args):
+    """Parse the input file
+    Returns:
+        tuple: full program and the program to check
+    """
+    if not args.stream:
+        lines = utils.parsewrapper(args.input)
+        # btoropt does not represent arrays: those are compiled from the text directly
+        args.stream = any(line.split()[2:3] == ["array"] for line in lines if " sort " in line)
+    if args.stream:
+        full = prgm = load_file(args.input)
+        if not args.no_coi:
+            prgm = COI().reduce(full)
+    else:
+        full = prgm = btoropt.parse(lines)
+        if not args.no_coi:
+            prgm = COI().run(full)
+    return full, prgm
+
 def main(args):
     
     # Get input file and BMC bound from command line
     argparser = argparse.ArgumentParser(description="BTOR2EX: BTOR2 symbolic execution engine")
     
-    argparser.add_argument("input", type=str, help="Input BTOR2 file")
+    argparser.add_argument("input", type=str, help="Input BTOR2 file (directory or manifest with --batch)")
     argparser.add_argument("-b", "--bound", type=int, help="BMC bound", default=3)
+    argparser.add_argument("--no-coi", action="store_true", help="Disable cone of influence reduction")
+    argparser.add_argument("--no-strash", action="store_true",
+        help="Disable structural hashing and register merging")
+    argparser.add_argument("--cache", type=str, nargs="?", const=CACHE_DIR,
+        help=f"Reuse compiled programs across runs, stored in CACHE (default {CACHE_DIR})")
+    argparser.add_argument("--connect", type=str,
+        help="Send the check to a server listening on socket CONNECT (python3 -m btor2ex.server)")
+    argparser.add_argument("--stream", action="store_true",
+        help="Load the input line by line into the compiled form, for very large netlists "
+            "(always used for designs with arrays, which btoropt does not parse)")
+    argparser.add_argument("--timeout", type=float,
+        help="Stop BMC after TIMEOUT seconds, reporting the depth shown safe so far")
+    argparser.add_argument("--check-timeout", type=float,
+        help="Give up on a bad whose check takes over CHECK_TIMEOUT seconds")
+    argparser.add_argument("--free-init", action="store_true",
+        help="Ignore init instructions: all states start unconstrained")
+    argparser.add_argument("--no-fold", action="store_true", help="Disable hash-consing and constant folding")
+    argparser.add_argument("--solver", choices=["boolector", "bitwuzla"], default="boolector",
+        help="Backend solver (bitwuzla requires the bitwuzla package)")
+    argparser.add_argument("-j", "--jobs", type=int, default=0,
+        help="Check each bad separately on a pool of JOBS worker processes")
+    argparser.add_argument("--batch", type=str,
+        help="Check every design of the input directory or manifest on a pool of JOBS workers, writing a JSONL summary to BATCH")
+    argparser.add_argument("-p", "--portfolio", type=int, default=0,
+        help="Race PORTFOLIO differently configured solvers and take the first answer")
+    argparser.add_argument("--pin", type=str, action="append", default=[],
+        help="NAME=V[,V...]: give input NAME value V at each step, the last repeating (e.g. rst=1,0)")
+    argparser.add_argument("--phase", type=str, action="append", default=[],
+        help="STAGE:BAD[,BAD...]: check these bads only in frames where the proof schedule counter is at STAGE")
+    argparser.add_argument("--counter", type=str, default="fv__counter",
+        help="Proof schedule counter of --phase (default fv__counter, see prfsm.py)")
+    argparser.add_argument("-w", "--witness", type=str, help="Write the counterexample as a BTOR2 witness")
+    argparser.add_argument("-k", "--kind", action="store_true",
+        help="Prove the bads unreachable by k-induction up to the bound")
+    argparser.add_argument("--pdr", action="store_true",
+        help="Prove the bads unreachable by IC3/PDR with at most BOUND frames")
+    argparser.add_argument("--sim", type=int, default=0,
+        help="Randomly simulate SIM stimuli up to the bound before BMC (requires numpy)")
+    argparser.add_argument("--profile", type=str,
+        help="Write solver call, step and check times as a JSON report")
+    argparser.add_argument("--chrome-trace", type=str,
+        help="Write steps and checks as a Chrome trace (chrome://tracing, Perfetto)")
     
     args = argparser.parse_args()
     
-    # Parse the input file
-    prgm = btoropt.parse(utils.parsewrapper(args.input))
+    # Pinned values only propagate as constants through the folding layer
+    if args.pin and args.no_fold:
+        logger.error("--pin requires constant folding (drop --no-fold)")
+        sys.exit(1)
+    # The stage of a frame is only known when the counter starts from its init
+    if args.phase and args.free_init:
+        logger.error("--phase requires initial values (drop --free-init)")
+        sys.exit(1)
+    
+    # The server only runs BMC on Boolector with COI and folding
+    if args.connect:
+        unsupported = [flag for flag, given in [("-k", args.kind), ("--pdr", args.pdr), ("--pin", args.pin),
+            ("--phase", args.phase), ("--timeout", args.timeout), ("--check-timeout", args.check_timeout),
+            ("--solver", args.solver != "boolector"), ("--no-coi", args.no_coi), ("--no-fold", args.no_fold),
+            ("--sim", args.sim), ("-j", args.jobs), ("-p", args.portfolio),
+            ("--batch", args.batch), ("--profile", args.profile), ("--chrome-trace", args.chrome_trace)] if given]
+        if unsupported:
+            logger.error("Not supported with --connect: %s", " ".join(unsupported))
+            sys.exit(1)
+    # Workers resolve pins on their own copy of the program: check the names first
+    if args.pin and (args.jobs or args.portfolio) and not args.batch:
+        load_file(args.input).resolve_pins(pin_values(args))
+    
+    if args.connect:
+        response = server.query(args.connect, {"design": args.input, "bound": args.bound,
+            "init": not args.free_init, "witness": bool(args.witness)})
+        if not response["ok"]:
+            logger.error("Server error: %s", response["error"])
+            sys.exit(1)
+        logger.info("Answered in %.3fs (%d depths reused)", response["time"], response["reused"])
+        if response["safe"]:
+            print("SAFE")
+            return
+        print("UNSAFE")
+        lid = min(response["traces"], key=lambda lid: response["verdicts"][lid])
+        print(response["traces"][lid])
+        if args.witness:
+            with open(args.witness, "w") as f:
+                f.write(response["witnesses"][lid])
+        return
+    
+    if args.batch:
+        records = batch.run(batch.designs(args.input, args.bound), args.batch, args.jobs or None,
+            {"backend": args.solver, "init": not args.free_init,
+            "coi": not args.no_coi, "strash": not args.no_strash, "fold": not args.no_fold,
+            "pins": pin_values(args)})
+        counts = {result: sum(r["result"] == result for r in records) for result in ["SAFE", "UNSAFE", "ERROR"]}
+        print(", ".join(f"{n} {result}" for result, n in counts.items()) + f" (summary in {args.batch})")
+        return
+    
+    if args.jobs:
+        verdicts = parallel.check_properties(utils.parsewrapper(args.input), args.bound, args.jobs,
+            {"backend": args.solver, "init": not args.free_init, "coi": not args.no_coi,
+            "strash": not args.no_strash, "fold": not args.no_fold, "pins": pin_values(args)})
+        print(parallel.format_verdicts(verdicts, args.bound))
+        if any(depth is not None for depth in verdicts.values()):
+            print("UNSAFE")
+        else:
+            print("SAFE")
+        return
+    
+    if args.portfolio:
+        result, winner = portfolio.race(utils.parsewrapper(args.input), args.bound, jobs=args.portfolio,
+            settings={"init": not args.free_init, "coi": not args.no_coi,
+            "strash": not args.no_strash, "fold": not args.no_fold, "pins": pin_values(args)})
+        if winner is None:
+            print("UNKNOWN (no configuration answered)")
+            return
+        print(f"{'SAFE' if result else 'UNSAFE'} (configuration {winner})")
+        return
+    
+    # Parse the input file, or reuse its compiled form from an earlier run
+    cache = key = None
+    if args.cache:
+        cache = ProgramCache(args.cache)
+        key = cache.key(args.input, coi=not args.no_coi)
+    cached = cache.get(key) if cache else None
+    if cached is not None:
+        full, prgm = cached
+    else:
+        full, prgm = load(args)
+        if cache:
+            full, prgm = compiled(full), compiled(prgm)
+            cache.put(key, (full, prgm))
+    if not args.no_strash:
+        prgm = Strash(init=not args.free_init).reduce(compiled(prgm))
 
-    engine = btor2ex.BTOR2Ex(boolectorsolver.BoolectorSolver("test"), prgm)
-    result = engine.bmc(args.bound)
+    if args.sim:
+        from btor2ex.simulator import Simulator
+        cprgm = compiled(prgm)
+        if Simulator.supported(cprgm):
+            trace = Simulator(cprgm, args.sim, init=not args.free_init,
+                pins=pins(args, compiled(full), cprgm)).run(args.bound)
+            if trace is not None:
+                print("UNSAFE (simulation)")
+                print(trace)
+                if args.witness:
+                    with open(args.witness, "w") as f:
+                        f.write(trace.to_witness(compiled(full)))
+                return
+        else:
+            logger.warning("Skipping simulation: arrays or signals wider than 64 bits")
+    
+    profiler = Profiler() if args.profile or args.chrome_trace else None
+
+    def mk_solver(id, opts=None):
+        if args.solver == "bitwuzla":
+            from btor2ex.bitwuzlasolver import BitwuzlaSolver
+            # Options are Boolector's
+            slv = BitwuzlaSolver(id)
+        else:
+            slv = boolectorsolver.BoolectorSolver(id, opts)
+        if profiler is None:
+            return slv if args.no_fold else FoldingSolver(slv)
+        # Backend calls are reported apart from those of the folding layer
+        slv = ProfilingSolver(slv, profiler, "" if args.no_fold else "backend.")
+        return slv if args.no_fold else ProfilingSolver(FoldingSolver(slv), profiler)
+
+    try:
+        check(args, full, prgm, mk_solver, profiler)
+    finally:
+        if profiler is not None:
+            logger.info("Profile:\n%s", profiler.summary())
+            if args.profile:
+                profiler.write_json(args.profile)
+            if args.chrome_trace:
+                profiler.write_chrome(args.chrome_trace)
+
+def check(args, full, prgm, mk_solver, profiler=None):
+    """Run the selected engine and print its verdict"""
+    pinned = pins(args, compiled(full), compiled(prgm))
+    if args.kind or args.pdr:
+        if args.pdr:
+            prover = PDR(mk_solver("pdr", pdr.BOOLECTOR_OPTS), prgm, init=not args.free_init, pins=pinned)
+        else:
+            prover = KInduction(mk_solver("base"), mk_solver("step"), prgm, init=not args.free_init,
+                pins=pinned)
+            prover.base.profiler = profiler
+        verdict = prover.run(args.bound)
+        print(f"{verdict.value} (k={prover.k})")
+        if verdict == Verdict.FALSIFIED:
+            print(prover.trace)
+            if args.witness:
+                with open(args.witness, "w") as f:
+                    f.write(prover.trace.to_witness(compiled(full)))
+        return
+
+    engine = btor2ex.BTOR2Ex(mk_solver("test"), prgm, init=not args.free_init, profiler=profiler,
+        pins=pinned)
+    if args.phase:
+        phases = {}
+        for phase in args.phase:
+            stage, bads = phase.split(":")
+            phases.setdefault(int(stage), []).extend(int(lid) for lid in bads.split(","))
+        # The counter may be outside the cone of influence of the bads
+        verdicts = check_phases(engine, schedule(compiled(full), args.counter, args.bound), phases)
+        print(parallel.format_verdicts(verdicts, args.bound))
+        falsified = {lid: depth for lid, depth in verdicts.items() if depth is not None}
+        if not falsified:
+            print("SAFE")
+            return
+        print("UNSAFE")
+        engine.trace = engine.traces[min(falsified, key=falsified.get)]
+        print(engine.trace)
+        if args.witness:
+            with open(args.witness, "w") as f:
+                f.write(engine.trace.to_witness(compiled(full)))
+        return
+    if args.timeout or args.check_timeout:
+        result = bmc_limited(args, engine)
+        if result is None:
+            return
+    else:
+        result = engine.bmc(args.bound)
     
     if result:
         print("SAFE")
     else:
-        print("UNSAFE: please see log for trace")
+        print("UNSAFE")
+        print(engine.trace)
+        if engine.cprog.arrays:
+            logger.info("Skipping trace replay: array contents are not recorded")
+        elif not Replayer(engine.cprog, init=not args.free_init).validate(engine.trace):
+            logger.error("Trace does not replay to a bad state")
+        if args.witness:
+            with open(args.witness, "w") as f:
+                f.write(engine.trace.to_witness(compiled(full)))
+
+def pin_values(args):
+    """Input values given by --pin, by input name"""
+    values = {}
+    for pin in args.pin:
+        name, vals = pin.split("=")
+        values[name] = [int(val, 0) for val in vals.split(",")]
+    return values
+
+def pins(args, full, cprgm):
+    """Input values given by --pin, by lid
+    Args:
+        full (CompiledProgram): program as loaded, naming the inputs
+        cprgm (CompiledProgram): program to check
+    """
+    pinned = full.resolve_pins(pin_values(args))
+    kept = {lid for lid, _, _ in cprgm.inputs}
+    for name, lid in full.names.items():
+        if lid in pinned and lid not in kept:
+            logger.info("Input %s is outside the cone of influence, ignoring its pin", name)
+    return {lid: vals for lid, vals in pinned.items() if lid in kept}
+
+def bmc_limited(args, engine):
+    """BMC under the time limits, reporting each check as it is decided
+    Returns:
+        bool: is the program safe, None if undecided (reported here)
+    """
+    deadline = time.perf_counter() + args.timeout if args.timeout else None
+    # Deepest depth at which every bad was checked unreachable
+    safe = -1
+    undecided = None
+    for res in engine.bmc_iter(args.bound, deadline=deadline, timeout=args.check_timeout):
+        status = {True: "UNSAFE", False: "SAFE", None: "UNKNOWN"}[res.sat]
+        logger.info("Depth %d bad %d: %s (%.3fs)", res.depth, res.lid, status, res.time)
+        if res.sat:
+            engine.trace = engine.traces[res.lid]
+            return False
+        if res.sat is None and undecided is None:
+            undecided = res.depth
+        if undecided is None:
+            safe = res.depth
+    # Without bads (e.g. none left in the cone of influence) nothing is checked
+    if undecided is None and (safe == args.bound - 1 or not engine.cprog.bads):
+        return True
+    print(f"UNKNOWN (safe up to depth {safe if undecided is None else undecided - 1})")
+    return None
 
 if __name__ == "__main__":
     main(sys.argv[1:])
\ No newline at end of file
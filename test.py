@@ -1,12 +1,46 @@
 
+import gc
+import json
+import multiprocessing
+import multiprocessing.queues
+import os
+import queue
+import tempfile
+import threading
+import time
 import unittest
+from unittest import mock
 
 import btoropt
 
 from btor2ex.boolectorsolver import BoolectorSolver
 import btor2ex.prfsm as prfsm
+from btor2ex.coi import COI
 from btor2ex.btor2ex import BTOR2Ex
+from btor2ex.compiler import compile_program
+from btor2ex.foldsolver import FoldingSolver
+from btor2ex.kind import KInduction, Verdict
+from btor2ex.pdr import BOOLECTOR_OPTS, PDR
+from btor2ex.phased import check_phases, schedule
+from btor2ex.loader import load_file, load_program
+from btor2ex.cache import SUFFIX, ProgramCache
+from btor2ex.profiling import Profiler, ProfilingSolver
+from btor2ex.server import Server, Service, query
+from btor2ex.strash import Strash
 import btor2ex.utils as utils
+import btor2ex.parallel as parallel
+import btor2ex.batch as batch
+import btor2ex.portfolio as portfolio
+from btor2ex.replay import Replayer
+from btor2ex.trace import Trace
+try:
+    from btor2ex.simulator import Simulator
+except ImportError:
+    Simulator = None
+try:
+    from btor2ex.bitwuzlasolver import BitwuzlaSolver
+except ImportError:
+    BitwuzlaSolver = None
 
 
 class PrFSMTest(unittest.TestCase):
@@ -20,6 +54,449 @@ class PrFSMTest(unittest.TestCase):
         self.assertEqual(cprgm[0].lid, 23)
         self.assertEqual(cprgm[-1].lid, 28)
 
+class COITest(unittest.TestCase):
+    """Check whether the cone of influence is computed correctly"""
+    
+    def test_coi(self):
+        prgm = btoropt.parse(utils.parsewrapper("tests/btor/reg_en.bad.btor"))
+
+        reduced = COI().run(prgm)
+        self.assertEqual(len(reduced), 19)
+        # Clock, outputs and clock renamings do not reach the bad
+        self.assertFalse({9, 11, 13, 14, 15} & {inst.lid for inst in reduced})
+
+    def test_coi_compiled(self):
+        prgm = btoropt.parse(utils.parsewrapper("tests/btor/reg_en.bad.btor"))
+
+        expected = compile_program(COI().run(prgm))
+        reduced = COI().reduce(compile_program(prgm))
+        self.assertEqual(reduced.states, expected.states)
+        self.assertEqual(reduced.inputs, expected.inputs)
+        self.assertEqual(reduced.ops, expected.ops)
+        self.assertNotIn("clk", reduced.names)
+
+class StrashTest(unittest.TestCase):
+    """Check whether structural hashing merges and propagates registers soundly"""
+
+    # a and b are a miter of one accumulator, c stays zero
+    PRGM = [
+        "1 sort bitvec 1", "2 sort bitvec 8", "3 zero 2", "4 input 2 x",
+        "5 state 2 a", "6 init 2 5 3", "7 state 2 b", "8 init 2 7 3",
+        "9 add 2 5 4", "10 add 2 4 7", "11 next 2 5 9", "12 next 2 7 10",
+        "13 state 2 c", "14 init 2 13 3", "15 and 2 13 4", "16 next 2 13 15",
+        "17 neq 1 5 7", "18 neq 1 13 3", "19 or 1 17 18", "20 bad 19",
+    ]
+
+    def test_strash(self):
+        cprgm = load_program(self.PRGM)
+        reduced = Strash().reduce(cprgm)
+        # The bad folds to false, every register is kept for traces
+        self.assertEqual(reduced.states, cprgm.states)
+        self.assertEqual(reduced.const_values()[reduced.bads[0][1]], 0)
+        self.assertTrue(BTOR2Ex(BoolectorSolver("strash"), reduced).bmc(5))
+
+        # Nothing is known of free initial states
+        free = Strash(init=False).reduce(cprgm)
+        self.assertEqual(len(free.ops), len(cprgm.ops))
+        self.assertFalse(BTOR2Ex(BoolectorSolver("free"), free, init=False).bmc(1))
+
+    def test_strash_bmc(self):
+        for path in ["tests/btor/reg_en.bad.btor", "tests/btor/mem.bad.btor", "tests/btor/loop.safe.btor"]:
+            cprgm = load_file(path)
+            expected = BTOR2Ex(BoolectorSolver("full"), cprgm).bmc(5)
+            engine = BTOR2Ex(BoolectorSolver("strash"), Strash().reduce(cprgm))
+            self.assertEqual(engine.bmc(5), expected)
+            # Counterexamples of the reduced program replay on the original
+            if not expected and not cprgm.arrays:
+                self.assertTrue(Replayer(cprgm).validate(engine.trace))
+
+class CompileTest(unittest.TestCase):
+    """Check whether programs are lowered to the instruction table correctly"""
+    
+    def test_compile(self):
+        prgm = btoropt.parse(utils.parsewrapper("tests/btor/reg_en.bad.btor"))
+
+        cprgm = compile_program(prgm)
+        self.assertEqual([lid for lid, _, _ in cprgm.states], [10, 12])
+        self.assertEqual(len(cprgm.inputs), 7)
+        self.assertEqual(cprgm.nexts, [(10, 18), (12, 21)])
+        self.assertEqual(cprgm.bads, [(24, 23)])
+        # Renaming uexts are aliased away
+        self.assertEqual(cprgm.names["A.clk"], 9)
+        self.assertEqual([op.lid for op in cprgm.ops], [16, 17, 18, 20, 21, 23])
+        self.assertEqual(cprgm.widths[23], 1)
+
+    def test_load(self):
+        path = "tests/btor/reg_en.bad.btor"
+        expected = compile_program(btoropt.parse(utils.parsewrapper(path)))
+
+        cprgm = load_file(path)
+        self.assertEqual(cprgm.ops, expected.ops)
+        self.assertEqual(cprgm.states, expected.states)
+        self.assertEqual(cprgm.inputs, expected.inputs)
+        self.assertEqual(cprgm.names, expected.names)
+        self.assertEqual(cprgm.nexts, expected.nexts)
+        self.assertEqual(cprgm.bads, expected.bads)
+
+    def test_names(self):
+        # Symbols ending a line keep no line ending
+        path = "tests/btor/loop.safe.btor"
+        cprgm = compile_program(btoropt.parse(utils.parsewrapper(path)))
+        self.assertEqual(cprgm.names["in"], 3)
+        self.assertEqual(cprgm.names, load_file(path).names)
+
+    def test_witness_names(self):
+        path = "tests/btor/loop.safe.btor"
+        with open(path, "r") as f:
+            # Lines as read, with their endings
+            cprgm = compile_program(btoropt.parse(f.readlines()))
+        self.assertEqual(cprgm.names, load_file(path).names)
+        # c == 5 is reached after five steps
+        lines = utils.parsewrapper(path)[:-2] + ["18 eq 2 4 9", "19 bad 18"]
+        engine = BTOR2Ex(BoolectorSolver("test"), btoropt.parse(lines))
+        self.assertFalse(engine.bmc(6))
+        witness = engine.trace.to_witness().splitlines()
+        self.assertEqual(witness[:4], ["sat", "b0", "#0", "0 0000 c#0"])
+        self.assertEqual(len(witness), 4 + 2 * len(engine.trace) + 1)
+        self.assertTrue(all(line.split()[-1] == f"in@{k}" for k, line in enumerate(witness[5:-1:2])))
+        self.assertIn("  in = ", str(engine.trace).splitlines()[2])
+
+    def test_load_negated(self):
+        head = ["1 sort bitvec 4", "2 sort bitvec 1", "3 input 1 -x", "4 constd 1 -3", "5 eq 2 3 4"]
+        self.assertEqual(load_program(head + ["6 bad 5"]).names["-x"], 3)
+        for line in ["6 bad -5", "6 constraint -5", "6 not 2 -5", "6 and 2 5 -5"]:
+            with self.assertRaises(SystemExit):
+                load_program(head + [line])
+
+class CacheTest(unittest.TestCase):
+    """Check whether compiled programs are cached and evicted"""
+    
+    def test_cache(self):
+        path = "tests/btor/reg_en.bad.btor"
+        cprgm = load_file(path)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ProgramCache(tmp)
+            key = cache.key(path, coi=True)
+            self.assertNotEqual(key, cache.key(path, coi=False))
+            self.assertNotEqual(key, cache.key("tests/btor/reg_en.safe.btor", coi=True))
+            self.assertIsNone(cache.get(key))
+            cache.put(key, cprgm)
+            cached = cache.get(key)
+            self.assertEqual(cached.ops, cprgm.ops)
+            self.assertEqual(cached.names, cprgm.names)
+            self.assertFalse(BTOR2Ex(BoolectorSolver("test"), cached).bmc(3))
+
+            # Stale entries go first, then the least recently used
+            cache.put("stale", cprgm)
+            os.utime(cache.entry("stale"), (0, 0))
+            cache.put("old", cprgm)
+            os.utime(cache.entry("old"), (time.time() - 10, time.time() - 10))
+            cache.max_bytes = os.path.getsize(cache.entry(key)) * 2
+            cache.put("new", cprgm)
+            self.assertEqual(sorted(os.listdir(tmp)), sorted([key + SUFFIX, "new" + SUFFIX]))
+
+class FoldTest(unittest.TestCase):
+    """Check whether the term layer folds constants and shares terms"""
+    
+    def test_fold(self):
+        slv = FoldingSolver(BoolectorSolver("test"))
+        sort = slv.mk_sort(8)
+        x = slv.mk_var("x", sort)
+        c = slv.add_(slv.mk_const(250, sort), slv.mk_const(10, sort))
+        self.assertEqual(c.value, 4)
+        self.assertIs(slv.mk_const(4, sort), c)
+        self.assertIs(slv.and_(x, c), slv.and_(c, x))
+        self.assertIs(slv.ite_(slv.eq_(x, x), x, c), x)
+        self.assertEqual(slv.slice_(c, 8, 3, 2).value, 1)
+        self.assertEqual(slv.stats["native"], 1)
+
+    def test_fold_release(self):
+        slv = FoldingSolver(BoolectorSolver("test"))
+        x = slv.mk_var("x", slv.mk_sort(8))
+        nx = slv.not_(x)
+        self.assertIs(slv.not_(nx), x)
+        self.assertIs(slv.not_(x), nx)
+        # Terms no longer referenced leave the tables
+        del nx
+        gc.collect()
+        self.assertEqual(len(slv.table), 0)
+        self.assertEqual(len(slv.negated), 0)
+
+    def test_btormc_fold(self):
+        prgm = btoropt.parse(utils.parsewrapper("tests/btor/reg_en.safe.btor"))
+
+        engine = BTOR2Ex(FoldingSolver(BoolectorSolver("test")), prgm)
+        self.assertTrue(engine.bmc(3))
+
+        prgm = btoropt.parse(utils.parsewrapper("tests/btor/reg_en.bad.btor"))
+
+        engine = BTOR2Ex(FoldingSolver(BoolectorSolver("test")), prgm)
+        self.assertFalse(engine.bmc(3))
+
+    def test_fold_array(self):
+        slv = FoldingSolver(BoolectorSolver("test"))
+        bv4, bv8 = slv.mk_sort(4), slv.mk_sort(8)
+        mem = slv.mk_var("mem", slv.mk_array_sort(bv4, bv8))
+        i, d = slv.mk_var("i", bv4), slv.mk_var("d", bv8)
+        one, two = slv.mk_const(1, bv4), slv.mk_const(2, bv4)
+        wr = slv.write_(slv.write_(mem, one, d), two, slv.mk_const(7, bv8))
+        # Reads through writes to other constant indices
+        self.assertIs(slv.read_(wr, one), d)
+        self.assertEqual(slv.read_(wr, two).value, 7)
+        self.assertEqual(slv.read_(slv.mk_const_array(mem.sort, d), i), d)
+        self.assertEqual(slv.stats["native"], 0)
+        slv.mk_assume(slv.eq_(slv.read_(wr, i), d))
+        self.assertTrue(slv.check_sat())
+
+    def test_btormc_array(self):
+        lines = utils.parsewrapper("tests/btor/mem.bad.btor")
+        cprgm = load_program(lines)
+        self.assertEqual(cprgm.arrays, {4: (2, 3)})
+        self.assertEqual(cprgm.array_lids, {9, 12, 13})
+        self.assertEqual(cprgm.widths[15], 8)
+
+        for slv in [BoolectorSolver("test"), FoldingSolver(BoolectorSolver("test"))]:
+            engine = BTOR2Ex(slv, load_program(lines))
+            self.assertTrue(engine.bmc(1))
+            self.assertFalse(engine.bmc(1))
+            self.assertEqual(engine.trace[0, "we"], 1)
+            self.assertEqual(engine.trace[0, "waddr"], engine.trace[1, "raddr"])
+        # Writes disabled
+        engine = BTOR2Ex(BoolectorSolver("test"), load_program(lines + ["19 not 1 5", "20 constraint 19"]))
+        self.assertTrue(engine.bmc(3))
+        # Workers load arrays too
+        self.assertEqual(parallel.check_properties(lines, 3, 1), {18: 1})
+        configs = {"default": portfolio.CONFIGS["default"]}
+        self.assertEqual(portfolio.race(lines, 3, configs, stats=None), (False, "default"))
+
+    def test_btormc_array_init(self):
+        lines = utils.parsewrapper("tests/btor/mem.bad.btor")
+        # Memory filled with the first wdata, then with an arbitrary array
+        for init in (["11 init 4 9 7"], ["11 input 4 mem0", "19 init 4 9 11"]):
+            prgm = lines[:10] + init[:1] + lines[11:] + init[1:]
+            for slv in [BoolectorSolver("test"), FoldingSolver(BoolectorSolver("test"))]:
+                engine = BTOR2Ex(slv, load_program(prgm))
+                self.assertFalse(engine.bmc(1))
+                self.assertEqual(engine.trace.bads, [18])
+
+class ReplayTest(unittest.TestCase):
+    """Check whether traces are re-simulated concretely"""
+    
+    def test_replay(self):
+        prgm = btoropt.parse(utils.parsewrapper("tests/btor/reg_en.bad.btor"))
+
+        cprgm = compile_program(prgm)
+        trace = Trace(cprgm)
+        trace.steps = [dict.fromkeys(cprgm.widths, 0) for _ in range(2)]
+        # Both registers reset to zero
+        trace.steps[0][10], trace.steps[0][12] = 1, 2
+        trace.steps[0][5], trace.steps[0][8] = 1, 1
+        replayer = Replayer(cprgm)
+        self.assertEqual(replayer.replay(trace), [24])
+        trace.steps[0][8] = 0
+        self.assertEqual(replayer.replay(trace), [])
+
+@unittest.skipIf(Simulator is None, "numpy is not installed")
+class SimulatorTest(unittest.TestCase):
+    """Check whether random simulation finds concrete counterexamples"""
+    
+    def test_sim_unsafe(self):
+        cprgm = compile_program(btoropt.parse(utils.parsewrapper("tests/btor/reg_en.bad.btor")))
+
+        trace = Simulator(cprgm, lanes=64).run(4)
+        self.assertIsNotNone(trace)
+        self.assertEqual(trace.bads, [24])
+        self.assertTrue(Replayer(cprgm).validate(trace))
+
+    def test_sim_safe(self):
+        cprgm = compile_program(btoropt.parse(utils.parsewrapper("tests/btor/reg_en.safe.btor")))
+
+        self.assertIsNone(Simulator(cprgm, lanes=64).run(4))
+        self.assertIsNone(Simulator(cprgm, lanes=64).run(0))
+
+    def test_sim_input_init(self):
+        # s starts at the first value of x
+        lines = ["1 sort bitvec 4", "2 sort bitvec 1", "3 input 1 x", "4 state 1 s",
+            "5 init 1 4 3", "6 next 1 4 4", "7 constd 1 7", "8 eq 2 4 7", "9 bad 8"]
+        cprgm = compile_program(btoropt.parse(lines))
+
+        trace = Simulator(cprgm, lanes=64).run(2)
+        self.assertIsNotNone(trace)
+        self.assertEqual(len(trace), 1)
+        self.assertTrue(Replayer(cprgm).validate(trace))
+
+class KInductionTest(unittest.TestCase):
+    """Check whether k-induction proves and falsifies properties"""
+    
+    def test_kind(self):
+        prgm = btoropt.parse(utils.parsewrapper("tests/btor/reg_en.safe.btor"))
+        kind = KInduction(BoolectorSolver("base"), BoolectorSolver("step"), prgm)
+        self.assertEqual(kind.run(3), Verdict.PROVEN)
+
+        prgm = btoropt.parse(utils.parsewrapper("tests/btor/reg_en.bad.btor"))
+        kind = KInduction(BoolectorSolver("base"), BoolectorSolver("step"), prgm)
+        self.assertEqual(kind.run(3), Verdict.FALSIFIED)
+        self.assertEqual(kind.trace.bads, [24])
+        self.assertTrue(Replayer(kind.cprog).validate(kind.trace))
+
+    def test_kind_simple_path(self):
+        prgm = btoropt.parse(utils.parsewrapper("tests/btor/loop.safe.btor"))
+        kind = KInduction(FoldingSolver(BoolectorSolver("base")), FoldingSolver(BoolectorSolver("step")), prgm)
+        self.assertEqual(kind.run(4), Verdict.PROVEN)
+        self.assertEqual(kind.k, 2)
+        # The self-loop defeats induction without simple paths
+        kind = KInduction(BoolectorSolver("base"), BoolectorSolver("step"), prgm, simple_path=False)
+        self.assertEqual(kind.run(4), Verdict.UNKNOWN)
+
+    def test_kind_free_init(self):
+        # From a free state c can already be 10
+        prgm = btoropt.parse(utils.parsewrapper("tests/btor/loop.safe.btor"))
+        kind = KInduction(BoolectorSolver("base"), BoolectorSolver("step"), prgm, init=False)
+        self.assertEqual(kind.run(4), Verdict.FALSIFIED)
+        self.assertEqual(kind.k, 0)
+        self.assertTrue(Replayer(kind.cprog, init=False).validate(kind.trace))
+
+class PDRTest(unittest.TestCase):
+    """Check whether PDR proves and falsifies properties"""
+    
+    def test_pdr(self):
+        lines = utils.parsewrapper("tests/btor/loop.safe.btor")
+        engine = PDR(FoldingSolver(BoolectorSolver("test", BOOLECTOR_OPTS)), btoropt.parse(lines))
+        self.assertEqual(engine.run(10), Verdict.PROVEN)
+
+        # c == 5 is reached after five steps
+        lines = lines[:-2] + ["18 eq 2 4 9", "19 bad 18"]
+        engine = PDR(BoolectorSolver("test"), btoropt.parse(lines))
+        self.assertEqual(engine.run(10), Verdict.FALSIFIED)
+        self.assertEqual(len(engine.trace), 6)
+        self.assertTrue(Replayer(engine.cprog).validate(engine.trace))
+
+    def test_pdr_free_init(self):
+        # Every state is initial, c == 10 included
+        prgm = btoropt.parse(utils.parsewrapper("tests/btor/loop.safe.btor"))
+        engine = PDR(BoolectorSolver("test", BOOLECTOR_OPTS), prgm, init=False)
+        self.assertEqual(engine.run(10), Verdict.FALSIFIED)
+        self.assertEqual(len(engine.trace), 1)
+        self.assertTrue(Replayer(engine.cprog, init=False).validate(engine.trace))
+
+@unittest.skipIf(BitwuzlaSolver is None, "bitwuzla is not installed")
+class BitwuzlaTest(unittest.TestCase):
+    """Check the Bitwuzla backend against the Boolector results"""
+
+    def test_bitwuzla_bmc(self):
+        prgm = btoropt.parse(utils.parsewrapper("tests/btor/reg_en.safe.btor"))
+        self.assertTrue(BTOR2Ex(BitwuzlaSolver("test"), prgm).bmc(3))
+
+        prgm = btoropt.parse(utils.parsewrapper("tests/btor/reg_en.bad.btor"))
+        for slv in [BitwuzlaSolver("test"), FoldingSolver(BitwuzlaSolver("test"))]:
+            engine = BTOR2Ex(slv, prgm)
+            self.assertFalse(engine.bmc(3))
+            self.assertTrue(Replayer(engine.cprog).validate(engine.trace))
+
+    def test_bitwuzla_array(self):
+        engine = BTOR2Ex(BitwuzlaSolver("test"), load_program(utils.parsewrapper("tests/btor/mem.bad.btor")))
+        self.assertFalse(engine.bmc(2))
+        self.assertEqual(engine.trace[0, "waddr"], engine.trace[1, "raddr"])
+
+    def test_bitwuzla_provers(self):
+        prgm = btoropt.parse(utils.parsewrapper("tests/btor/loop.safe.btor"))
+        kind = KInduction(BitwuzlaSolver("base"), BitwuzlaSolver("step"), prgm)
+        self.assertEqual(kind.run(4), Verdict.PROVEN)
+        # Unsat cores of assumptions
+        self.assertEqual(PDR(BitwuzlaSolver("test"), prgm).run(10), Verdict.PROVEN)
+
+class PhasedTest(unittest.TestCase):
+    """Check whether phases are only checked in the frames of their stage"""
+
+    def test_phased(self):
+        lines = utils.parsewrapper("tests/btor/reg_en.bad.btor")
+        fsm = prfsm.PrFSM(numsteps=4, reset=True).run(btoropt.parse(lines))
+        full = compile_program(btoropt.parse(lines + [" ".join(inst.serialize().split()) for inst in fsm]))
+        stages = schedule(full, "fv__counter", 8)
+        self.assertEqual(stages, [0, 1, 2, 3, 0, 1, 2, 3])
+
+        # Falsifiable from the first frame, but only checked once the counter is at 3
+        engine = BTOR2Ex(BoolectorSolver("phased"), COI().reduce(full))
+        self.assertEqual(check_phases(engine, stages, {3: [24]}), {24: 3})
+        self.assertEqual(len(engine.bads), 4)
+
+        engine = BTOR2Ex(BoolectorSolver("free"), COI().reduce(full), init=False)
+        self.assertEqual(check_phases(engine, stages, {3: [24]}), {24: 0})
+
+class BatchTest(unittest.TestCase):
+    """Check whether batches of designs are checked and summarized"""
+
+    def test_batch(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest = os.path.join(tmp, "designs.txt")
+            with open(manifest, "w") as f:
+                f.write(f"{os.path.abspath('tests/btor/reg_en.bad.btor')} 4\n")
+                f.write(f"# safe designs\n{os.path.abspath('tests/btor/reg_en.safe.btor')}\n")
+                f.write("missing.btor 2\n")
+            jobs = batch.designs(manifest, 3)
+            self.assertEqual([bound for _, bound in jobs], [4, 3, 2])
+
+            summary = os.path.join(tmp, "summary.jsonl")
+            records = batch.run(jobs, summary, jobs=2)
+            with open(summary) as f:
+                self.assertEqual([json.loads(line) for line in f], records)
+            results = {os.path.basename(r["design"]): r["result"] for r in records}
+            self.assertEqual(results, {"reg_en.bad.btor": "UNSAFE", "reg_en.safe.btor": "SAFE",
+                "missing.btor": "ERROR"})
+            self.assertTrue(all(r["rss"] > 0 for r in records if r["result"] != "ERROR"))
+
+        record = batch.check_design("tests/btor/reg_en.bad.btor", 4, {"fold": False})
+        self.assertEqual((record["result"], record["depth"]), ("UNSAFE", 0))
+
+class ServerTest(unittest.TestCase):
+    """Check the BMC service reuses unrolled engines"""
+
+    def test_service(self):
+        service = Service(sessions=1)
+        response = service.handle({"design": "tests/btor/reg_en.safe.btor", "bound": 3})
+        self.assertTrue(response["safe"])
+        self.assertEqual(response["reused"], 0)
+        response = service.handle({"design": "tests/btor/reg_en.safe.btor", "bound": 5})
+        self.assertEqual(response["reused"], 3)
+        response = service.handle({"design": "tests/btor/reg_en.bad.btor", "bound": 3})
+        self.assertEqual(response["verdicts"], {24: 0})
+        # The safe design's engine was evicted
+        response = service.handle({"design": "tests/btor/reg_en.safe.btor", "bound": 2})
+        self.assertEqual(response["reused"], 0)
+
+    def test_server(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "btor2ex.sock")
+            with Server(path, Service()) as server:
+                thread = threading.Thread(target=server.serve_forever, daemon=True)
+                thread.start()
+                response = query(path, {"design": "tests/btor/reg_en.bad.btor", "bound": 3, "witness": True})
+                self.assertFalse(response["safe"])
+                self.assertEqual(response["witnesses"][24].splitlines()[0], "sat")
+                response = query(path, {"design": "tests/btor/missing.btor", "bound": 3})
+                self.assertFalse(response["ok"])
+                server.shutdown()
+                thread.join()
+
+class ProfileTest(unittest.TestCase):
+    """Check the profiling layer"""
+
+    def test_profile(self):
+        prgm = btoropt.parse(utils.parsewrapper("tests/btor/reg_en.bad.btor"))
+        profiler = Profiler()
+        slv = ProfilingSolver(FoldingSolver(ProfilingSolver(BoolectorSolver("test"), profiler, "backend.")), profiler)
+
+        engine = BTOR2Ex(slv, prgm, profiler=profiler)
+        self.assertFalse(engine.bmc(3))
+        report = profiler.report()
+        self.assertEqual(len(report["frames"]), 1)
+        self.assertEqual(report["calls"]["check_sat"]["count"], 1)
+        self.assertEqual(report["calls"]["backend.check_sat"]["count"], 1)
+        for lid, _ in engine.cprog.bads:
+            self.assertEqual(report["properties"][lid]["checks"], 1)
+            self.assertEqual(report["properties"][lid]["falsified"], 0)
+
 class BTORMCTest(unittest.TestCase):
     """Check whether Boolector-based model-checker is working properly"""
     
@@ -29,8 +506,187 @@ class BTORMCTest(unittest.TestCase):
         engine = BTOR2Ex(BoolectorSolver("test"), prgm)
         self.assertFalse(engine.bmc(3))
 
+    def test_btormc_trace(self):
+        prgm = btoropt.parse(utils.parsewrapper("tests/btor/reg_en.bad.btor"))
+
+        engine = BTOR2Ex(BoolectorSolver("test"), prgm)
+        self.assertFalse(engine.bmc(3))
+        trace = engine.trace
+        self.assertEqual(len(trace), 1)
+        self.assertEqual(trace[0, "A.q"], trace[0, "B.q"])
+        self.assertEqual(trace[0, 10], trace[0, "A.q"])
+        self.assertTrue(Replayer(engine.cprog).validate(trace))
+        witness = trace.to_witness().splitlines()
+        self.assertEqual(witness[:3], ["sat", "b0", "#0"])
+        self.assertEqual(len(witness), 2 + 1 + 2 + 1 + 7 + 1)
+
+    def test_btormc_frames(self):
+        prgm = btoropt.parse(utils.parsewrapper("tests/btor/reg_en.safe.btor"))
+
+        engine = BTOR2Ex(BoolectorSolver("test"), prgm)
+        self.assertTrue(engine.bmc(3))
+        # Unrolled frames keep only their states and inputs
+        kept = {lid for lid, _, _ in engine.cprog.states + engine.cprog.inputs}
+        for i in range(3):
+            self.assertEqual(set(engine.state[i]), kept)
+            self.assertEqual(set(engine.bads[i]), {lid for lid, _ in engine.cprog.bads})
+            self.assertGreater(engine.frame_bytes(i), 0)
+
     def test_btormc_safe(self):
         prgm = btoropt.parse(utils.parsewrapper("tests/btor/reg_en.safe.btor"))
 
         engine = BTOR2Ex(BoolectorSolver("test"), prgm)
-        self.assertTrue(engine.bmc(3))
\ No newline at end of file
+        self.assertTrue(engine.bmc(3))
+
+    def test_btormc_incremental(self):
+        # A second, reachable bad after an unreachable one
+        lines = utils.parsewrapper("tests/btor/reg_en.safe.btor")[:-1] + ["27 bad 23"]
+        prgm = btoropt.parse(lines)
+
+        engine = BTOR2Ex(BoolectorSolver("test"), prgm)
+        self.assertFalse(engine.bmc(2))
+        # Re-assuming loop, where the unreachable bad must not stay asserted
+        engine = BTOR2Ex(BoolectorSolver("test"), prgm)
+        self.assertFalse(engine.bmc(2, incremental=False))
+        self.assertEqual(engine.trace.bads, [27])
+
+    def test_btormc_props(self):
+        lines = utils.parsewrapper("tests/btor/reg_en.safe.btor")[:-1] + ["27 bad 23"]
+
+        engine = BTOR2Ex(BoolectorSolver("test"), btoropt.parse(lines))
+        self.assertEqual(engine.bmc_props(3), {26: None, 27: 0})
+        self.assertEqual(parallel.check_properties(lines, 3, 2), {26: None, 27: 0})
+
+    def test_btormc_iter(self):
+        lines = utils.parsewrapper("tests/btor/reg_en.safe.btor")[:-1] + ["27 bad 23"]
+
+        engine = BTOR2Ex(BoolectorSolver("test"), btoropt.parse(lines))
+        results = list(engine.bmc_iter(3))
+        # The falsified bad is dropped after depth 0
+        self.assertEqual([(r.depth, r.lid, r.sat) for r in results],
+            [(0, 26, False), (0, 27, True), (1, 26, False), (2, 26, False)])
+        self.assertEqual(list(engine.bmc_iter(3, deadline=time.perf_counter())), [])
+
+    def test_btormc_timeout(self):
+        # Factoring a product of two 32-bit primes
+        lines = [
+            "1 sort bitvec 64", "2 sort bitvec 1", "3 input 1 x", "4 input 1 y",
+            f"5 constd 1 {0xfffffffb * 0xffffffef}", "6 one 1", f"7 constd 1 {1 << 33}",
+            "8 mul 1 3 4", "9 eq 2 8 5", "10 ugt 2 3 6", "11 ugt 2 4 6", "12 ult 2 3 7", "13 ult 2 4 7",
+            "14 and 2 9 10", "15 and 2 14 11", "16 and 2 15 12", "17 and 2 16 13", "18 bad 17",
+        ]
+        engine = BTOR2Ex(BoolectorSolver("test"), btoropt.parse(lines))
+        results = list(engine.bmc_iter(3, timeout=0.2))
+        self.assertEqual([(r.depth, r.sat) for r in results], [(0, None)])
+        self.assertLess(results[0].time, 1)
+
+        # Giving up on one bad does not give up on the next
+        lines += ["19 input 2 z", "20 bad 19"]
+        engine = BTOR2Ex(BoolectorSolver("test"), btoropt.parse(lines))
+        results = list(engine.bmc_iter(3, timeout=0.2))
+        self.assertEqual([(r.lid, r.sat) for r in results], [(18, None), (20, True)])
+        self.assertTrue(Replayer(engine.cprog).validate(engine.traces[20]))
+
+    def test_btormc_init(self):
+        # c starts at zero (constant init), d at c + 1 (symbolic init)
+        lines = [
+            "1 sort bitvec 4", "2 sort bitvec 1", "3 zero 1", "4 one 1",
+            "5 state 1 c", "6 init 1 5 3", "7 next 1 5 5",
+            "8 state 1 d", "9 add 1 5 4", "10 init 1 8 9", "11 next 1 8 8",
+            "12 eq 2 5 4", "13 eq 2 8 3", "14 or 2 12 13", "15 bad 14",
+        ]
+        self.assertTrue(BTOR2Ex(BoolectorSolver("test"), btoropt.parse(lines)).bmc(3))
+        self.assertEqual(parallel.check_properties(lines, 3, 1), {15: None})
+        self.assertEqual(parallel.check_properties(lines, 3, 1, {"init": False, "fold": False}), {15: 0})
+        configs = {"default": portfolio.CONFIGS["default"]}
+        self.assertEqual(portfolio.race(lines, 3, configs, stats=None, settings={"init": False}),
+            (False, "default"))
+
+        engine = BTOR2Ex(BoolectorSolver("test"), btoropt.parse(lines), init=False)
+        self.assertFalse(engine.bmc(3))
+        self.assertTrue(Replayer(engine.cprog, init=False).validate(engine.trace))
+        self.assertFalse(Replayer(engine.cprog).validate(engine.trace))
+        if Simulator is not None:
+            cprgm = compile_program(btoropt.parse(lines))
+            self.assertIsNone(Simulator(cprgm, lanes=64).run(3))
+            self.assertIsNotNone(Simulator(cprgm, lanes=64, init=False).run(3))
+
+    # r accumulates d once out of reset, mode is tied to one by a constraint
+    PINNED = [
+        "1 sort bitvec 1", "2 sort bitvec 8", "3 input 1 rst", "4 input 1 mode",
+        "5 input 2 d", "6 state 2 r", "7 zero 2", "8 init 2 6 7", "9 one 1",
+        "10 add 2 6 5", "11 ite 2 4 10 6", "12 ite 2 3 7 11", "13 next 2 6 12",
+        "14 eq 1 4 9", "15 constraint 14", "16 ones 2", "17 eq 1 6 16", "18 bad 17",
+    ]
+
+    def test_btormc_pins(self):
+        cprgm = compile_program(btoropt.parse(self.PINNED))
+        self.assertEqual(cprgm.pinned_inputs(), {4: 1})
+
+        free = BTOR2Ex(FoldingSolver(BoolectorSolver("free")), cprgm)
+        self.assertFalse(free.bmc(4))
+        engine = BTOR2Ex(FoldingSolver(BoolectorSolver("pinned")), cprgm, pins={3: [1, 0]})
+        self.assertFalse(engine.bmc(4))
+        self.assertEqual(len(engine.trace), 3)
+        self.assertEqual([engine.trace[i, "rst"] for i in range(3)], [1, 0, 0])
+        self.assertEqual([engine.trace[i, "mode"] for i in range(3)], [1, 1, 1])
+        self.assertTrue(Replayer(cprgm).validate(engine.trace))
+        self.assertLess(engine.slv.stats["native"], free.slv.stats["native"])
+
+    def test_btormc_pins_engines(self):
+        cprgm = compile_program(btoropt.parse(self.PINNED))
+        # r stays zero when d is pinned to zero
+        kind = KInduction(FoldingSolver(BoolectorSolver("base")), FoldingSolver(BoolectorSolver("step")),
+            cprgm, pins={5: [0]})
+        self.assertEqual(kind.run(4), Verdict.PROVEN)
+        self.assertEqual(PDR(FoldingSolver(BoolectorSolver("pdr")), cprgm, pins={5: [0]}).run(4), Verdict.PROVEN)
+        with self.assertRaises(SystemExit):
+            PDR(BoolectorSolver("pdr"), cprgm, pins={3: [1, 0]})
+        # Reset in the first frame only
+        kind = KInduction(FoldingSolver(BoolectorSolver("base")), FoldingSolver(BoolectorSolver("step")),
+            cprgm, pins={3: [1, 0]})
+        self.assertEqual(kind.run(4), Verdict.FALSIFIED)
+        self.assertEqual([kind.trace[i, "rst"] for i in range(len(kind.trace))], [1, 0, 0])
+        if Simulator is not None:
+            self.assertIsNone(Simulator(cprgm, lanes=64, pins={5: [0]}).run(4))
+            trace = Simulator(cprgm, lanes=64, pins={3: [1, 0], 5: [255]}).run(4)
+            self.assertEqual([trace[i, "rst"] for i in range(len(trace))], [1, 0, 0])
+            self.assertTrue(Replayer(cprgm).validate(trace))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "pinned.btor")
+            with open(path, "w") as f:
+                f.write("\n".join(self.PINNED) + "\n")
+            lines = utils.parsewrapper(path)
+            self.assertEqual(parallel.check_properties(lines, 4, 1), {18: 1})
+            self.assertEqual(parallel.check_properties(lines, 4, 1, {"pins": {"d": [0]}}), {18: None})
+            configs = {"default": portfolio.CONFIGS["default"]}
+            self.assertEqual(portfolio.race(lines, 4, configs, stats=None, settings={"pins": {"d": [0]}}),
+                (True, "default"))
+            self.assertEqual(batch.check_design(path, 4, {"pins": {"d": [0]}})["result"], "SAFE")
+            self.assertEqual(batch.check_design(path, 4, {"pins": {"D": [0]}})["result"], "ERROR")
+
+    def test_btormc_portfolio(self):
+        lines = utils.parsewrapper("tests/btor/reg_en.bad.btor")
+        configs = {name: portfolio.CONFIGS[name] for name in ["default", "rw1"]}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            stats = os.path.join(tmp, "portfolio.json")
+            result, winner = portfolio.race(lines, 3, configs, stats=stats)
+            self.assertFalse(result)
+            self.assertEqual(portfolio.load_stats(stats), {winner: 1})
+
+            # Workers dying without an answer lose the race
+            with mock.patch.object(portfolio, "run_config", lambda *args: os._exit(1)):
+                self.assertEqual(portfolio.race(lines, 3, configs, stats=stats), (None, None))
+            self.assertEqual(portfolio.load_stats(stats), {winner: 1})
+
+            # Answers of workers that exited while the wait was timing out still count
+            class Late(multiprocessing.queues.Queue):
+                def get(self, block=True, timeout=None):
+                    if block:
+                        time.sleep(timeout)
+                        raise queue.Empty
+                    return super().get(False)
+            with mock.patch.object(multiprocessing, "Queue", lambda: Late(ctx=multiprocessing.get_context())):
+                self.assertEqual(portfolio.race(lines, 3, configs, stats=None)[0], False)